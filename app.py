@@ -1,8 +1,15 @@
 from flask import Flask
+from flask.cli import AppGroup
 from flask_cors import CORS
 from config import config
 import os
 from utils.extensions import db, jwt
+from utils.etag import etag_registry
+from utils.compression import compress
+from utils.metrics import init_metrics
+from utils.profiler import init_profiler
+from utils.query_watch import query_watch
+from utils.db_routing import init_db_routing
 from utils.response import (
     success_response,
     error_response,
@@ -11,35 +18,98 @@ from utils.response import (
     server_error_response
 )
 from datetime import datetime
-import pytz
-
-
-def create_app(config_name=None):
-    app = Flask(__name__)
+import importlib
+
+# 蓝图注册表：名称 -> (模块路径, 蓝图变量名, URL 前缀)
+# 以字符串登记，create_app 只导入选中的蓝图模块（可选注册，不是延迟导入：
+# 选中的模块在 create_app 中即导入，Flask 不允许在处理请求后再注册蓝图）
+BLUEPRINTS = {
+    'auth': ('modules.auth.routes', 'auth_bp', '/api/auth'),
+    'user_management': ('modules.user_management.routes', 'user_mgmt_bp', '/api/users'),
+    'data_management': ('modules.data_management.routes', 'data_mgmt_bp', '/api/data_management'),
+    'audit': ('modules.audit.routes', 'audit_bp', '/api/audit'),
+    'icd10': ('modules.icd10.routes', 'icd10_bp', '/api/icd10'),
+    'diagnostics': ('modules.diagnostics.routes', 'diagnostics_bp', '/api/diagnostics'),
+}
+
+# CLI 命令注册表：命令名 -> (模块路径, 命令变量名)
+# 与蓝图一样以字符串登记，只在执行（或列出帮助）该命令时导入所在模块
+CLI_COMMANDS = {
+    'reconcile-group-counts': ('modules.user_management.group_counters', 'reconcile_group_counts_command'),
+    'tracker-partitions': ('modules.data_management.partitions', 'tracker_partitions_command'),
+    'tracker-archive': ('modules.data_management.archive', 'tracker_archive_command'),
+    'tracker-storage': ('modules.data_management.tracker_store', 'tracker_storage_command'),
+    'icd10-pinyin': ('modules.icd10.pinyin', 'icd10_pinyin_command'),
+    'schema-upgrade': ('modules.data_management.schema_upgrade', 'schema_upgrade_command'),
+}
+
+
+class LazyAppGroup(AppGroup):
+    """app.cli：CLI_COMMANDS 中的命令在首次被查找时才导入并注册"""
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(CLI_COMMANDS))
+
+    def get_command(self, ctx, name):
+        if name in CLI_COMMANDS and name not in self.commands:
+            module_path, attr = CLI_COMMANDS[name]
+            self.add_command(getattr(importlib.import_module(module_path), attr), name)
+        return super().get_command(ctx, name)
+
+
+def _print_clock():
+    import pytz
 
     print("当前本地时间:", datetime.now())
     print("当前 UTC 时间:", datetime.utcnow())
     print("当前北京时间:", datetime.now(pytz.timezone("Asia/Shanghai")))
 
+
+def register_blueprints(app, names=None):
+    """按名称注册蓝图；names 为 None 时注册全部"""
+    for name in BLUEPRINTS if names is None else names:
+        module_path, attr, url_prefix = BLUEPRINTS[name]
+        blueprint = getattr(importlib.import_module(module_path), attr)
+        app.register_blueprint(blueprint, url_prefix=url_prefix)
+
+
+def create_app(config_name=None, blueprints=None):
+    """
+    应用工厂
+    blueprints: 需要注册的蓝图名称（见 BLUEPRINTS），None（默认）表示全部，在此处全部导入；
+                初始化脚本、CLI 工具等不处理请求的场景可传入空元组，跳过路由模块的导入
+    """
+    app = Flask(__name__)
+    app.cli = LazyAppGroup(app.name)
+
     # 配置应用
     config_name = config_name or os.getenv('FLASK_ENV', 'default')
     app.config.from_object(config[config_name])
 
+    if app.debug:
+        _print_clock()
+
+    # 部署在反向代理之后时，按配置信任的代理层数还原客户端 IP（request.remote_addr）
+    if app.config.get('PROXY_FIX_X_FOR'):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+
+        app.wsgi_app = ProxyFix(app.wsgi_app,
+                                x_for=app.config['PROXY_FIX_X_FOR'],
+                                x_proto=app.config.get('PROXY_FIX_X_PROTO', 0))
+
     # 初始化扩展
     db.init_app(app)
+    init_db_routing(app)
     jwt.init_app(app)
+    etag_registry.init_app(app)
+    init_metrics(app)
+    init_profiler(app)
+    query_watch.init_app(app)
+    compress.init_app(app)
     CORS(app, origins=app.config['CORS_ORIGINS'], supports_credentials=True)
 
     # 注册蓝图
-    from modules.auth.routes import auth_bp
-    from modules.user_management.routes import user_mgmt_bp
-    from modules.data_management.routes import data_mgmt_bp
-    from modules.audit.routes import audit_bp
-
-    app.register_blueprint(auth_bp, url_prefix='/api/auth')
-    app.register_blueprint(user_mgmt_bp, url_prefix='/api/users')
-    app.register_blueprint(data_mgmt_bp, url_prefix='/api/data_management')
-    app.register_blueprint(audit_bp, url_prefix='/api/audit')
+    register_blueprints(app, blueprints)
 
     # 统一错误处理
     @app.errorhandler(400)
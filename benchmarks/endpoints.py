@@ -0,0 +1,281 @@
+# benchmarks/endpoints.py
+"""
+热点接口微基准
+
+在进程内用 Flask test client 依次请求各热点接口，统计延迟分位数（p50 / p95 / p99）
+与每次请求执行的 SQL 条数。数据库默认为 create_app('testing') 的内存 SQLite，
+也可用 --database-url 指向 MySQL；数据按 --scale 批量生成（见 benchmarks/seed.py）。
+
+    python benchmarks/endpoints.py                                   # 内存 SQLite，scale=1
+    python benchmarks/endpoints.py --scale 5 --output before.json
+    python benchmarks/endpoints.py --output after.json --compare before.json --threshold 0.15
+    python benchmarks/endpoints.py --database-url "mysql+pymysql://u:p@127.0.0.1/bench" --reset
+
+--compare 时逐项对比基线：p50 或 p95 变慢超过 --threshold（比例），或每请求 SQL 条数增加，
+即视为回归，以状态码 1 退出，可用于 CI。非空的外部数据库只有加 --reset（删表重建）才会使用。
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import warnings
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# 登录包含一次密码哈希校验（scrypt / pbkdf2），单次较慢，迭代次数单独缩减
+_LOGIN_ITERATIONS_DIVISOR = 10
+_WARMUP = 5
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+class QueryCounter:
+    """after_cursor_execute 计数，统计每次请求执行的 SQL 条数"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, *args, **kwargs):
+        self.count += 1
+
+    def attach(self, engines):
+        from sqlalchemy import event
+
+        for engine in engines:
+            event.listen(engine, "after_cursor_execute", self)
+
+
+def create_bench_app(database_url, reset):
+    if database_url:
+        os.environ["DATABASE_URL"] = database_url
+    from app import create_app
+    from utils.extensions import db
+    import models  # noqa: F401  注册全部模型
+
+    app = create_app("production" if database_url else "testing")
+    with app.app_context():
+        if database_url:
+            from sqlalchemy import inspect
+
+            if inspect(db.engine).get_table_names():
+                if not reset:
+                    raise SystemExit("目标数据库非空，如确认可清空请加 --reset")
+                db.drop_all()
+        db.create_all()
+    return app
+
+
+def build_cases(app, dataset, iterations):
+    """[(名称, 迭代次数, 请求函数)]；请求函数接收 test client 与迭代序号"""
+    from flask_jwt_extended import create_access_token
+
+    from benchmarks.seed import BENCH_PASSWORD, username_of
+
+    users = dataset["users"]
+    with app.app_context():
+        admin = create_access_token(
+            identity=str(dataset["admin_id"]),
+            additional_claims={"user_id": dataset["admin_id"], "role_code": "ADMIN"},
+        )
+        tokens = [
+            create_access_token(identity=str(uid), additional_claims={"user_id": uid, "role_code": "RESEARCHER"})
+            for uid in users[1:33]
+        ]
+        from modules.data_management.models import ICD10Code
+
+        # 每批 500 个：有效编码原样 / 带小数点小写各半，另有少量无效编码
+        icd10 = [code for (code,) in ICD10Code.query.with_entities(ICD10Code.code).limit(500)]
+        batch = [c if i % 2 else f"{c[:3]}.{c[3:]}".lower() for i, c in enumerate(icd10)]
+        batch[::50] = ["Z9Z9"] * len(batch[::50])
+    admin_headers = {"Authorization": f"Bearer {admin}"}
+
+    def user_headers(i):
+        return {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+
+    def target(i):
+        return users[1 + i % (len(users) - 1)]
+
+    trackers = {
+        "access-success": {"num_as": 1},
+        "operation-behavior": {"num_view": 1},
+        "data-sensitivity": {"num1": 1},
+        "access-period": {"num_ni": 1},
+        "access-location": {"num_nd": 1},
+    }
+    login_iterations = max(_WARMUP + 1, iterations // _LOGIN_ITERATIONS_DIVISOR)
+
+    cases = [
+        ("POST /api/auth/login", login_iterations, lambda c, i: c.post(
+            "/api/auth/login", json={"username": username_of(1 + i % (len(users) - 1)), "password": BENCH_PASSWORD})),
+        ("POST /api/audit/record-access", iterations, lambda c, i: c.post(
+            "/api/audit/record-access", headers=user_headers(i),
+            json={"operation_type": "view", "sensitivity_level": 1 + i % 4})),
+        ("GET /api/audit/all-stats", iterations, lambda c, i: c.get(
+            "/api/audit/all-stats?page=1&per_page=20", headers=admin_headers)),
+        ("GET /api/users/users", iterations, lambda c, i: c.get(
+            f"/api/users/users?page={1 + i % 5}&per_page=20", headers=admin_headers)),
+        ("GET /api/users/users?search", iterations, lambda c, i: c.get(
+            f"/api/users/users?search=bench{i % 100:02d}&per_page=20", headers=admin_headers)),
+    ]
+    for name, body in trackers.items():
+        cases.append((f"POST /api/data_management/{name}", iterations,
+                      lambda c, i, name=name, body=body: c.post(
+                          f"/api/data_management/{name}", headers=user_headers(i), json=body)))
+    for name in trackers:
+        cases.append((f"GET /api/data_management/{name}/user/<id>", iterations,
+                      lambda c, i, name=name: c.get(
+                          f"/api/data_management/{name}/user/{target(i)}", headers=admin_headers)))
+    terms = ("肺炎", "糖尿", "hyper", "asthma", "结核", "failure")
+    initials = ("gxy", "tnb", "fy", "xc", "jh", "gaoxue")
+    typos = ("肺严", "diabetis", "A0O", "asthama", "hypertensoin", "tuberculsis")
+    cases += [
+        ("GET /api/icd10/search", iterations, lambda c, i: c.get(
+            f"/api/icd10/search?q={terms[i % len(terms)]}&limit=20", headers=user_headers(i))),
+        ("GET /api/icd10/search?mode=fuzzy", iterations, lambda c, i: c.get(
+            f"/api/icd10/search?q={typos[i % len(typos)]}&mode=fuzzy&limit=20", headers=user_headers(i))),
+        ("GET /api/icd10/search?mode=pinyin", iterations, lambda c, i: c.get(
+            f"/api/icd10/search?q={initials[i % len(initials)]}&mode=pinyin&limit=20", headers=user_headers(i))),
+        ("GET /api/icd10/codes?prefix", iterations, lambda c, i: c.get(
+            f"/api/icd10/codes?prefix={chr(ord('A') + i % 3)}{i % 100:02d}", headers=user_headers(i))),
+        ("POST /api/icd10/validate (500)", iterations, lambda c, i: c.post(
+            "/api/icd10/validate", headers=user_headers(i), json={"codes": batch})),
+        ("GET /api/icd10/chapters", iterations, lambda c, i: c.get(
+            "/api/icd10/chapters", headers=user_headers(i))),
+    ]
+    return cases
+
+
+def measure(client, counter, request, iterations):
+    for i in range(_WARMUP):
+        request(client, i)
+    latencies, queries, errors = [], 0, 0
+    for i in range(iterations):
+        counter.count = 0
+        start = time.perf_counter()
+        resp = request(client, i)
+        latencies.append((time.perf_counter() - start) * 1000)
+        queries += counter.count
+        if resp.status_code >= 400:
+            errors += 1
+    latencies.sort()
+    return {
+        "iterations": iterations,
+        "errors": errors,
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "p50_ms": round(_percentile(latencies, 0.50), 3),
+        "p95_ms": round(_percentile(latencies, 0.95), 3),
+        "p99_ms": round(_percentile(latencies, 0.99), 3),
+        "queries_per_request": round(queries / iterations, 2),
+    }
+
+
+def compare(results, baseline, threshold):
+    """返回回归项说明列表（空列表表示无回归）"""
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            if before[key] > 0 and current[key] > before[key] * (1 + threshold):
+                regressions.append(
+                    f"{name}: {key} {before[key]:.3f} -> {current[key]:.3f} "
+                    f"(+{(current[key] / before[key] - 1) * 100:.1f}%)"
+                )
+        if current["queries_per_request"] > before["queries_per_request"]:
+            regressions.append(
+                f"{name}: queries_per_request {before['queries_per_request']} -> "
+                f"{current['queries_per_request']}"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="热点接口微基准")
+    parser.add_argument("--database-url", help="外部数据库连接串（默认内存 SQLite）")
+    parser.add_argument("--reset", action="store_true", help="外部数据库非空时删表重建")
+    parser.add_argument("--scale", type=int, default=1, help="数据规模：100×scale 个用户，1000×scale 条 ICD-10 编码")
+    parser.add_argument("--days", type=int, default=30, help="每个用户的追踪历史天数")
+    parser.add_argument("--iterations", type=int, default=200, help="每个接口的测量次数（登录为其 1/10）")
+    parser.add_argument("--filter", help="只运行名称包含该子串的用例")
+    parser.add_argument("--output", help="结果 JSON 文件")
+    parser.add_argument("--compare", help="基线 JSON 文件")
+    parser.add_argument("--threshold", type=float, default=0.10, help="允许的延迟变慢比例")
+    args = parser.parse_args(argv)
+    warnings.filterwarnings("ignore", message="The HMAC key")  # 测试配置的 SECRET_KEY 较短
+
+    app = create_bench_app(args.database_url, args.reset)
+    from benchmarks.seed import seed_dataset
+    from utils.extensions import db
+
+    started = time.perf_counter()
+    with app.app_context():
+        dataset = seed_dataset(scale=args.scale, days=args.days)
+        dialect = db.engine.dialect.name
+        counter = QueryCounter()
+        counter.attach(db.engines.values())
+    print(f"已生成数据（{dialect}）：{len(dataset['users'])} 个用户 × {args.days} 天，"
+          f"{dataset['icd10']} 条 ICD-10，用时 {time.perf_counter() - started:.1f} s")
+
+    client = app.test_client()
+    results = {}
+    print(f"{'接口':<52} {'p50':>8} {'p95':>8} {'p99':>8} {'SQL/次':>7} {'错误':>5}")
+    for name, iterations, request in build_cases(app, dataset, args.iterations):
+        if args.filter and args.filter not in name:
+            continue
+        r = results[name] = measure(client, counter, request, iterations)
+        print(f"{name:<52} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+              f"{r['queries_per_request']:>7.2f} {r['errors']:>5}")
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "dialect": dialect,
+            "scale": args.scale,
+            "days": args.days,
+            "iterations": args.iterations,
+            "python": platform.python_version(),
+            "timestamp": datetime.utcnow().isoformat(),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("dialect") != dialect or baseline["meta"].get("scale") != args.scale:
+            print("警告：基线的数据库类型或数据规模与本次不同，对比结果仅供参考")
+        regressions = compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print(f"相对 {baseline['meta'].get('commit')} 的回归（阈值 {args.threshold:.0%}）：")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"相对 {baseline['meta'].get('commit')} 无回归（阈值 {args.threshold:.0%}）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,410 @@
+# benchmarks/loadgen.py
+"""
+闭环压测：估算单个实例能支撑多少在线用户
+
+1. 准备用户：--users-via insert 直接写库（需要 --database-url，与服务端同一个库），
+   或 --users-via register 调用 /api/auth/register 注册（默认角色 RESEARCHER）；
+2. 逐个调用 /api/auth/login 取得 JWT；
+3. --connections 个长连接按 --mix 的比例请求各接口，总速率为 --rate（每秒请求数，0 表示不限速）。
+   闭环：每个连接收到响应后才发下一个请求；服务端跟不上时实际速率低于目标，
+   "落后" 列为请求实际发出时间相对计划时间的延后（持续增大说明已饱和）。
+
+每 --interval 秒输出一行吞吐量、延迟分位数与错误率，结束后按接口汇总；--output 写出 JSON。
+
+    python benchmarks/loadgen.py                                    # 在临时 SQLite 上启动 serve.py 并压测
+    python benchmarks/loadgen.py --rate 200 --connections 32 --duration 60
+    python benchmarks/loadgen.py --url http://10.0.0.5:7878 --users-via register --users 200 \\
+        --admin-username admin --admin-password ****
+    python benchmarks/loadgen.py --url http://127.0.0.1:7878 --database-url "mysql+pymysql://..." \\
+        --mix record-access=70,profile=10,history=15,admin-list=5
+
+接口（--mix 中的名称）：
+    record-access   POST /api/audit/record-access
+    profile         GET  /api/auth/profile
+    history         GET  /api/data_management/<追踪表>/user/<本人 id>   （五张追踪表轮换）
+    admin-list      GET  /api/users/users?page=N                         （管理员 token）
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.serve_throughput import _free_port, wait_ready  # noqa: E402
+
+DEFAULT_MIX = "record-access=60,profile=15,history=20,admin-list=5"
+TRACKERS = ("access-success", "operation-behavior", "data-sensitivity", "access-period", "access-location")
+_TIMEOUT = 30
+
+
+def _percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p))]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"未知接口 {name}，可选：{', '.join(OPERATIONS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# ─────────────────────────── HTTP ───────────────────────────
+class Target:
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.https = parts.scheme == "https"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.https else 80)
+
+    def connect(self):
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=_TIMEOUT)
+
+
+def _call(conn, method, path, token=None, body=None):
+    """返回 (状态码, 解析后的 JSON 或 None)"""
+    headers = {"Accept-Encoding": "identity"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    payload = None
+    if body is not None:
+        payload = json.dumps(body).encode()
+        headers["Content-Type"] = "application/json"
+    conn.request(method, path, body=payload, headers=headers)
+    resp = conn.getresponse()
+    data = resp.read()
+    try:
+        return resp.status, json.loads(data) if data else None
+    except ValueError:
+        return resp.status, None
+
+
+class Session:
+    """一个已登录的合成用户"""
+
+    def __init__(self, user_id, token):
+        self.user_id = user_id
+        self.token = token
+
+
+def _op_record_access(conn, session, admin, rng):
+    return _call(conn, "POST", "/api/audit/record-access", session.token, {
+        "operation_type": rng.choice(("view", "view", "view", "copy", "download")),
+        "sensitivity_level": rng.randint(1, 4),
+    })[0]
+
+
+def _op_profile(conn, session, admin, rng):
+    return _call(conn, "GET", "/api/auth/profile", session.token)[0]
+
+
+def _op_history(conn, session, admin, rng):
+    path = f"/api/data_management/{rng.choice(TRACKERS)}/user/{session.user_id}"
+    return _call(conn, "GET", path, session.token)[0]
+
+
+def _op_admin_list(conn, session, admin, rng):
+    return _call(conn, "GET", f"/api/users/users?page={rng.randint(1, 5)}&per_page=20", admin.token)[0]
+
+
+OPERATIONS = {
+    "record-access": _op_record_access,
+    "profile": _op_profile,
+    "history": _op_history,
+    "admin-list": _op_admin_list,
+}
+
+
+# ─────────────────────────── 准备用户 ───────────────────────────
+def insert_users(database_url, count, days, prefix):
+    """直接写库，返回 ([(用户名, 密码)...], (管理员用户名, 密码))"""
+    os.environ["DATABASE_URL"] = database_url
+    from app import create_app
+    from benchmarks.seed import BENCH_PASSWORD, seed_dataset, username_of
+    from utils.extensions import db
+    import models  # noqa: F401  注册全部模型
+
+    app = create_app("production", blueprints=())
+    with app.app_context():
+        db.create_all()
+        seed_dataset(users=count + 1, days=days, scale=0, prefix=prefix, roles=("RESEARCHER",))
+        db.engine.dispose()
+    users = [(username_of(i, prefix), BENCH_PASSWORD) for i in range(1, count + 1)]
+    return users, (username_of(0, prefix), BENCH_PASSWORD)
+
+
+def register_users(target, count, role, prefix, concurrency):
+    password = f"pw-{uuid.uuid4().hex[:12]}"
+
+    def register(i):
+        conn = target.connect()
+        try:
+            username = f"{prefix}{i:06d}"
+            status, data = _call(conn, "POST", "/api/auth/register", body={
+                "username": username, "password": password, "name": f"压测用户{i}",
+                "age": 30, "gender": "女" if i % 2 else "男", "role": role,
+            })
+            if status != 200 or not data or data.get("status") != "ok":
+                raise RuntimeError(f"注册 {username} 失败：{status} {data}")
+            return username, password
+        finally:
+            conn.close()
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(register, range(count)))
+
+
+def login_all(target, credentials, concurrency):
+    """并发登录，返回 ([Session...], 登录延迟列表)"""
+    latencies = []
+
+    def login(credential):
+        conn = target.connect()
+        try:
+            start = time.perf_counter()
+            status, data = _call(conn, "POST", "/api/auth/login",
+                                 body={"username": credential[0], "password": credential[1]})
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                raise RuntimeError(f"登录 {credential[0]} 失败：{status} {data}")
+            result = data["result"]
+            return Session(result["user"]["id"], result["access_token"])
+        finally:
+            conn.close()
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(login, credentials)), latencies
+
+
+# ─────────────────────────── 压测 ───────────────────────────
+class Pacer:
+    """按目标总速率分配发送时刻（各连接共享），rate <= 0 时不限速"""
+
+    def __init__(self, rate, start):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = start
+        self._lock = threading.Lock()
+
+    def next_slot(self):
+        with self._lock:
+            slot = self._next
+            self._next += self.interval
+        return slot
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = []  # (完成时刻, 接口, 延迟秒, 是否成功, 落后秒)
+        self.statuses = Counter()
+
+    def add(self, done, name, latency, ok, lag, status):
+        with self._lock:
+            self.samples.append((done, name, latency, ok, lag))
+            self.statuses[status] += 1
+
+    def since(self, index):
+        with self._lock:
+            return self.samples[index:], len(self.samples)
+
+
+def _summarize(samples, seconds):
+    latencies = sorted(s[2] * 1000 for s in samples)
+    errors = sum(1 for s in samples if not s[3])
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / seconds, 1) if seconds > 0 else 0.0,
+        "p50_ms": round(_percentile(latencies, 0.50), 2),
+        "p95_ms": round(_percentile(latencies, 0.95), 2),
+        "p99_ms": round(_percentile(latencies, 0.99), 2),
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "max_lag_ms": round(max((s[4] for s in samples), default=0.0) * 1000, 1),
+    }
+
+
+def run_load(target, sessions, admin, mix, rate, connections, duration, interval, seed):
+    recorder = Recorder()
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    start = time.monotonic()
+    stop_at = start + duration
+    pacer = Pacer(rate, start)
+
+    def worker(index):
+        rng = random.Random(seed + index)
+        conn = target.connect()
+        while True:
+            slot = pacer.next_slot()
+            if slot >= stop_at or time.monotonic() >= stop_at:
+                break
+            delay = slot - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            lag = max(0.0, -delay) if pacer.interval else 0.0
+            name = rng.choices(names, weights)[0]
+            session = sessions[rng.randrange(len(sessions))]
+            begin = time.perf_counter()
+            try:
+                status = OPERATIONS[name](conn, session, admin, rng)
+            except (OSError, http.client.HTTPException):
+                status = "连接错误"
+                conn.close()
+                conn = target.connect()
+            recorder.add(time.monotonic() - start, name, time.perf_counter() - begin,
+                         isinstance(status, int) and status < 400, lag, status)
+        conn.close()
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(connections)]
+    for t in threads:
+        t.start()
+
+    print(f"{'时间':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'错误率':>7} {'落后':>8}")
+    timeline = []
+    seen = 0
+    window_start = start
+    while window_start < stop_at:
+        window_end = min(window_start + interval, stop_at)
+        time.sleep(max(0.0, window_end - time.monotonic()))
+        window, seen = recorder.since(seen)
+        row = _summarize(window, window_end - window_start)
+        row["t"] = round(window_end - start, 1)
+        timeline.append(row)
+        print(f"{row['t']:>5.0f}s {row['rps']:>8.1f} {row['p50_ms']:>8.1f} {row['p95_ms']:>8.1f} "
+              f"{row['p99_ms']:>8.1f} {row['error_rate']:>7.1%} {row['max_lag_ms']:>6.0f}ms")
+        window_start = window_end
+    for t in threads:  # 结束时仍在途的请求只计入汇总
+        t.join()
+
+    elapsed = time.monotonic() - start
+    per_name = defaultdict(list)
+    for sample in recorder.samples:
+        per_name[sample[1]].append(sample)
+    return {
+        "elapsed": round(elapsed, 2),
+        "total": _summarize(recorder.samples, elapsed),
+        "endpoints": {name: _summarize(samples, elapsed) for name, samples in per_name.items()},
+        "statuses": {str(k): v for k, v in recorder.statuses.items()},
+        "timeline": timeline,
+    }
+
+
+def spawn_server(database_url, server_name, port):
+    """未指定 --url 时：以子进程启动 serve.py（数据库为已写入用户的临时 SQLite 文件）"""
+    cmd = [sys.executable, os.path.join(ROOT_DIR, "serve.py"), "--host", "127.0.0.1", "--port", str(port)]
+    if server_name:
+        cmd += ["--server", server_name]
+    env = dict(os.environ, DATABASE_URL=database_url, FLASK_ENV="production")
+    server = subprocess.Popen(cmd, cwd=ROOT_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+    except RuntimeError:
+        server.terminate()
+        raise
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="闭环压测")
+    parser.add_argument("--url", help="服务地址；不指定时在临时 SQLite 上启动 serve.py")
+    parser.add_argument("--server", choices=("gunicorn", "waitress"), help="自动启动时使用的服务器")
+    parser.add_argument("--users", type=int, default=50, help="合成用户数")
+    parser.add_argument("--users-via", choices=("insert", "register"), default="insert")
+    parser.add_argument("--database-url", help="insert 方式写入的数据库（与服务端相同）")
+    parser.add_argument("--days", type=int, default=30, help="insert 方式生成的追踪历史天数")
+    parser.add_argument("--role", default="RESEARCHER", help="register 方式注册的角色")
+    parser.add_argument("--admin-username", help="register 方式下 admin-list 使用的管理员账号")
+    parser.add_argument("--admin-password")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"接口比例，默认 {DEFAULT_MIX}")
+    parser.add_argument("--rate", type=float, default=0, help="目标总速率（请求/秒），0 表示不限速")
+    parser.add_argument("--connections", type=int, default=16, help="并发长连接数")
+    parser.add_argument("--duration", type=float, default=30.0, help="压测秒数")
+    parser.add_argument("--interval", type=float, default=5.0, help="输出间隔秒数")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="结果 JSON 文件")
+    args = parser.parse_args(argv)
+
+    spawn = not args.url
+    if spawn:
+        if args.users_via != "insert":
+            parser.error("自动启动服务时只支持 --users-via insert")
+        args.database_url = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='loadgen_'), 'loadgen.db')}"
+        args.url = f"http://127.0.0.1:{_free_port()}"
+    elif args.users_via == "insert" and not args.database_url:
+        parser.error("--users-via insert 需要 --database-url（服务端使用的数据库）")
+
+    target = Target(args.url)
+    prefix = f"lg{uuid.uuid4().hex[:6]}_"
+    mix = dict(args.mix)
+    if args.users_via == "insert":
+        credentials, admin_credential = insert_users(args.database_url, args.users, args.days, prefix)
+    else:
+        credentials = None
+        admin_credential = (args.admin_username, args.admin_password) if args.admin_username else None
+
+    server = spawn_server(args.database_url, args.server, target.port) if spawn else None
+    try:
+        if credentials is None:
+            credentials = register_users(target, args.users, args.role, prefix, args.connections)
+        if admin_credential is None and mix.pop("admin-list", None) is not None:
+            print("未提供管理员账号，跳过 admin-list")
+        if not mix:
+            parser.error("--mix 中没有可执行的接口")
+
+        started = time.perf_counter()
+        sessions, login_latencies = login_all(target, credentials, args.connections)
+        admin = login_all(target, [admin_credential], 1)[0][0] if admin_credential else None
+        login_latencies.sort()
+        print(f"{len(sessions)} 个用户已登录，用时 {time.perf_counter() - started:.1f} s，"
+              f"登录 p50 {_percentile(login_latencies, 0.5) * 1000:.0f} ms；"
+              f"目标速率 {args.rate or '不限'} req/s，{args.connections} 个连接，{args.duration:.0f} s")
+
+        result = run_load(target, sessions, admin, mix, args.rate, args.connections,
+                          args.duration, args.interval, args.seed)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=60)
+
+    print(f"\n{'接口':<14} {'请求数':>8} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'错误率':>7}")
+    for name, row in [*sorted(result["endpoints"].items()), ("合计", result["total"])]:
+        print(f"{name:<14} {row['requests']:>8} {row['rps']:>8.1f} {row['p50_ms']:>8.1f} "
+              f"{row['p95_ms']:>8.1f} {row['p99_ms']:>8.1f} {row['error_rate']:>7.1%}")
+    print(f"状态码：{result['statuses']}")
+
+    if args.output:
+        report = {
+            "meta": {
+                "url": args.url, "users": len(sessions), "mix": mix, "rate": args.rate,
+                "connections": args.connections, "duration": args.duration,
+                "timestamp": datetime.utcnow().isoformat(),
+            },
+            "login_p50_ms": round(_percentile(login_latencies, 0.5) * 1000, 1),
+            **result,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+# benchmarks/seed.py
+"""
+基准数据生成：按规模批量插入用户、组、追踪历史与 ICD-10 编码（绕过接口，直接 INSERT）
+
+规模 scale=1 时：100 个用户（1 个管理员 + 研究员 + 医生）、10 个组、每人 days 天的追踪历史、
+1000 条 ICD-10 编码。所有用户的密码相同（只计算一次哈希）。
+"""
+import random
+from datetime import datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+from modules.auth.models import Group, Role, User, UserGroupRelation, UserRoleRelation
+from modules.data_management.models import (
+    AccessLocationTracker,
+    AccessSuccessTracker,
+    AccessTimeTracker,
+    DataSensitivityTracker,
+    ICD10Code,
+    ICD10PinyinKey,
+    OperationBehaviorTracker,
+)
+from modules.icd10.pinyin import pinyin_key_rows
+from utils.extensions import db
+
+BENCH_PASSWORD = "bench-password"
+ROLE_CODES = ("ADMIN", "RESEARCHER", "FAMILY_DOCTOR", "ATTENDING_DOCTOR", "PATIENT")
+_ICD10_TERMS = (
+    "霍乱", "伤寒", "结核", "肺炎", "糖尿病", "高血压", "心力衰竭", "哮喘", "胃炎", "肝炎",
+    "cholera", "typhoid", "tuberculosis", "pneumonia", "diabetes", "hypertension",
+    "heart failure", "asthma", "gastritis", "hepatitis",
+)
+_BATCH = 2000
+
+
+def _insert(model, rows):
+    for start in range(0, len(rows), _BATCH):
+        db.session.execute(db.insert(model), rows[start:start + _BATCH])
+
+
+def username_of(index, prefix="bench"):
+    return f"{prefix}{index:06d}"
+
+
+def seed_dataset(scale=1, days=30, users=None, seed=42, prefix="bench", roles=None):
+    """
+    在当前 app_context 中插入数据，返回 {"users": [user_id...], "admin_id": ..., "icd10": n}。
+    user_id 列表中第一个为管理员，其余为普通用户（默认研究员 / 医生 / 患者轮换，可用 roles 指定）；
+    用户名为 username_of(序号, prefix)，重复生成时换用不同的 prefix。
+    """
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    today = now.date()
+    n_users = users or 100 * scale
+    n_groups = max(1, n_users // 10)
+
+    role_rows = {}
+    for code in dict.fromkeys((*ROLE_CODES, *(roles or ()))):
+        role = Role.query.filter_by(role_code=code).first()
+        if role is None:
+            role = Role(role_code=code, role_name=code)
+            db.session.add(role)
+        role_rows[code] = role
+    groups = [Group(group_name=f"医院{i:04d}", member_count=0, active_member_count=0)
+              for i in range(n_groups)]
+    db.session.add_all(groups)
+    db.session.flush()
+
+    password = generate_password_hash(BENCH_PASSWORD)
+    first_id = (db.session.query(db.func.max(User.id)).scalar() or 0) + 1
+    _insert(User, [
+        {"id": first_id + i, "username": username_of(i, prefix), "password": password,
+         "name": f"用户{i}", "age": 20 + i % 50, "gender": "男" if i % 2 else "女",
+         "enable": True, "created_time": now, "updated_time": now}
+        for i in range(n_users)
+    ])
+    user_ids = [first_id + i for i in range(n_users)]
+
+    role_cycle = tuple(roles) if roles else ROLE_CODES[1:]
+    _insert(UserRoleRelation, [
+        {"user_id": uid, "role_id": role_rows["ADMIN" if i == 0 else role_cycle[i % len(role_cycle)]].id,
+         "created_time": now, "updated_time": now}
+        for i, uid in enumerate(user_ids)
+    ])
+    members = {}
+    group_rows = []
+    for i, uid in enumerate(user_ids):
+        group = groups[i % n_groups]
+        members[group.id] = members.get(group.id, 0) + 1
+        group_rows.append({"user_id": uid, "group_id": group.id, "type": "base", "enable": True,
+                           "created_time": now, "updated_time": now})
+    _insert(UserGroupRelation, group_rows)
+    for group in groups:
+        group.member_count = group.active_member_count = members.get(group.id, 0)
+
+    def history(make):
+        rows = []
+        for uid in user_ids:
+            for d in range(days):
+                day = today - timedelta(days=d)
+                rows.append({"user_id": uid, "date_recorded": day,
+                             "created_time": now, "updated_time": now, **make()})
+        return rows
+
+    r = rng.randint
+    _insert(AccessSuccessTracker, history(lambda: {"ast_num_as": r(0, 50), "ast_num_af": r(0, 5)}))
+    _insert(OperationBehaviorTracker, history(lambda: {
+        "ob_num_view": r(0, 40), "ob_num_copy": r(0, 5), "ob_num_download": r(0, 5),
+        "ob_num_add": r(0, 5), "ob_num_revise": r(0, 5), "ob_num_delete": r(0, 2),
+        "ob_a": 0.3, "ob_b": 0.3, "ob_c": 0.4,
+    }))
+    _insert(DataSensitivityTracker, history(lambda: {
+        "ds_num1": r(0, 30), "ds_num2": r(0, 10), "ds_num3": r(0, 5), "ds_num4": r(0, 2),
+        "ds_a": 1.0, "ds_b": 1.0, "ds_c": 1.0, "ds_d": 1.0,
+    }))
+    _insert(AccessTimeTracker, history(lambda: {"ap_num_ni": r(0, 40), "ap_num_ui": r(0, 3)}))
+    _insert(AccessLocationTracker, history(lambda: {"at_num_nd": r(0, 40), "at_num_ad": r(0, 3)}))
+
+    n_codes = 1000 * scale
+    codes = []
+    for i in range(n_codes):
+        chapter = f"{chr(ord('A') + i // 1000 % 26)}{i // 10 % 100:02d}"
+        term = _ICD10_TERMS[i % len(_ICD10_TERMS)]
+        codes.append({
+            "chapter": chapter, "subcategory": str(i % 10), "code": f"{chapter}{i % 10}{i // 26000 or ''}",
+            "description": f"{term} 第{i}型", "short_desc": term,
+            "created_time": now, "updated_time": now,
+        })
+    _insert(ICD10Code, codes)
+    _insert(ICD10PinyinKey, [
+        key
+        for code_id, short_desc, description in db.session.query(
+            ICD10Code.id, ICD10Code.short_desc, ICD10Code.description
+        ).filter(~ICD10Code.pinyin_keys.any())
+        for key in pinyin_key_rows(code_id, short_desc, description)
+    ])
+    db.session.commit()
+    return {"users": user_ids, "admin_id": user_ids[0], "icd10": n_codes}
@@ -0,0 +1,160 @@
+# benchmarks/serve_throughput.py
+"""
+生产服务器吞吐量基准
+
+在子进程中以 serve.py 启动服务（数据库为临时 SQLite 文件，已建表并插入角色数据），
+用多个保持长连接的 http.client 线程并发请求，统计每秒请求数与延迟分位数。
+
+    python benchmarks/serve_throughput.py                         # gunicorn 默认参数
+    python benchmarks/serve_throughput.py --server waitress --threads 8
+    python benchmarks/serve_throughput.py --workers 4 --threads 4 --duration 20
+
+请求的接口：
+    /health               不访问数据库
+    /api/users/roles      管理员接口，JWT 鉴权 + 一次查询（不带 If-None-Match）
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+ENDPOINTS = ("/health", "/api/users/roles")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def prepare_database(path):
+    """建表、插入角色，并签发一个管理员 token"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    from flask_jwt_extended import create_access_token
+
+    from app import create_app
+    from modules.auth.models import Role
+    from utils.extensions import db
+    import models  # noqa: F401  注册全部模型
+
+    app = create_app("production", blueprints=())
+    with app.app_context():
+        db.create_all()
+        for code in ("PATIENT", "FAMILY_DOCTOR", "RESEARCHER", "ADMIN"):
+            db.session.add(Role(role_code=code, role_name=code))
+        db.session.commit()
+        token = create_access_token(
+            identity="1", additional_claims={"user_id": 1, "role_code": "ADMIN"}
+        )
+        db.engine.dispose()
+    return token
+
+
+def wait_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("服务未能在限定时间内启动")
+
+
+def run_load(port, path, headers, concurrency, duration):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def worker():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        local = []
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status != 200:
+                    errors[0] += 1
+            except (OSError, http.client.HTTPException):
+                errors[0] += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+                continue
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / duration,
+        "p50_ms": pct(0.50),
+        "p99_ms": pct(0.99),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="生产服务器吞吐量基准")
+    parser.add_argument("--server", choices=("gunicorn", "waitress"), default="gunicorn")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--threads", type=int)
+    parser.add_argument("--concurrency", type=int, default=16, help="客户端并发连接数")
+    parser.add_argument("--duration", type=float, default=10.0, help="每个接口的压测秒数")
+    args = parser.parse_args(argv)
+
+    tmpdir = tempfile.mkdtemp(prefix="serve_bench_")
+    db_path = os.path.join(tmpdir, "bench.db")
+    token = prepare_database(db_path)
+    port = _free_port()
+
+    cmd = [sys.executable, os.path.join(ROOT_DIR, "serve.py"), "--server", args.server,
+           "--host", "127.0.0.1", "--port", str(port)]
+    if args.workers:
+        cmd += ["--workers", str(args.workers)]
+    if args.threads:
+        cmd += ["--threads", str(args.threads)]
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", FLASK_ENV="production")
+    server = subprocess.Popen(cmd, cwd=ROOT_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(port)
+        print(f"server={args.server} workers={args.workers or 'default'} "
+              f"threads={args.threads or 'default'} concurrency={args.concurrency} "
+              f"cpus={os.cpu_count()}")
+        headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": "identity"}
+        for path in ENDPOINTS:
+            result = run_load(port, path, headers, args.concurrency, args.duration)
+            print(f"{path:<20} {result['rps']:>8.1f} req/s  p50 {result['p50_ms']:.1f} ms  "
+                  f"p99 {result['p99_ms']:.1f} ms  requests {result['requests']}  "
+                  f"errors {result['errors']}")
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/startup.py
+"""
+冷启动基准：在全新的子进程中测量 `import app` 与 `create_app()` 的耗时
+
+    python benchmarks/startup.py                        # 完整应用，重复 7 次
+    python benchmarks/startup.py --blueprints none      # 不注册蓝图（初始化脚本 / CLI 场景）
+    python benchmarks/startup.py --blueprints auth,audit
+    python benchmarks/startup.py --budget 900           # 中位数总耗时超过 900 ms 时以非零状态退出
+
+--budget 可直接用于 CI，作为启动耗时的回归检查。
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 在子进程中执行，结果以 JSON 输出到最后一行
+_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+create_app({config!r}, blueprints={blueprints!r})
+t2 = time.perf_counter()
+print(json.dumps({{"import_ms": (t1 - t0) * 1000, "create_ms": (t2 - t1) * 1000,
+                  "modules": len(sys.modules)}}))
+"""
+
+
+def measure_once(config_name, blueprints):
+    code = _PROBE.format(config=config_name, blueprints=blueprints)
+    started = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(started.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="测量冷启动耗时")
+    parser.add_argument("--config", default="testing", help="配置名称（默认 testing，使用 SQLite 内存库）")
+    parser.add_argument("--blueprints", default="all", help="all / none / 逗号分隔的蓝图名称")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--budget", type=float, help="中位数总耗时上限（毫秒）")
+    args = parser.parse_args(argv)
+
+    if args.blueprints == "all":
+        blueprints = None
+    elif args.blueprints == "none":
+        blueprints = ()
+    else:
+        blueprints = tuple(args.blueprints.split(","))
+
+    runs = [measure_once(args.config, blueprints) for _ in range(args.repeat)]
+    imports = [r["import_ms"] for r in runs]
+    creates = [r["create_ms"] for r in runs]
+    totals = [i + c for i, c in zip(imports, creates)]
+
+    print(f"blueprints={args.blueprints} config={args.config} repeat={args.repeat} "
+          f"modules={runs[-1]['modules']}")
+    for label, values in (("import app", imports), ("create_app", creates), ("total", totals)):
+        print(f"{label:<12} median {statistics.median(values):7.1f} ms  "
+              f"min {min(values):7.1f} ms  max {max(values):7.1f} ms")
+
+    median_total = statistics.median(totals)
+    if args.budget is not None and median_total > args.budget:
+        print(f"✗ 启动耗时 {median_total:.1f} ms 超出预算 {args.budget:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
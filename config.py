@@ -23,7 +23,9 @@ class Config:
     DB_PASSWORD_ENCODED = quote(DB_PASSWORD)
 
     # SQLAlchemy 配置
-    SQLALCHEMY_DATABASE_URI = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD_ENCODED}@{DB_HOST}:{DB_PORT}/{DB_NAME}?charset=utf8mb4"
+    # 可用 DATABASE_URL 直接指定完整连接串（如本地调试用 sqlite:///primary.db）
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
+        f"mysql+pymysql://{DB_USER}:{DB_PASSWORD_ENCODED}@{DB_HOST}:{DB_PORT}/{DB_NAME}?charset=utf8mb4"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_recycle': 300,
@@ -32,6 +34,12 @@ class Config:
         'max_overflow': 20
     }
 
+    # 只读副本：逗号分隔的连接串，注册为 replica_0、replica_1 … 等 bind
+    # GET 请求（或 @read_only 视图）的查询会路由到副本，发生写入后回到主库
+    DB_REPLICA_URIS = [u.strip() for u in os.environ.get('DB_REPLICA_URIS', '').split(',') if u.strip()]
+    SQLALCHEMY_BINDS = {f'replica_{i}': uri for i, uri in enumerate(DB_REPLICA_URIS)}
+    DB_REPLICA_FOR_GET = os.environ.get('DB_REPLICA_FOR_GET', 'True').lower() == 'true'
+
     # JWT配置
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(seconds=int(os.environ.get('JWT_ACCESS_TOKEN_EXPIRES', 86400)))
@@ -41,6 +49,99 @@ class Config:
     APP_HOST = os.environ.get('APP_HOST', '0.0.0.0')
     APP_PORT = int(os.environ.get('APP_PORT', 7878))
 
+    # ETag 配置：表版本种子（COUNT/MAX(updated_time)）的刷新间隔，秒
+    ETAG_SEED_TTL = int(os.environ.get('ETAG_SEED_TTL', 5))
+
+    # 响应压缩配置（brotli / zstandard 为可选依赖，未安装时仅使用 gzip）
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'True').lower() == 'true'
+    COMPRESS_ALGORITHMS = os.environ.get('COMPRESS_ALGORITHMS', 'br,zstd,gzip').split(',')
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))  # 字节
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))  # gzip 压缩级别
+    COMPRESS_BR_LEVEL = int(os.environ.get('COMPRESS_BR_LEVEL', 4))
+    COMPRESS_ZSTD_LEVEL = int(os.environ.get('COMPRESS_ZSTD_LEVEL', 3))
+
+    # 组成员列表分页（请求带 limit 或 after 时生效，都不带时返回全部成员）
+    GROUP_USERS_PAGE_SIZE = int(os.environ.get('GROUP_USERS_PAGE_SIZE', 100))
+    GROUP_USERS_MAX_PAGE_SIZE = int(os.environ.get('GROUP_USERS_MAX_PAGE_SIZE', 1000))
+
+    # 分页计数模式：exact / cached / none（可由请求参数 count 覆盖）
+    PAGINATION_COUNT_MODE = os.environ.get('PAGINATION_COUNT_MODE', 'exact')
+    PAGINATION_COUNT_CACHE_TTL = int(os.environ.get('PAGINATION_COUNT_CACHE_TTL', 30))  # 秒
+    PAGINATION_COUNT_CACHE_SIZE = int(os.environ.get('PAGINATION_COUNT_CACHE_SIZE', 1024))
+
+    # 用户搜索：index 使用进程内 n-gram 索引；like 使用数据库 LIKE '%x%'
+    USER_SEARCH_BACKEND = os.environ.get('USER_SEARCH_BACKEND', 'index')
+    USER_SEARCH_MAX_RESULTS = int(os.environ.get('USER_SEARCH_MAX_RESULTS', 1000))
+    USER_SEARCH_REFRESH_INTERVAL = int(os.environ.get('USER_SEARCH_REFRESH_INTERVAL', 10))  # 秒
+
+    # 批量导入用户
+    BULK_IMPORT_MAX_ROWS = int(os.environ.get('BULK_IMPORT_MAX_ROWS', 10000))
+    BULK_IMPORT_CHUNK_SIZE = int(os.environ.get('BULK_IMPORT_CHUNK_SIZE', 500))
+    BULK_IMPORT_HASH_WORKERS = int(os.environ.get('BULK_IMPORT_HASH_WORKERS', os.cpu_count() or 1))
+    BULK_IMPORT_PARALLEL_MIN = int(os.environ.get('BULK_IMPORT_PARALLEL_MIN', 32))  # 少于该数量时串行哈希
+
+    # 反向代理层数：大于 0 时信任相应层数的 X-Forwarded-For / X-Forwarded-Proto，
+    # 用于还原客户端 IP（访问 IP 异常判断依赖 request.remote_addr）
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+    PROXY_FIX_X_PROTO = int(os.environ.get('PROXY_FIX_X_PROTO', 0))
+
+    # 访问时间异常判断：按用户的“一周中的小时”活跃画像（168 个槽位）
+    # 当前小时及前后各 1 小时的访问占比低于阈值即视为异常；样本不足时一律视为正常
+    ACTIVITY_PROFILE_UTC_OFFSET = int(os.environ.get('ACTIVITY_PROFILE_UTC_OFFSET', 8))  # 小时，默认北京时间
+    ACTIVITY_UNUSUAL_THRESHOLD = float(os.environ.get('ACTIVITY_UNUSUAL_THRESHOLD', 0.01))
+    ACTIVITY_MIN_SAMPLES = int(os.environ.get('ACTIVITY_MIN_SAMPLES', 50))
+    ACTIVITY_PROFILE_FLUSH_INTERVAL = int(os.environ.get('ACTIVITY_PROFILE_FLUSH_INTERVAL', 30))  # 秒
+    ACTIVITY_PROFILE_TTL = int(os.environ.get('ACTIVITY_PROFILE_TTL', 300))  # 秒，缓存画像的重新加载间隔
+    ACTIVITY_PROFILE_CACHE_SIZE = int(os.environ.get('ACTIVITY_PROFILE_CACHE_SIZE', 10000))
+
+    # 追踪表按月分区与数据保留（见 modules/data_management/partitions.py）
+    TRACKER_RETENTION_MONTHS = int(os.environ.get('TRACKER_RETENTION_MONTHS', 24))
+    TRACKER_PARTITION_AHEAD_MONTHS = int(os.environ.get('TRACKER_PARTITION_AHEAD_MONTHS', 3))
+    TRACKER_EXPIRED_PARTITION_ACTION = os.environ.get('TRACKER_EXPIRED_PARTITION_ACTION', 'drop')  # drop / archive
+    # 历史查询未指定日期范围时默认查询最近多少天（保证查询带有分区键条件）
+    TRACKER_HISTORY_DEFAULT_DAYS = int(os.environ.get('TRACKER_HISTORY_DEFAULT_DAYS', 90))
+    # 追踪数据存储方式：split 五张追踪表 / wide 合并为 user_daily_metrics（见 modules/data_management/tracker_store.py）
+    TRACKER_STORAGE = os.environ.get('TRACKER_STORAGE', 'split')
+    # 冷数据归档（见 modules/data_management/archive.py）：早于该天数的行移入列式归档文件
+    TRACKER_ARCHIVE_AFTER_DAYS = int(os.environ.get('TRACKER_ARCHIVE_AFTER_DAYS', 365))
+    TRACKER_ARCHIVE_DIR = os.environ.get(
+        'TRACKER_ARCHIVE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archive')
+    )
+    TRACKER_ARCHIVE_ROW_GROUP_SIZE = int(os.environ.get('TRACKER_ARCHIVE_ROW_GROUP_SIZE', 8192))
+
+    # 采样式性能剖析（见 utils/profiler.py，/api/diagnostics/profiler）
+    PROFILER_OUTPUT_DIR = os.environ.get(
+        'PROFILER_OUTPUT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+    )
+    PROFILER_DEFAULT_HZ = int(os.environ.get('PROFILER_DEFAULT_HZ', 50))
+    PROFILER_MAX_HZ = int(os.environ.get('PROFILER_MAX_HZ', 200))
+    PROFILER_DEFAULT_DURATION = int(os.environ.get('PROFILER_DEFAULT_DURATION', 30))  # 秒
+    PROFILER_MAX_DURATION = int(os.environ.get('PROFILER_MAX_DURATION', 300))  # 秒
+
+    # 慢查询记录（见 utils/query_watch.py，/api/diagnostics/slow-queries）
+    QUERY_WATCH_ENABLED = os.environ.get('QUERY_WATCH_ENABLED', 'True').lower() == 'true'
+    QUERY_WATCH_THRESHOLD_MS = float(os.environ.get('QUERY_WATCH_THRESHOLD_MS', 200))
+    QUERY_WATCH_EXPLAIN = os.environ.get('QUERY_WATCH_EXPLAIN', 'True').lower() == 'true'
+    QUERY_WATCH_EXPLAIN_CACHE_SIZE = int(os.environ.get('QUERY_WATCH_EXPLAIN_CACHE_SIZE', 512))
+    QUERY_WATCH_RECENT_SIZE = int(os.environ.get('QUERY_WATCH_RECENT_SIZE', 200))
+
+    # ICD-10 查询（见 modules/icd10/，/api/icd10）
+    ICD10_SEARCH_DEFAULT_LIMIT = int(os.environ.get('ICD10_SEARCH_DEFAULT_LIMIT', 20))
+    ICD10_SEARCH_MAX_LIMIT = int(os.environ.get('ICD10_SEARCH_MAX_LIMIT', 100))
+    ICD10_CACHE_MAX_AGE = int(os.environ.get('ICD10_CACHE_MAX_AGE', 86400))  # 秒，浏览 / 查询响应的 Cache-Control
+    # 容错检索（/api/icd10/search?mode=fuzzy，见 modules/icd10/fuzzy_index.py）
+    ICD10_FUZZY_ENABLED = os.environ.get('ICD10_FUZZY_ENABLED', 'True').lower() == 'true'
+    ICD10_FUZZY_MIN_SIMILARITY = float(os.environ.get('ICD10_FUZZY_MIN_SIMILARITY', 0.3))
+    ICD10_FUZZY_MAX_EDITS = int(os.environ.get('ICD10_FUZZY_MAX_EDITS', 2))
+    # 批量校验（POST /api/icd10/validate，见 modules/icd10/code_set.py）
+    ICD10_VALIDATE_MAX_CODES = int(os.environ.get('ICD10_VALIDATE_MAX_CODES', 5000))  # 单次请求的编码数上限
+    ICD10_VALIDATE_MAX_CODE_LENGTH = int(os.environ.get('ICD10_VALIDATE_MAX_CODE_LENGTH', 32))  # 单个编码字符串的长度上限
+    ICD10_VALIDATE_SUGGESTIONS = int(os.environ.get('ICD10_VALIDATE_SUGGESTIONS', 3))  # 每个无效编码的建议数
+
+    # /metrics 指标端点：需携带 Authorization: Bearer <METRICS_TOKEN>；未设置 METRICS_TOKEN 时不启用
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
     # CORS配置
     CORS_ORIGINS = [
         'http://localhost:3000',
@@ -72,6 +173,7 @@ class ProductionConfig(Config):
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}  # SQLite 内存库使用 StaticPool，不支持 pool_size 等参数
 
 
 # 配置字典
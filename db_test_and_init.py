@@ -76,6 +76,13 @@ def load_initial_data(app) -> None:
                 db.session.rollback()
                 print(f"✗ 处理 {py.name} 时出错，已回滚：{e}")
 
+        # 初始数据直接写入了 user_group_relation，需校准组成员冗余计数
+        from modules.user_management.group_counters import reconcile_group_counters
+
+        fixed = reconcile_group_counters()
+        db.session.commit()
+        print(f"✓ 已校准 {fixed} 个组的成员计数")
+
     print("=" * 50)
     print("初始数据插入流程结束")
     print("=" * 50)
@@ -115,7 +122,7 @@ def test_database_connection_and_initialize() -> bool:
         print("开始创建表...")
         print("=" * 50)
 
-        flask_app = create_app("default")
+        flask_app = create_app("default", blueprints=())  # 只需模型，不加载路由
         with flask_app.app_context():
             db.create_all()
             print("✓ 表创建完毕")
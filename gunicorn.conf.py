@@ -0,0 +1,50 @@
+# gunicorn.conf.py
+"""
+gunicorn 配置：gunicorn -c gunicorn.conf.py wsgi:app
+
+环境变量：
+    APP_HOST / APP_PORT     监听地址（与 config.py 一致）
+    WEB_WORKERS             worker 进程数，默认 CPU 数 * 2 + 1
+    WEB_THREADS             每个 worker 的线程数，默认 4（gthread）
+    WEB_PRELOAD             是否在主进程预加载应用并预热缓存，默认 true
+    WEB_GRACEFUL_TIMEOUT    优雅退出等待秒数，默认 30
+"""
+import gc
+import multiprocessing
+import os
+import sys
+
+bind = f"{os.getenv('APP_HOST', '0.0.0.0')}:{os.getenv('APP_PORT', '7878')}"
+workers = int(os.getenv("WEB_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("WEB_THREADS", 4))
+worker_class = "gthread" if threads > 1 else "sync"
+preload_app = os.getenv("WEB_PRELOAD", "true").lower() == "true"
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", 30))
+timeout = int(os.getenv("WEB_TIMEOUT", 60))
+keepalive = 5
+accesslog = os.getenv("WEB_ACCESS_LOG") or None
+
+
+def when_ready(server):
+    # 预加载完成后冻结现有对象，减少 worker 中因引用计数写入导致的页面复制
+    if preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    # 子进程丢弃继承的连接池（不关闭父进程的连接），首次使用时重新建连；
+    # 非 preload 模式下应用尚未加载，无需处理
+    wsgi = sys.modules.get("wsgi")
+    if wsgi is not None:
+        from utils.lifecycle import dispose_engines
+
+        dispose_engines(wsgi.app, close=False)
+
+
+def worker_exit(server, worker):
+    # 优雅退出：刷写内存缓冲并释放连接
+    wsgi = sys.modules.get("wsgi")
+    if wsgi is not None:
+        from utils.lifecycle import run_shutdown
+
+        run_shutdown(wsgi.app)
@@ -1,6 +1,7 @@
 # initial_data/11_ICD-10.py
 """
 将 ICD‑10.csv 中的编码导入数据库。
+同时计算简短描述 / 长描述的拼音检索键（全拼与首字母，需安装 pypinyin，见 modules/icd10/pinyin.py）。
 """
 
 import csv
@@ -8,6 +9,7 @@ import os
 from datetime import datetime
 
 from modules.data_management.models import ICD10Code
+from modules.icd10.pinyin import available as pinyin_available, pinyin_keys
 
 
 def insert_data(db):
@@ -23,6 +25,9 @@ def insert_data(db):
         print(f"    错误: 未找到 {csv_path}，跳过 ICD‑10 导入。")
         return
 
+    if not pinyin_available():
+        print("    警告: 未安装 pypinyin，不生成拼音检索键；安装后执行 flask --app app icd10-pinyin 补齐。")
+
     total, inserted, skipped = 0, 0, 0
     with open(csv_path, newline="", encoding="utf-8") as f:
         reader = csv.reader(f)
@@ -50,6 +55,7 @@ def insert_data(db):
                     description=desc,
                     alt_desc=alt_desc,
                     short_desc=short_desc,
+                    pinyin_keys=pinyin_keys(short_desc, desc),
                     created_time=datetime.utcnow(),
                     updated_time=datetime.utcnow(),
                 )
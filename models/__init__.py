@@ -14,7 +14,7 @@ from modules.auth.models import *
 from modules.data_management.models import *
 
 __all__ = [
-    'User', 'Role', 'UserRoleRelation', 'Group', 'UserGroupRelation',
+    'User', 'Role', 'UserRoleRelation', 'Group', 'UserGroupRelation', 'GroupNetwork',
     'AccessSuccessTracker', 'OperationBehaviorTracker', 'DataSensitivityTracker',
-    'AccessTimeTracker', 'AccessLocationTracker'
+    'AccessTimeTracker', 'AccessLocationTracker', 'UserActivityProfile', 'UserDailyMetrics'
 ]
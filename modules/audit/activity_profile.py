@@ -0,0 +1,213 @@
+# modules/audit/activity_profile.py
+"""
+用户活跃时段画像：服务端判断“非常规时间访问”
+
+- 每个用户维护 168 个计数（一周中的小时，周一 0 点为槽位 0），时区由
+  ACTIVITY_PROFILE_UTC_OFFSET 指定；
+- 判断为 O(1)：当前小时及前后各 1 小时的计数之和占总数的比例低于
+  ACTIVITY_UNUSUAL_THRESHOLD 即视为异常；总数不足 ACTIVITY_MIN_SAMPLES 时视为正常；
+  判断基于本次访问之前的画像，之后再累加本次访问；
+- 画像缓存在进程内（LRU，ACTIVITY_PROFILE_CACHE_SIZE），新增计数先记在增量中，
+  每隔 ACTIVITY_PROFILE_FLUSH_INTERVAL 秒（由请求顺带触发）及进程退出时写回
+  user_activity_profile 表；写回后以库中合并了其他 worker 增量的值刷新本地画像。
+"""
+import json
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from modules.data_management.models import db, UserActivityProfile
+from utils.lifecycle import register_shutdown
+from utils.metrics import metrics
+
+SLOTS = 168
+_FLUSH_CHUNK_SIZE = 500
+
+
+def _zeros():
+    return array("I", bytes(4 * SLOTS))
+
+
+class _Profile:
+    __slots__ = ("counts", "total", "delta", "loaded_at")
+
+    def __init__(self, counts, total, loaded_at):
+        self.counts = counts  # array('I')，包含尚未写回的增量
+        self.total = total
+        self.delta = None  # 尚未写回的增量，无增量时为 None
+        self.loaded_at = loaded_at
+
+
+class ActivityProfileStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles = OrderedDict()  # user_id -> _Profile
+        self._dirty = set()
+        self._last_flush = time.monotonic()
+
+    @staticmethod
+    def slot_of(when, utc_offset):
+        """UTC 时间 -> 一周中的小时槽位"""
+        local = when + timedelta(hours=utc_offset)
+        return local.weekday() * 24 + local.hour
+
+    @staticmethod
+    def _classify(profile, slot, cfg):
+        if profile.total < cfg["ACTIVITY_MIN_SAMPLES"]:
+            return False
+        counts = profile.counts
+        # counts[slot - 1] 在 slot 为 0 时取到 167，恰好是上周日 23 点
+        window = counts[slot - 1] + counts[slot] + counts[(slot + 1) % SLOTS]
+        return window < cfg["ACTIVITY_UNUSUAL_THRESHOLD"] * profile.total
+
+    # ---------------- 缓存 ----------------
+    def _get(self, user_id, now):
+        ttl = current_app.config["ACTIVITY_PROFILE_TTL"]
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            if profile is not None and (
+                user_id in self._dirty or now - profile.loaded_at < ttl
+            ):
+                self._profiles.move_to_end(user_id)
+                return profile
+
+        row = db.session.get(UserActivityProfile, user_id)
+        counts = array("I", row.get_counts()) if row else _zeros()
+        total = row.total_count if row else 0
+
+        with self._lock:
+            profile = self._profiles.get(user_id)
+            if profile is not None and user_id in self._dirty:
+                return profile  # 加载期间其他线程已写入增量，保留现有画像
+            profile = self._profiles[user_id] = _Profile(counts, total, now)
+            self._profiles.move_to_end(user_id)
+            self._evict()
+            return profile
+
+    def _evict(self):
+        limit = current_app.config["ACTIVITY_PROFILE_CACHE_SIZE"]
+        for _ in range(len(self._profiles)):
+            if len(self._profiles) <= limit:
+                break
+            user_id, profile = self._profiles.popitem(last=False)
+            if user_id in self._dirty:
+                self._profiles[user_id] = profile  # 有未写回增量的画像不淘汰
+
+    # ---------------- 记录与判断 ----------------
+    def observe(self, user_id, when=None):
+        """记录一次访问，返回该访问是否处于非常规时间"""
+        cfg = current_app.config
+        slot = self.slot_of(when or datetime.utcnow(), cfg["ACTIVITY_PROFILE_UTC_OFFSET"])
+        profile = self._get(user_id, time.monotonic())
+        with self._lock:
+            unusual = self._classify(profile, slot, cfg)
+            profile.counts[slot] += 1
+            profile.total += 1
+            if profile.delta is None:
+                profile.delta = _zeros()
+            profile.delta[slot] += 1
+            self._dirty.add(user_id)
+        return unusual
+
+    def snapshot(self, user_id, when=None):
+        """返回 (counts, total, slot, is_unusual)，不记录访问"""
+        cfg = current_app.config
+        slot = self.slot_of(when or datetime.utcnow(), cfg["ACTIVITY_PROFILE_UTC_OFFSET"])
+        profile = self._get(user_id, time.monotonic())
+        with self._lock:
+            return list(profile.counts), profile.total, slot, self._classify(profile, slot, cfg)
+
+    # ---------------- 写回 ----------------
+    def maybe_flush(self):
+        interval = current_app.config["ACTIVITY_PROFILE_FLUSH_INTERVAL"]
+        if time.monotonic() - self._last_flush >= interval:
+            self.flush()
+
+    def _restore(self, pending):
+        """写回失败时把增量并回，等待下次写回"""
+        with self._lock:
+            for user_id, delta in pending.items():
+                profile = self._profiles.get(user_id)
+                if profile is None:
+                    profile = _Profile(array("I", delta), sum(delta), 0.0)
+                    self._profiles[user_id] = profile
+                if profile.delta is None:
+                    profile.delta = _zeros()
+                for i, n in enumerate(delta):
+                    profile.delta[i] += n
+                self._dirty.add(user_id)
+
+    def flush(self):
+        """把所有增量写回数据库，返回写回的用户数"""
+        with self._lock:
+            pending = {}
+            for user_id in self._dirty:
+                profile = self._profiles[user_id]
+                pending[user_id] = profile.delta
+                profile.delta = None
+            self._dirty.clear()
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+
+        merged = {}
+        try:
+            user_ids = list(pending)
+            for start in range(0, len(user_ids), _FLUSH_CHUNK_SIZE):
+                chunk = user_ids[start:start + _FLUSH_CHUNK_SIZE]
+                rows = {
+                    row.user_id: row
+                    for row in UserActivityProfile.query.filter(
+                        UserActivityProfile.user_id.in_(chunk)
+                    ).with_for_update()
+                }
+                for user_id in chunk:
+                    row = rows.get(user_id)
+                    if row is None:
+                        row = UserActivityProfile(user_id=user_id)
+                        db.session.add(row)
+                    counts = row.get_counts()
+                    for i, n in enumerate(pending[user_id]):
+                        counts[i] += n
+                    row.hour_counts = json.dumps(counts, separators=(",", ":"))
+                    row.total_count = sum(counts)
+                    merged[user_id] = counts
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception("写回用户活跃时段画像失败")
+            self._restore(pending)
+            return 0
+
+        now = time.monotonic()
+        with self._lock:
+            for user_id, counts in merged.items():
+                profile = self._profiles.get(user_id)
+                if profile is None:
+                    continue
+                fresh = array("I", counts)
+                if profile.delta is not None:  # 写回期间新增的访问
+                    for i, n in enumerate(profile.delta):
+                        fresh[i] += n
+                profile.counts = fresh
+                profile.total = sum(fresh)
+                profile.loaded_at = now
+        return len(merged)
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+            self._dirty.clear()
+
+
+activity_profiles = ActivityProfileStore()
+register_shutdown(activity_profiles.flush)
+metrics.register_gauge(
+    "activity_profile_dirty_users",
+    lambda: len(activity_profiles._dirty),
+    "活跃时段画像中尚未写回数据库的用户数",
+)
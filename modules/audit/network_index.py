@@ -0,0 +1,161 @@
+# modules/audit/network_index.py
+"""
+访问 IP -> 组（医院）的网段索引
+
+- 各组在 group_network 表登记 CIDR 网段；IPv4 / IPv6 分别编译为按起始地址排序、
+  互不重叠的整数区间，每个区间记录覆盖它的全部组（同一网段由多个组登记、嵌套网段
+  均保留外层组），相邻且组集合相同的区间合并，
+  查询时对起始地址数组二分查找，与网段数量无关；
+- IPv4 映射的 IPv6 地址（::ffff:a.b.c.d）按 IPv4 处理；
+- 索引缓存在进程内，以 group_network / group 两张表的 ETag 版本戳判断是否需要重建，
+  其他 worker 的修改在 ETAG_SEED_TTL 秒内生效。
+
+异常判断：用户所属（启用的）组登记了网段、且访问 IP 不在其中任一组的网段内时视为异常；
+所属组均未登记网段时无法判断，视为正常。
+"""
+import ipaddress
+import socket
+import threading
+from bisect import bisect_right
+
+from modules.auth.models import db, Group, GroupNetwork, UserGroupRelation
+from utils.etag import etag_registry
+
+_TABLES = ("group_network", "group")
+_NO_GROUPS = frozenset()
+
+
+def _flatten(intervals):
+    """
+    把 CIDR 区间 [(start, end, group_id)] 切分为互不重叠的有序区间 [(start, end, 组 ID 集合)]。
+    同一地址可能属于多个组（同一网段由多个组登记、或嵌套网段），集合包含覆盖该地址的全部组。
+    CIDR 之间只有包含或不相交两种关系，按 (start, -end) 排序后用栈即可完成。
+    """
+    intervals.sort(key=lambda x: (x[0], -x[1], x[2]))
+    out = []
+
+    def emit(start, end, groups):
+        if start > end or not groups:
+            return
+        if out and out[-1][2] == groups and out[-1][1] + 1 == start:
+            out[-1] = (out[-1][0], end, groups)
+        else:
+            out.append((start, end, groups))
+
+    stack = []  # [(end, group_id)]，外层网段在下
+    pos = 0
+
+    def covering():
+        return frozenset(group_id for _, group_id in stack)
+
+    for start, end, group_id in intervals:
+        while stack and stack[-1][0] < start:
+            top_end = stack[-1][0]
+            emit(pos, top_end, covering())
+            stack.pop()
+            pos = top_end + 1
+        if stack:
+            emit(pos, start - 1, covering())
+        stack.append((end, group_id))
+        pos = start
+    while stack:
+        top_end = stack[-1][0]
+        emit(pos, top_end, covering())
+        stack.pop()
+        pos = top_end + 1
+    return out
+
+
+class _Table:
+    """单一地址族的区间表"""
+
+    __slots__ = ("starts", "ends", "groups")
+
+    def __init__(self, intervals):
+        flat = _flatten(intervals)
+        # 使用列表而非 array：bisect 对列表有 C 层快速路径，比逐项比较 array 更快
+        self.starts = [s for s, _, _ in flat]
+        self.ends = [e for _, e, _ in flat]
+        self.groups = [g for _, _, g in flat]
+
+    def lookup(self, value):
+        i = bisect_right(self.starts, value) - 1
+        if i >= 0 and value <= self.ends[i]:
+            return self.groups[i]
+        return _NO_GROUPS
+
+    def __len__(self):
+        return len(self.groups)
+
+
+class NetworkIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._v4 = _Table([])
+        self._v6 = _Table([])
+        self._groups_with_networks = frozenset()
+        self._version = None
+
+    def rebuild(self, version=None):
+        rows = (
+            db.session.query(GroupNetwork.cidr, GroupNetwork.group_id)
+            .join(Group, Group.id == GroupNetwork.group_id)
+            .filter(GroupNetwork.enable.is_(True), Group.enable.is_(True))
+            .all()
+        )
+        v4, v6 = [], []
+        for cidr, group_id in rows:
+            try:
+                net = ipaddress.ip_network(cidr, strict=False)
+            except ValueError:
+                continue
+            target = v4 if net.version == 4 else v6
+            target.append((int(net.network_address), int(net.broadcast_address), group_id))
+        with self._lock:
+            self._v4 = _Table(v4)
+            self._v6 = _Table(v6)
+            self._groups_with_networks = frozenset(group_id for _, group_id in rows)
+            self._version = version
+
+    def ensure_fresh(self):
+        version = "|".join(etag_registry.version(t) for t in _TABLES)
+        if version != self._version:
+            self.rebuild(version)
+
+    def lookup(self, ip):
+        """返回登记了覆盖该 IP 的网段的组 ID 集合，不在任何网段内或 IP 非法时为空集合"""
+        try:
+            # 快速路径：IPv4 点分十进制
+            packed = socket.inet_pton(socket.AF_INET, ip)
+        except (OSError, TypeError):
+            pass
+        else:
+            return self._v4.lookup(int.from_bytes(packed, "big"))
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return _NO_GROUPS
+        if addr.version == 6 and addr.ipv4_mapped is not None:
+            addr = addr.ipv4_mapped
+        table = self._v4 if addr.version == 4 else self._v6
+        return table.lookup(int(addr))
+
+    def is_abnormal(self, user_id, ip):
+        """判断访问 IP 对该用户而言是否异常"""
+        self.ensure_fresh()
+        if not self._groups_with_networks:
+            return False
+        user_groups = {
+            gid for (gid,) in db.session.query(UserGroupRelation.group_id).filter_by(
+                user_id=user_id, enable=True
+            )
+        }
+        if not user_groups & self._groups_with_networks:
+            return False
+        return self.lookup(ip).isdisjoint(user_groups)
+
+    def stats(self):
+        return {"ipv4_ranges": len(self._v4), "ipv6_ranges": len(self._v6)}
+
+
+network_index = NetworkIndex()
@@ -1,141 +1,77 @@
 from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from modules.data_management.models import db, AccessSuccessTracker, OperationBehaviorTracker, DataSensitivityTracker, AccessTimeTracker, AccessLocationTracker
+from modules.data_management import tracker_store
 from modules.auth.decorators import admin_required, researcher_or_admin
-import uuid
+from modules.audit.activity_profile import activity_profiles
+from modules.audit.network_index import network_index
+from utils.pagination import paginate
+from datetime import datetime
 
 audit_bp = Blueprint('audit', __name__)
 
+_OPERATION_COLUMNS = {
+    'view': 'ob_num_view',
+    'copy': 'ob_num_copy',
+    'download': 'ob_num_download',
+    'add': 'ob_num_add',
+    'revise': 'ob_num_revise',
+    'delete': 'ob_num_delete',
+}
+_SENSITIVITY_COLUMNS = {1: 'ds_num1', 2: 'ds_num2', 3: 'ds_num3', 4: 'ds_num4'}
+
 
 @audit_bp.route('/record-access', methods=['POST'])
 @jwt_required()
 def record_access():
-    """记录访问行为"""
+    """
+    记录访问行为
+    是否处于非常规时间由服务端根据用户活跃时段画像判断，IP 是否异常根据所属组登记的网段判断，
+    忽略客户端传入的 is_unusual_time / is_abnormal_ip
+    """
     try:
-        user_id = get_jwt_identity()
+        user_id = int(get_jwt_identity())
         data = request.get_json()
 
         if not data:
             return jsonify({'error': '请求数据不能为空'}), 400
 
-        # 记录访问成功率
-        access_success = data.get('success', True)
-        ast_record = AccessSuccessTracker.query.filter_by(user_id=user_id).first()
-
-        if not ast_record:
-            ast_record = AccessSuccessTracker(
-                id=str(uuid.uuid4()),
-                user_id=user_id,
-                num_as=1 if access_success else 0,
-                num_af=0 if access_success else 1
-            )
-            db.session.add(ast_record)
-        else:
-            if access_success:
-                ast_record.num_as += 1
-            else:
-                ast_record.num_af += 1
-
-        # 记录操作行为
-        operation_type = data.get('operation_type', 'view')
-        ob_record = OperationBehaviorTracker.query.filter_by(user_id=user_id).first()
-
-        if not ob_record:
-            ob_record = OperationBehaviorTracker(
-                id=str(uuid.uuid4()),
-                user_id=user_id,
-                num_view=1 if operation_type == 'view' else 0,
-                num_copy=1 if operation_type == 'copy' else 0,
-                num_download=1 if operation_type == 'download' else 0,
-                num_add=1 if operation_type == 'add' else 0,
-                num_revise=1 if operation_type == 'revise' else 0,
-                num_delete=1 if operation_type == 'delete' else 0,
-                a=0.3,
-                b=0.3,
-                c=0.4
-            )
-            db.session.add(ob_record)
-        else:
-            if operation_type == 'view':
-                ob_record.num_view += 1
-            elif operation_type == 'copy':
-                ob_record.num_copy += 1
-            elif operation_type == 'download':
-                ob_record.num_download += 1
-            elif operation_type == 'add':
-                ob_record.num_add += 1
-            elif operation_type == 'revise':
-                ob_record.num_revise += 1
-            elif operation_type == 'delete':
-                ob_record.num_delete += 1
-
-        # 记录数据敏感度
-        sensitivity_level = data.get('sensitivity_level', 1)
-        ds_record = DataSensitivityTracker.query.filter_by(user_id=user_id).first()
-
-        if not ds_record:
-            ds_record = DataSensitivityTracker(
-                id=str(uuid.uuid4()),
-                user_id=user_id,
-                num1=1 if sensitivity_level == 1 else 0,
-                num2=1 if sensitivity_level == 2 else 0,
-                num3=1 if sensitivity_level == 3 else 0,
-                num4=1 if sensitivity_level == 4 else 0,
-                a=1.0,
-                b=1.0,
-                c=1.0,
-                d=1.0
-            )
-            db.session.add(ds_record)
-        else:
-            if sensitivity_level == 1:
-                ds_record.num1 += 1
-            elif sensitivity_level == 2:
-                ds_record.num2 += 1
-            elif sensitivity_level == 3:
-                ds_record.num3 += 1
-            elif sensitivity_level == 4:
-                ds_record.num4 += 1
-
-        # 记录访问时间
-        is_unusual_time = data.get('is_unusual_time', False)
-        ap_record = AccessTimeTracker.query.filter_by(user_id=user_id).first()
-
-        if not ap_record:
-            ap_record = AccessTimeTracker(
-                id=str(uuid.uuid4()),
-                user_id=user_id,
-                num_ni=0 if is_unusual_time else 1,
-                num_ui=1 if is_unusual_time else 0
-            )
-            db.session.add(ap_record)
-        else:
-            if is_unusual_time:
-                ap_record.num_ui += 1
-            else:
-                ap_record.num_ni += 1
-
-        # 记录访问IP
-        is_abnormal_ip = data.get('is_abnormal_ip', False)
-        at_record = AccessLocationTracker.query.filter_by(user_id=user_id).first()
-
-        if not at_record:
-            at_record = AccessLocationTracker(
-                id=str(uuid.uuid4()),
-                user_id=user_id,
-                num_nd=0 if is_abnormal_ip else 1,
-                num_ad=1 if is_abnormal_ip else 0
-            )
-            db.session.add(at_record)
-        else:
-            if is_abnormal_ip:
-                at_record.num_ad += 1
-            else:
-                at_record.num_nd += 1
+        today = datetime.utcnow().date()
+        increments = {}
+
+        # 访问成功率
+        increments['ast_num_as' if data.get('success', True) else 'ast_num_af'] = 1
+
+        # 操作行为（未知类型不计数）
+        operation_column = _OPERATION_COLUMNS.get(data.get('operation_type', 'view'))
+        if operation_column:
+            increments[operation_column] = 1
+
+        # 数据敏感度（未知级别不计数）
+        sensitivity_column = _SENSITIVITY_COLUMNS.get(data.get('sensitivity_level', 1))
+        if sensitivity_column:
+            increments[sensitivity_column] = 1
+
+        # 访问时间（服务端判断）
+        is_unusual_time = activity_profiles.observe(user_id)
+        increments['ap_num_ui' if is_unusual_time else 'ap_num_ni'] = 1
+
+        # 访问IP（按所属组登记的网段判断）
+        remote_ip = request.remote_addr
+        is_abnormal_ip = network_index.is_abnormal(user_id, remote_ip)
+        increments['at_num_ad' if is_abnormal_ip else 'at_num_nd'] = 1
+
+        # split 模式下写五张追踪表；wide 模式下是 user_daily_metrics 上的一条 upsert
+        tracker_store.add_daily(user_id, today, increments, ip=remote_ip)
 
         db.session.commit()
+        activity_profiles.maybe_flush()
 
-        return jsonify({'message': '访问记录成功'}), 200
+        return jsonify({
+            'message': '访问记录成功',
+            'is_unusual_time': is_unusual_time,
+            'is_abnormal_ip': is_abnormal_ip
+        }), 200
 
     except Exception as e:
         db.session.rollback()
@@ -143,50 +79,75 @@ def record_access():
         return jsonify({'error': '记录访问失败'}), 500
 
 
+@audit_bp.route('/activity-profile/<int:user_id>', methods=['GET'])
+@researcher_or_admin
+def get_activity_profile(user_id):
+    """获取用户的活跃时段画像（168 个槽位，周一 0 点为槽位 0）及当前时刻的判断结果"""
+    try:
+        counts, total, slot, is_unusual = activity_profiles.snapshot(user_id)
+        cfg = current_app.config
+        return jsonify({
+            'user_id': user_id,
+            'hour_counts': counts,
+            'total_count': total,
+            'current_slot': slot,
+            'is_unusual_now': is_unusual,
+            'threshold': cfg['ACTIVITY_UNUSUAL_THRESHOLD'],
+            'min_samples': cfg['ACTIVITY_MIN_SAMPLES'],
+            'utc_offset': cfg['ACTIVITY_PROFILE_UTC_OFFSET']
+        }), 200
+
+    except Exception as e:
+        current_app.logger.error(f'Get activity profile error: {str(e)}')
+        return jsonify({'error': '获取活跃时段画像失败'}), 500
+
+
 @audit_bp.route('/user-stats/<user_id>', methods=['GET'])
 @researcher_or_admin
 def get_user_stats(user_id):
     """获取用户统计信息"""
     try:
+        records = tracker_store.first_records(user_id)
+
         # 访问成功率
-        ast = AccessSuccessTracker.query.filter_by(user_id=user_id).first()
+        ast = records[AccessSuccessTracker]
         ast_data = {
-            'num_as': ast.num_as if ast else 0,
-            'num_af': ast.num_af if ast else 0
+            'num_as': ast.ast_num_as if ast else 0,
+            'num_af': ast.ast_num_af if ast else 0
         }
 
         # 操作行为
-        ob = OperationBehaviorTracker.query.filter_by(user_id=user_id).first()
+        ob = records[OperationBehaviorTracker]
         ob_data = {
-            'num_view': ob.num_view if ob else 0,
-            'num_copy': ob.num_copy if ob else 0,
-            'num_download': ob.num_download if ob else 0,
-            'num_add': ob.num_add if ob else 0,
-            'num_revise': ob.num_revise if ob else 0,
-            'num_delete': ob.num_delete if ob else 0
+            'num_view': ob.ob_num_view if ob else 0,
+            'num_copy': ob.ob_num_copy if ob else 0,
+            'num_download': ob.ob_num_download if ob else 0,
+            'num_add': ob.ob_num_add if ob else 0,
+            'num_revise': ob.ob_num_revise if ob else 0,
+            'num_delete': ob.ob_num_delete if ob else 0
         }
 
         # 数据敏感度
-        ds = DataSensitivityTracker.query.filter_by(user_id=user_id).first()
+        ds = records[DataSensitivityTracker]
         ds_data = {
-            'num1': ds.num1 if ds else 0,
-            'num2': ds.num2 if ds else 0,
-            'num3': ds.num3 if ds else 0,
-            'num4': ds.num4 if ds else 0
+            'num1': ds.ds_num1 if ds else 0,
+            'num2': ds.ds_num2 if ds else 0,
+            'num3': ds.ds_num3 if ds else 0,
+            'num4': ds.ds_num4 if ds else 0
         }
 
         # 访问时间
-        ap = AccessTimeTracker.query.filter_by(user_id=user_id).first()
+        ap = records[AccessTimeTracker]
         ap_data = {
-            'num_ni': ap.num_ni if ap else 0,
-            'num_ui': ap.num_ui if ap else 0
+            'num_ni': ap.ap_num_ni if ap else 0,
+            'num_ui': ap.ap_num_ui if ap else 0
         }
 
         # 访问IP
-        at = AccessLocationTracker.query.filter_by(user_id=user_id).first()
+        at = records[AccessLocationTracker]
         at_data = {
-            'num_nd': at.num_nd if at else 0,
-            'num_ad': at.num_ad if at else 0
+            'num_nd': at.at_num_nd if at else 0,
+            'num_ad': at.at_num_ad if at else 0
         }
 
         return jsonify({
@@ -220,58 +181,50 @@ def get_all_stats():
         per_page = request.args.get('per_page', 10, type=int)
 
         # 获取所有用户的访问成功率记录
-        ast_records = AccessSuccessTracker.query.paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        ast_records = paginate(tracker_store.query(AccessSuccessTracker), page, per_page)
 
         stats_list = []
         for ast in ast_records.items:
-            # 获取对应的其他记录
-            ob = OperationBehaviorTracker.query.filter_by(user_id=ast.user_id).first()
-            ds = DataSensitivityTracker.query.filter_by(user_id=ast.user_id).first()
-            ap = AccessTimeTracker.query.filter_by(user_id=ast.user_id).first()
-            at = AccessLocationTracker.query.filter_by(user_id=ast.user_id).first()
+            # 获取对应的其他记录（wide 模式下即为同一行）
+            records = tracker_store.first_records(ast.user_id)
+            ob = records[OperationBehaviorTracker]
+            ds = records[DataSensitivityTracker]
+            ap = records[AccessTimeTracker]
+            at = records[AccessLocationTracker]
 
             stats_list.append({
                 'user_id': ast.user_id,
                 'access_success': {
-                    'num_as': ast.num_as,
-                    'num_af': ast.num_af
+                    'num_as': ast.ast_num_as,
+                    'num_af': ast.ast_num_af
                 },
                 'operation_behavior': {
-                    'num_view': ob.num_view if ob else 0,
-                    'num_copy': ob.num_copy if ob else 0,
-                    'num_download': ob.num_download if ob else 0,
-                    'num_add': ob.num_add if ob else 0,
-                    'num_revise': ob.num_revise if ob else 0,
-                    'num_delete': ob.num_delete if ob else 0
+                    'num_view': ob.ob_num_view if ob else 0,
+                    'num_copy': ob.ob_num_copy if ob else 0,
+                    'num_download': ob.ob_num_download if ob else 0,
+                    'num_add': ob.ob_num_add if ob else 0,
+                    'num_revise': ob.ob_num_revise if ob else 0,
+                    'num_delete': ob.ob_num_delete if ob else 0
                 },
                 'data_sensitivity': {
-                    'num1': ds.num1 if ds else 0,
-                    'num2': ds.num2 if ds else 0,
-                    'num3': ds.num3 if ds else 0,
-                    'num4': ds.num4 if ds else 0
+                    'num1': ds.ds_num1 if ds else 0,
+                    'num2': ds.ds_num2 if ds else 0,
+                    'num3': ds.ds_num3 if ds else 0,
+                    'num4': ds.ds_num4 if ds else 0
                 },
                 'access_period': {
-                    'num_ni': ap.num_ni if ap else 0,
-                    'num_ui': ap.num_ui if ap else 0
+                    'num_ni': ap.ap_num_ni if ap else 0,
+                    'num_ui': ap.ap_num_ui if ap else 0
                 },
                 'access_location': {
-                    'num_nd': at.num_nd if at else 0,
-                    'num_ad': at.num_ad if at else 0
+                    'num_nd': at.at_num_nd if at else 0,
+                    'num_ad': at.at_num_ad if at else 0
                 }
             })
 
         return jsonify({
             'stats': stats_list,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': ast_records.total,
-                'pages': ast_records.pages,
-                'has_next': ast_records.has_next,
-                'has_prev': ast_records.has_prev
-            }
+            'pagination': ast_records.to_dict()
         }), 200
 
     except Exception as e:
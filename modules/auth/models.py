@@ -124,6 +124,9 @@ class Group(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     group_name = db.Column(db.String(100), nullable=False)  # 组名称（医院名称）
     enable = db.Column(db.Boolean, default=True, nullable=False)  # 是否可用，默认为1；1可用，0冻结
+    # 冗余计数，由 user_management 在同一事务内维护；可用 reconcile-group-counts 命令校准
+    member_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # 成员总数
+    active_member_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)  # 启用状态的成员数
     created_time = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_time = db.Column(db.DateTime, default=datetime.utcnow,
                              onupdate=datetime.utcnow, nullable=False)
@@ -133,11 +136,18 @@ class Group(db.Model):
                                            backref='group', lazy='dynamic',
                                            cascade='all, delete-orphan')
 
+    # 组（医院）登记的网段
+    group_networks = db.relationship('GroupNetwork',
+                                     backref='group', lazy='dynamic',
+                                     cascade='all, delete-orphan')
+
     def to_dict(self):
         return {
             'id': self.id,
             'group_name': self.group_name,
             'enable': self.enable,
+            'member_count': self.member_count,
+            'active_member_count': self.active_member_count,
             'created_time': self.created_time.isoformat() if self.created_time else None,
             'updated_time': self.updated_time.isoformat() if self.updated_time else None
         }
@@ -146,6 +156,10 @@ class Group(db.Model):
 # ----------------------- 用户-组关系表 -----------------------
 class UserGroupRelation(db.Model):
     __tablename__ = 'user_group_relation'
+    __table_args__ = (
+        # 组成员列表按 (group_id, enable) 过滤、按 user_id 键集分页
+        db.Index('idx_ugr_group_enable_user', 'group_id', 'enable', 'user_id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -165,4 +179,32 @@ class UserGroupRelation(db.Model):
             'enable': self.enable,
             'created_time': self.created_time.isoformat() if self.created_time else None,
             'updated_time': self.updated_time.isoformat() if self.updated_time else None
-        }
\ No newline at end of file
+        }
+
+# ----------------------- 组网段表 -----------------------
+class GroupNetwork(db.Model):
+    """组（医院）登记的网段，用于判断访问 IP 是否来自所属机构"""
+    __tablename__ = 'group_network'
+    __table_args__ = (
+        db.UniqueConstraint('group_id', 'cidr', name='uq_group_network_cidr'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    group_id = db.Column(db.Integer, db.ForeignKey('group.id'), nullable=False, index=True)
+    cidr = db.Column(db.String(64), nullable=False)  # 规范化后的网段，如 10.12.0.0/16、2001:db8::/32
+    description = db.Column(db.String(200), nullable=True)
+    enable = db.Column(db.Boolean, default=True, nullable=False)
+    created_time = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_time = db.Column(db.DateTime, default=datetime.utcnow,
+                             onupdate=datetime.utcnow, nullable=False)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'group_id': self.group_id,
+            'cidr': self.cidr,
+            'description': self.description,
+            'enable': self.enable,
+            'created_time': self.created_time.isoformat() if self.created_time else None,
+            'updated_time': self.updated_time.isoformat() if self.updated_time else None
+        }
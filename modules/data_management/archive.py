@@ -0,0 +1,346 @@
+# modules/data_management/archive.py
+"""
+追踪表冷数据归档：按列压缩存储的月度文件
+
+    flask --app app tracker-archive run [--dry-run] [--before YYYY-MM-DD]
+    flask --app app tracker-archive inspect <文件路径>
+
+- date_recorded 早于 TRACKER_ARCHIVE_AFTER_DAYS 天的行按（追踪表, 月份）写入
+  TRACKER_ARCHIVE_DIR/<表名>/<YYYY-MM>.tcol，写入成功（fsync + 原子替换）后再从数据库删除；
+  同一月份多次归档时与已有文件合并，按主键去重，中途失败重跑不会产生重复；
+  宽表 user_daily_metrics（见 tracker_store.py）同样按此归档；
+- 文件内行按 (user_id, date_recorded) 排序并切分为行组，每个行组内每列单独 zlib 压缩；
+  读取时通过 mmap 只解压命中用户所在行组的所需列；
+- 清空后的月分区由 tracker-partitions maintain 按保留期删除（见 partitions.py）。
+
+文件格式：
+    MAGIC(8) | 列块 ... | 头部 JSON | 头部偏移(8, 小端) | 头部长度(4, 小端)
+头部记录表名、月份、字节序、列类型及每个行组的 [偏移, 长度]、user_id 范围。
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import Date, DateTime, Float, Integer
+
+from modules.data_management.models import db, UserDailyMetrics
+from modules.data_management.partitions import TRACKER_MODELS, add_months
+
+MAGIC = b"TRKCOL01"
+_FOOTER = struct.Struct("<QI")
+_NULL_INT = -(2 ** 63)
+_EPOCH = datetime(1970, 1, 1)
+_DELETE_BATCH_SIZE = 1000
+_OPEN_FILES_LIMIT = 64
+
+
+# ─────────────────────────── 列编码 ───────────────────────────
+def _column_kind(column):
+    if isinstance(column.type, DateTime):
+        return "datetime"
+    if isinstance(column.type, Date):
+        return "date"
+    if isinstance(column.type, Float):
+        return "float"
+    if isinstance(column.type, Integer):
+        return "int"
+    return "str"
+
+
+def _encode(kind, values):
+    if kind == "int":
+        raw = array("q", (_NULL_INT if v is None else v for v in values)).tobytes()
+    elif kind == "float":
+        raw = array("d", (float("nan") if v is None else v for v in values)).tobytes()
+    elif kind == "date":
+        raw = array("i", (0 if v is None else v.toordinal() for v in values)).tobytes()
+    elif kind == "datetime":
+        raw = array(
+            "q",
+            (_NULL_INT if v is None else (v - _EPOCH) // timedelta(microseconds=1) for v in values),
+        ).tobytes()
+    else:
+        raw = json.dumps(values, ensure_ascii=False).encode("utf-8")
+    return raw
+
+
+def _decode(kind, raw, byteorder):
+    if kind == "str":
+        return json.loads(raw.decode("utf-8"))
+    typecode = {"int": "q", "float": "d", "date": "i", "datetime": "q"}[kind]
+    values = array(typecode)
+    values.frombytes(raw)
+    if byteorder != sys.byteorder:
+        values.byteswap()
+    if kind == "int":
+        return [None if v == _NULL_INT else v for v in values]
+    if kind == "float":
+        return [None if v != v else v for v in values]  # NaN -> None
+    if kind == "date":
+        return [None if v == 0 else date.fromordinal(v) for v in values]
+    return [None if v == _NULL_INT else _EPOCH + timedelta(microseconds=v) for v in values]
+
+
+# ─────────────────────────── 写入 ───────────────────────────
+def archive_path(base_dir, table, month):
+    return os.path.join(base_dir, table, f"{month:%Y-%m}.tcol")
+
+
+def write_archive(path, table, month, columns, rows, row_group_size, level=6):
+    """
+    把 rows（dict 列表）写为列式归档文件；columns 为 {列名: 类型}。
+    先写临时文件并 fsync，再原子替换，读者不会看到写了一半的文件。
+    """
+    rows = sorted(rows, key=lambda r: (r["user_id"], r["date_recorded"], r.get("id") or 0))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    groups = []
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        for start in range(0, len(rows), row_group_size):
+            chunk = rows[start:start + row_group_size]
+            blocks = {}
+            for name, kind in columns.items():
+                data = zlib.compress(_encode(kind, [r[name] for r in chunk]), level)
+                blocks[name] = [f.tell(), len(data)]
+                f.write(data)
+            groups.append({
+                "rows": len(chunk),
+                "min_user": chunk[0]["user_id"],
+                "max_user": chunk[-1]["user_id"],
+                "blocks": blocks,
+            })
+        header = json.dumps({
+            "version": 1,
+            "table": table,
+            "month": f"{month:%Y-%m}",
+            "byteorder": sys.byteorder,
+            "rows": len(rows),
+            "columns": columns,
+            "groups": groups,
+        }).encode("utf-8")
+        header_offset = f.tell()
+        f.write(header)
+        f.write(_FOOTER.pack(header_offset, len(header)))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# ─────────────────────────── 读取 ───────────────────────────
+class ArchiveFile:
+    """以 mmap 方式打开的归档文件，按需解压列块"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:len(MAGIC)] != MAGIC:
+            self._mm.close()
+            raise ValueError(f"不是追踪表归档文件: {path}")
+        header_offset, header_length = _FOOTER.unpack(self._mm[-_FOOTER.size:])
+        self.header = json.loads(self._mm[header_offset:header_offset + header_length])
+        self.columns = self.header["columns"]
+
+    def _column(self, group, name):
+        offset, length = group["blocks"][name]
+        raw = zlib.decompress(self._mm[offset:offset + length])
+        return _decode(self.columns[name], raw, self.header["byteorder"])
+
+    def read_user(self, user_id, columns, start=None, end=None):
+        """读取某用户的行（只解压 columns 中的列），可按 date_recorded 过滤"""
+        wanted = [c for c in dict.fromkeys(("id", "date_recorded", *columns)) if c in self.columns]
+        result = []
+        for group in self.header["groups"]:
+            if not group["min_user"] <= user_id <= group["max_user"]:
+                continue
+            user_ids = self._column(group, "user_id")
+            lo, hi = bisect_left(user_ids, user_id), bisect_right(user_ids, user_id)
+            if lo == hi:
+                continue
+            values = {name: self._column(group, name)[lo:hi] for name in wanted}
+            for i in range(hi - lo):
+                row = {name: values[name][i] for name in wanted}
+                row["user_id"] = user_id
+                row.setdefault("id", None)
+                day = row["date_recorded"]
+                if (start and day < start) or (end and day > end):
+                    continue
+                result.append(row)
+        return result
+
+    def read_all(self):
+        result = []
+        names = list(self.columns)
+        for group in self.header["groups"]:
+            values = {name: self._column(group, name) for name in names}
+            result.extend(
+                {name: values[name][i] for name in names} for i in range(group["rows"])
+            )
+        return result
+
+    def close(self):
+        self._mm.close()
+
+
+class _ArchiveCache:
+    """
+    按 (路径, 修改时间) 缓存打开的归档文件，数量超出上限时淘汰最久未用的。
+    被替换或淘汰的文件不显式 close：其他请求线程可能仍在读取 get() 返回的对象，
+    关闭后的 mmap 会抛出 ValueError；不再被引用后由垃圾回收解除映射。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._files = OrderedDict()  # path -> (mtime, ArchiveFile)
+
+    def get(self, path):
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            entry = self._files.get(path)
+            if entry and entry[0] == mtime:
+                self._files.move_to_end(path)
+                return entry[1]
+            archive = ArchiveFile(path)
+            self._files[path] = (mtime, archive)
+            self._files.move_to_end(path)
+            while len(self._files) > _OPEN_FILES_LIMIT:
+                self._files.popitem(last=False)
+            return archive
+
+
+archive_cache = _ArchiveCache()
+
+
+def read_archived(model, user_id, start, end, columns):
+    """
+    读取某用户在 [start, end] 内已归档的行，返回可按属性访问的对象列表。
+    只打开与日期范围相交的月份文件。
+    """
+    base_dir = current_app.config["TRACKER_ARCHIVE_DIR"]
+    table = model.__tablename__
+    if not os.path.isdir(os.path.join(base_dir, table)):
+        return []
+    rows = []
+    month = add_months(start, 0)
+    while month <= end:
+        archive = archive_cache.get(archive_path(base_dir, table, month))
+        if archive is not None:
+            rows.extend(
+                SimpleNamespace(**row)
+                for row in archive.read_user(user_id, columns, start, end)
+            )
+        month = add_months(month, 1)
+    return rows
+
+
+# ─────────────────────────── 归档任务 ───────────────────────────
+ARCHIVED_MODELS = (*TRACKER_MODELS, UserDailyMetrics)
+
+
+def _model_columns(model):
+    return {c.name: _column_kind(c) for c in model.__table__.columns}
+
+
+def _row_key(model):
+    """行的主键取值函数（追踪表为 id，宽表为 (user_id, date_recorded)）"""
+    names = [c.name for c in model.__table__.primary_key.columns]
+    return lambda row: tuple(row[name] for name in names)
+
+
+def archive_model(model, before, base_dir, row_group_size, dry_run=False):
+    """把 date_recorded < before 的行归档并删除，返回 {月份: 行数}"""
+    table = model.__tablename__
+    columns = _model_columns(model)
+    table_columns = [model.__table__.c[name] for name in columns]
+    primary_key = list(model.__table__.primary_key.columns)
+    row_key = _row_key(model)
+    summary = {}
+
+    first = db.session.query(db.func.min(model.date_recorded)).scalar()
+    if first is None or first >= before:
+        return summary
+
+    month = add_months(first, 0)
+    while month < before:
+        month_end = min(add_months(month, 1), before)
+        condition = (model.date_recorded >= month) & (model.date_recorded < month_end)
+        rows = [
+            dict(row._mapping)
+            for row in db.session.execute(db.select(*table_columns).where(condition))
+        ]
+        if rows:
+            summary[f"{month:%Y-%m}"] = len(rows)
+        if rows and not dry_run:
+            path = archive_path(base_dir, table, month)
+            if os.path.exists(path):
+                # 与已有文件合并，按主键去重（重跑时数据库中的行以最新值为准）
+                existing = ArchiveFile(path)
+                merged = {row_key(row): row for row in existing.read_all()}
+                existing.close()
+                merged.update((row_key(row), row) for row in rows)
+                rows = list(merged.values())
+            write_archive(path, table, month, columns, rows, row_group_size)
+
+            keys = [row_key(row) for row in rows]
+            for start in range(0, len(keys), _DELETE_BATCH_SIZE):
+                chunk = keys[start:start + _DELETE_BATCH_SIZE]
+                model.query.filter(
+                    db.tuple_(*primary_key).in_(chunk), condition
+                ).delete(synchronize_session=False)
+                db.session.commit()
+        month = add_months(month, 1)
+    return summary
+
+
+@click.group("tracker-archive")
+def tracker_archive_command():
+    """追踪表冷数据归档"""
+
+
+@tracker_archive_command.command("run")
+@click.option("--before", help="归档 date_recorded 早于该日期的行，默认按 TRACKER_ARCHIVE_AFTER_DAYS 计算")
+@click.option("--dry-run", is_flag=True, help="只统计，不写文件、不删除")
+@with_appcontext
+def run_command(before, dry_run):
+    """把过期的追踪数据写入列式归档文件并从数据库删除"""
+    cfg = current_app.config
+    if before:
+        before = date.fromisoformat(before)
+    else:
+        before = datetime.utcnow().date() - timedelta(days=cfg["TRACKER_ARCHIVE_AFTER_DAYS"])
+    for model in ARCHIVED_MODELS:
+        summary = archive_model(
+            model, before, cfg["TRACKER_ARCHIVE_DIR"], cfg["TRACKER_ARCHIVE_ROW_GROUP_SIZE"], dry_run
+        )
+        total = sum(summary.values())
+        click.echo(f"{model.__tablename__}: {total} 行" + (f" {summary}" if summary else ""))
+
+
+@tracker_archive_command.command("inspect")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+def inspect_command(path):
+    """打印归档文件的头部信息"""
+    archive = ArchiveFile(path)
+    header = archive.header
+    click.echo(f"table={header['table']} month={header['month']} rows={header['rows']} "
+               f"groups={len(header['groups'])} size={os.path.getsize(path)} bytes")
+    for name, kind in header["columns"].items():
+        stored = sum(g["blocks"][name][1] for g in header["groups"])
+        click.echo(f"    {name:<20} {kind:<9} {stored} bytes")
+    archive.close()
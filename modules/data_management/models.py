@@ -1,22 +1,46 @@
-from utils.extensions import db
-from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
-import json
-
 # modules/data_management/models.py
 from utils.extensions import db
 from datetime import datetime
 import json
 
+
+def _utc_today():
+    return datetime.utcnow().date()
+
+
+def append_ip_history(raw, ip):
+    """在 JSON 形式的 IP 历史后追加一条，只保留最近 100 条；返回新的 JSON 字符串"""
+    try:
+        history = json.loads(raw) if raw else []
+    except Exception:      # 若历史字段损坏，回退为空
+        history = []
+    history.append({'ip': ip, 'timestamp': datetime.utcnow().isoformat()})
+    history = history[-100:] if len(history) > 100 else history
+    return json.dumps(history)
+
+
+def get_or_create_daily(model, user_id, day=None, **initial):
+    """
+    取用户当天的统计行（各追踪表每个用户每天一行），不存在时以 initial 创建。
+    按 date_recorded 等值过滤，MySQL 分区表上只会访问当月分区。
+    """
+    day = day or _utc_today()
+    record = model.query.filter_by(user_id=user_id, date_recorded=day).first()
+    if not record:
+        record = model(user_id=user_id, date_recorded=day, **initial)
+        db.session.add(record)
+    return record
+
 # ------------------- 访问成功率追踪 -------------------
 class AccessSuccessTracker(db.Model):
     __tablename__ = 'access_success_tracker'
+    __table_args__ = (db.Index('idx_access_success_tracker_user_date', 'user_id', 'date_recorded'),)
 
     id         = db.Column(db.Integer, primary_key=True)
     user_id    = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     ast_num_as = db.Column(db.Integer, default=0, comment='访问成功次数')
     ast_num_af = db.Column(db.Integer, default=0, comment='访问失败次数')
-    date_recorded = db.Column(db.Date, default=datetime.utcnow().date())
+    date_recorded = db.Column(db.Date, nullable=False, default=_utc_today)  # 分区键（见 partitions.py）
     created_time = db.Column(db.DateTime, default=datetime.utcnow)
     updated_time = db.Column(db.DateTime, default=datetime.utcnow,
                            onupdate=datetime.utcnow)
@@ -39,6 +63,7 @@ class AccessSuccessTracker(db.Model):
 # ------------------- 操作行为追踪 -------------------
 class OperationBehaviorTracker(db.Model):
     __tablename__ = 'operation_behavior_tracker'
+    __table_args__ = (db.Index('idx_operation_behavior_tracker_user_date', 'user_id', 'date_recorded'),)
 
     id         = db.Column(db.Integer, primary_key=True)
     user_id    = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -51,7 +76,7 @@ class OperationBehaviorTracker(db.Model):
     ob_a = db.Column(db.Float, default=0.3)
     ob_b = db.Column(db.Float, default=0.3)
     ob_c = db.Column(db.Float, default=0.4)
-    date_recorded = db.Column(db.Date, default=datetime.utcnow().date())
+    date_recorded = db.Column(db.Date, nullable=False, default=_utc_today)  # 分区键（见 partitions.py）
     created_time    = db.Column(db.DateTime, default=datetime.utcnow)
     updated_time    = db.Column(db.DateTime, default=datetime.utcnow,
                               onupdate=datetime.utcnow)
@@ -79,6 +104,7 @@ class OperationBehaviorTracker(db.Model):
 # ------------------- 数据敏感度追踪 -------------------
 class DataSensitivityTracker(db.Model):
     __tablename__ = 'data_sensitivity_tracker'
+    __table_args__ = (db.Index('idx_data_sensitivity_tracker_user_date', 'user_id', 'date_recorded'),)
 
     id      = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -90,7 +116,7 @@ class DataSensitivityTracker(db.Model):
     ds_b = db.Column(db.Float, default=1.0)
     ds_c = db.Column(db.Float, default=1.0)
     ds_d = db.Column(db.Float, default=1.0)
-    date_recorded = db.Column(db.Date, default=datetime.utcnow().date())
+    date_recorded = db.Column(db.Date, nullable=False, default=_utc_today)  # 分区键（见 partitions.py）
     created_time    = db.Column(db.DateTime, default=datetime.utcnow)
     updated_time    = db.Column(db.DateTime, default=datetime.utcnow,
                               onupdate=datetime.utcnow)
@@ -114,12 +140,13 @@ class DataSensitivityTracker(db.Model):
 # ------------------- 访问时间追踪 -------------------
 class AccessTimeTracker(db.Model):
     __tablename__ = 'access_time_tracker'
+    __table_args__ = (db.Index('idx_access_time_tracker_user_date', 'user_id', 'date_recorded'),)
 
     id      = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     ap_num_ni = db.Column(db.Integer, default=0)
     ap_num_ui = db.Column(db.Integer, default=0)
-    date_recorded = db.Column(db.Date, default=datetime.utcnow().date())
+    date_recorded = db.Column(db.Date, nullable=False, default=_utc_today)  # 分区键（见 partitions.py）
     created_time    = db.Column(db.DateTime, default=datetime.utcnow)
     updated_time    = db.Column(db.DateTime, default=datetime.utcnow,
                               onupdate=datetime.utcnow)
@@ -138,9 +165,40 @@ class AccessTimeTracker(db.Model):
             'date_recorded': self.date_recorded.isoformat() if self.date_recorded else None
         }
 
+# ------------------- 用户活跃时段画像 -------------------
+class UserActivityProfile(db.Model):
+    """
+    按“一周中的小时”（周一 0 点为 0，共 168 个槽位）统计的用户访问次数，
+    供访问时间异常判断使用；内存中的增量由 modules/audit/activity_profile.py 定期写回
+    """
+    __tablename__ = 'user_activity_profile'
+
+    user_id      = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    hour_counts  = db.Column(db.Text, nullable=False, comment='168 个槽位计数的 JSON 数组')
+    total_count  = db.Column(db.Integer, nullable=False, default=0, comment='累计访问次数')
+    created_time = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_time = db.Column(db.DateTime, default=datetime.utcnow,
+                             onupdate=datetime.utcnow)
+
+    def get_counts(self):
+        try:
+            counts = json.loads(self.hour_counts) if self.hour_counts else []
+        except Exception:      # 字段损坏时回退为空
+            counts = []
+        return counts if len(counts) == 168 else [0] * 168
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'hour_counts': self.get_counts(),
+            'total_count': self.total_count,
+            'updated_time': self.updated_time.isoformat() if self.updated_time else None
+        }
+
 # ------------------- 访问地点/IP 追踪 -------------------
 class AccessLocationTracker(db.Model):
     __tablename__ = 'access_location_tracker'
+    __table_args__ = (db.Index('idx_access_location_tracker_user_date', 'user_id', 'date_recorded'),)
 
     id      = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -148,7 +206,7 @@ class AccessLocationTracker(db.Model):
     at_num_ad = db.Column(db.Integer, default=0)
     last_ip   = db.Column(db.String(45))
     ip_history = db.Column(db.Text)           # JSON 字符串
-    date_recorded = db.Column(db.Date, default=datetime.utcnow().date())
+    date_recorded = db.Column(db.Date, nullable=False, default=_utc_today)  # 分区键（见 partitions.py）
     created_time    = db.Column(db.DateTime, default=datetime.utcnow)
     updated_time    = db.Column(db.DateTime, default=datetime.utcnow,
                               onupdate=datetime.utcnow)
@@ -158,13 +216,7 @@ class AccessLocationTracker(db.Model):
         return self.at_num_nd / total if total > 0 else 0
 
     def add_ip_to_history(self, ip):
-        try:
-            history = json.loads(self.ip_history) if self.ip_history else []
-        except Exception:      # 若历史字段损坏，回退为空
-            history = []
-        history.append({'ip': ip, 'timestamp': datetime.utcnow().isoformat()})
-        history = history[-100:] if len(history) > 100 else history
-        self.ip_history = json.dumps(history)
+        self.ip_history = append_ip_history(self.ip_history, ip)
         self.last_ip = ip
 
     def to_dict(self):
@@ -178,6 +230,53 @@ class AccessLocationTracker(db.Model):
             'date_recorded': self.date_recorded.isoformat() if self.date_recorded else None
         }
 
+# ------------------- 用户每日指标（宽表） -------------------
+class UserDailyMetrics(db.Model):
+    """
+    TRACKER_STORAGE=wide 时五张追踪表的合并存储：每个用户每天一行，列名与各追踪表一致，
+    因此可直接作为各追踪表的读写视图；一次访问记录只需一条 upsert（见 tracker_store.py）
+    """
+    __tablename__ = 'user_daily_metrics'
+
+    user_id       = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    date_recorded = db.Column(db.Date, primary_key=True)
+    # 访问成功率
+    ast_num_as = db.Column(db.Integer, nullable=False, default=0)
+    ast_num_af = db.Column(db.Integer, nullable=False, default=0)
+    # 操作行为
+    ob_num_view     = db.Column(db.Integer, nullable=False, default=0)
+    ob_num_copy     = db.Column(db.Integer, nullable=False, default=0)
+    ob_num_download = db.Column(db.Integer, nullable=False, default=0)
+    ob_num_add      = db.Column(db.Integer, nullable=False, default=0)
+    ob_num_revise   = db.Column(db.Integer, nullable=False, default=0)
+    ob_num_delete   = db.Column(db.Integer, nullable=False, default=0)
+    ob_a = db.Column(db.Float, default=0.3)
+    ob_b = db.Column(db.Float, default=0.3)
+    ob_c = db.Column(db.Float, default=0.4)
+    # 数据敏感度
+    ds_num1 = db.Column(db.Integer, nullable=False, default=0)
+    ds_num2 = db.Column(db.Integer, nullable=False, default=0)
+    ds_num3 = db.Column(db.Integer, nullable=False, default=0)
+    ds_num4 = db.Column(db.Integer, nullable=False, default=0)
+    ds_a = db.Column(db.Float, default=1.0)
+    ds_b = db.Column(db.Float, default=1.0)
+    ds_c = db.Column(db.Float, default=1.0)
+    ds_d = db.Column(db.Float, default=1.0)
+    # 访问时间
+    ap_num_ni = db.Column(db.Integer, nullable=False, default=0)
+    ap_num_ui = db.Column(db.Integer, nullable=False, default=0)
+    # 访问 IP
+    at_num_nd  = db.Column(db.Integer, nullable=False, default=0)
+    at_num_ad  = db.Column(db.Integer, nullable=False, default=0)
+    last_ip    = db.Column(db.String(45))
+    ip_history = db.Column(db.Text)           # JSON 字符串，追加规则同 AccessLocationTracker
+    created_time = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_time = db.Column(db.DateTime, default=datetime.utcnow,
+                             onupdate=datetime.utcnow)
+
+    # 宽表没有独立的 id，作为追踪表视图时返回 None
+    id = None
+
 # ------------------- ICD‑10 码表 -------------------
 class ICD10Code(db.Model):
     """
@@ -187,7 +286,7 @@ class ICD10Code(db.Model):
     __table_args__ = (
         db.UniqueConstraint('code', name='uq_icd10_code'),
         db.Index('idx_icd10_chapter', 'chapter'),
-        db.Index('idx_icd10_description', 'description')
+        db.Index('idx_icd10_description', 'description'),
     )
 
     # 通用主键
@@ -206,6 +305,10 @@ class ICD10Code(db.Model):
     updated_time   = db.Column(db.DateTime, default=datetime.utcnow,
                                onupdate=datetime.utcnow)
 
+    # 拼音检索键（导入时计算，见 modules/icd10/pinyin.py）
+    pinyin_keys    = db.relationship('ICD10PinyinKey', lazy='dynamic',
+                                     cascade='all, delete-orphan')
+
     # ---------- 工具方法 ----------
     def to_dict(self):
         return {
@@ -221,10 +324,11 @@ class ICD10Code(db.Model):
     @staticmethod
     def search_by_code(keyword: str, limit: int = 10):
         """
-        按完整编码或编码前缀模糊查询
+        按完整编码或编码前缀查询（编码以大写存储，前缀匹配可使用 uq_icd10_code 索引）
         """
         return (ICD10Code.query
-                .filter(ICD10Code.code.ilike(f"{keyword}%"))
+                .filter(ICD10Code.code.startswith(keyword.upper(), autoescape=True))
+                .order_by(ICD10Code.code)
                 .limit(limit)
                 .all())
 
@@ -241,5 +345,34 @@ class ICD10Code(db.Model):
                 .limit(limit)
                 .all())
 
+    @staticmethod
+    def search_by_pinyin(keyword: str, limit: int = 10):
+        """
+        按拼音首字母或全拼查询，可从描述中任一汉字 / 词开始匹配（gxy -> 原发性高血压）；
+        keyword 需已归一化为小写字母与数字，走 idx_icd10_pinyin_term 的范围扫描
+        """
+        keyword = keyword[:ICD10PinyinKey.term.type.length]
+        matched = (db.select(ICD10PinyinKey.code_id)
+                   .where(ICD10PinyinKey.term.startswith(keyword, autoescape=True)))
+        return (ICD10Code.query
+                .filter(ICD10Code.id.in_(matched))
+                .order_by(ICD10Code.code)
+                .limit(limit)
+                .all())
+
     def __repr__(self):
         return f"<ICD10Code {self.code} – {self.short_desc or self.description[:30]}>"
+
+
+class ICD10PinyinKey(db.Model):
+    """
+    ICD-10 描述的拼音检索键：简短描述与长描述中每个汉字 / 词起始处的全拼与首字母，
+    截断到 term 的长度（原发性高血压 -> yuanfaxinggaoxueya / yfxgxy、…、gaoxueya / gxy、…）
+    """
+    __tablename__ = 'icd10_pinyin_keys'
+    __table_args__ = (
+        db.Index('idx_icd10_pinyin_term', 'term'),
+    )
+
+    code_id = db.Column(db.Integer, db.ForeignKey('icd10_codes.id'), primary_key=True)
+    term    = db.Column(db.String(32), primary_key=True, comment='只含小写字母与数字')
@@ -0,0 +1,265 @@
+# modules/data_management/partitions.py
+"""
+追踪表按月 RANGE 分区维护（MySQL）
+
+五张追踪表每个用户每天一行，只增不删。按 date_recorded 以月为单位分区后，
+过期数据的清理变成 DROP / EXCHANGE PARTITION 这样的元数据操作，无需长时间 DELETE。
+
+    flask --app app tracker-partitions init               # 一次性改造：调整主键、去掉外键、建立分区
+    flask --app app tracker-partitions maintain           # 预建未来分区，清理超出保留期的分区
+    flask --app app tracker-partitions maintain --dry-run # 只打印将要执行的 SQL
+    flask --app app tracker-partitions status             # 查看各分区行数
+
+说明：
+- MySQL 要求分区键包含在每个唯一键中，因此主键改为 (id, date_recorded)；
+  分区表不支持外键，init 会删除 user_id 上的外键约束（ORM 关系不受影响）；
+- 分区命名 pYYYYMM，另有 pmax 兜底；新增分区通过拆分空的 pmax 完成；
+- 过期分区按 TRACKER_EXPIRED_PARTITION_ACTION 处理：
+    drop     直接删除分区
+    archive  先 EXCHANGE 到独立的归档表 <表名>_arch_pYYYYMM，再删除空分区；
+- 非 MySQL 数据库（如本地 SQLite）不支持分区，maintain 退化为分批 DELETE 过期行。
+"""
+import re
+from datetime import date, datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import text
+
+from modules.data_management.models import (
+    db,
+    AccessSuccessTracker,
+    OperationBehaviorTracker,
+    DataSensitivityTracker,
+    AccessTimeTracker,
+    AccessLocationTracker,
+)
+
+TRACKER_MODELS = (
+    AccessSuccessTracker,
+    OperationBehaviorTracker,
+    DataSensitivityTracker,
+    AccessTimeTracker,
+    AccessLocationTracker,
+)
+
+_MONTH_PARTITION = re.compile(r"^p(\d{4})(\d{2})$")
+_DELETE_BATCH_SIZE = 5000
+
+
+def add_months(day, months):
+    """返回 day 所在月份加 months 个月后的当月 1 日"""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month_start):
+    return f"p{month_start:%Y%m}"
+
+
+def partition_clause(month_start):
+    upper = add_months(month_start, 1)
+    return (
+        f"PARTITION {partition_name(month_start)} "
+        f"VALUES LESS THAN (TO_DAYS('{upper:%Y-%m-%d}'))"
+    )
+
+
+def retention_cutoff(today, retention_months):
+    """早于该日期（所在月份之前）的分区视为过期"""
+    return add_months(today, -retention_months)
+
+
+def _is_mysql():
+    return db.engine.dialect.name == "mysql"
+
+
+def _existing_partitions(table):
+    """返回 [(分区名, 行数估计)]，未分区时返回空列表"""
+    rows = db.session.execute(
+        text(
+            "SELECT PARTITION_NAME, TABLE_ROWS FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t "
+            "AND PARTITION_NAME IS NOT NULL ORDER BY PARTITION_ORDINAL_POSITION"
+        ),
+        {"t": table},
+    ).all()
+    return [(name, table_rows) for name, table_rows in rows]
+
+
+def _month_of(name):
+    match = _MONTH_PARTITION.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def _foreign_keys(table):
+    return db.session.execute(
+        text(
+            "SELECT CONSTRAINT_NAME FROM information_schema.TABLE_CONSTRAINTS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :t "
+            "AND CONSTRAINT_TYPE = 'FOREIGN KEY'"
+        ),
+        {"t": table},
+    ).scalars().all()
+
+
+# ─────────────────────────── SQL 生成 ───────────────────────────
+def plan_init(table, first_month, last_month, foreign_keys):
+    """把普通表改造为按月分区表所需的语句"""
+    statements = [
+        f"UPDATE `{table}` SET date_recorded = DATE(created_time) WHERE date_recorded IS NULL",
+    ]
+    statements += [f"ALTER TABLE `{table}` DROP FOREIGN KEY `{fk}`" for fk in foreign_keys]
+    statements.append(
+        f"ALTER TABLE `{table}` MODIFY date_recorded DATE NOT NULL, "
+        f"DROP PRIMARY KEY, ADD PRIMARY KEY (id, date_recorded)"
+    )
+    clauses = []
+    month = first_month
+    while month <= last_month:
+        clauses.append(partition_clause(month))
+        month = add_months(month, 1)
+    clauses.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    statements.append(
+        f"ALTER TABLE `{table}` PARTITION BY RANGE (TO_DAYS(date_recorded)) (\n    "
+        + ",\n    ".join(clauses)
+        + "\n)"
+    )
+    return statements
+
+
+def plan_maintain(table, partitions, today, ahead_months, retention_months, action):
+    """根据现有分区生成预建与过期处理语句"""
+    months = sorted(m for m in (_month_of(name) for name, _ in partitions) if m)
+    statements = []
+
+    # 1) 预建：从最后一个月分区（或当月）之后，直到当月 + ahead_months
+    target = add_months(today, ahead_months)
+    month = add_months(months[-1], 1) if months else add_months(today, 0)
+    missing = []
+    while month <= target:
+        missing.append(partition_clause(month))
+        month = add_months(month, 1)
+    if missing:
+        statements.append(
+            f"ALTER TABLE `{table}` REORGANIZE PARTITION pmax INTO (\n    "
+            + ",\n    ".join(missing + ["PARTITION pmax VALUES LESS THAN MAXVALUE"])
+            + "\n)"
+        )
+
+    # 2) 过期：整月早于保留期起点的分区
+    cutoff = retention_cutoff(today, retention_months)
+    for month in months:
+        if month >= cutoff:
+            break
+        name = partition_name(month)
+        if action == "archive":
+            archive = f"{table}_arch_{name}"
+            statements += [
+                f"CREATE TABLE IF NOT EXISTS `{archive}` LIKE `{table}`",
+                f"ALTER TABLE `{archive}` REMOVE PARTITIONING",
+                f"ALTER TABLE `{table}` EXCHANGE PARTITION {name} WITH TABLE `{archive}`",
+            ]
+        statements.append(f"ALTER TABLE `{table}` DROP PARTITION {name}")
+    return statements
+
+
+def _execute(statements, dry_run):
+    for sql in statements:
+        click.echo(sql + ";")
+        if not dry_run:
+            db.session.execute(text(sql))
+    if not dry_run:
+        db.session.commit()
+
+
+def _delete_expired(model, cutoff, dry_run):
+    """非 MySQL 数据库的退化处理：分批删除过期行"""
+    query = db.session.query(model.id).filter(model.date_recorded < cutoff)
+    if dry_run:
+        click.echo(f"{model.__tablename__}: 将删除 {query.count()} 行（date_recorded < {cutoff}）")
+        return
+    deleted = 0
+    while True:
+        ids = [row_id for (row_id,) in query.limit(_DELETE_BATCH_SIZE)]
+        if not ids:
+            break
+        model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+        db.session.commit()
+        deleted += len(ids)
+    click.echo(f"{model.__tablename__}: 已删除 {deleted} 行")
+
+
+# ─────────────────────────── CLI ───────────────────────────
+@click.group("tracker-partitions")
+def tracker_partitions_command():
+    """追踪表按月分区维护"""
+
+
+@tracker_partitions_command.command("init")
+@click.option("--dry-run", is_flag=True, help="只打印 SQL，不执行")
+@with_appcontext
+def init_command(dry_run):
+    """把五张追踪表改造为按月分区表（已分区的表跳过）"""
+    if not _is_mysql():
+        raise click.ClickException("分区仅支持 MySQL")
+    cfg = current_app.config
+    today = datetime.utcnow().date()
+    for model in TRACKER_MODELS:
+        table = model.__tablename__
+        if _existing_partitions(table):
+            click.echo(f"-- {table} 已分区，跳过")
+            continue
+        first = db.session.query(db.func.min(model.date_recorded)).scalar() or today
+        statements = plan_init(
+            table,
+            add_months(first, 0),
+            add_months(today, cfg["TRACKER_PARTITION_AHEAD_MONTHS"]),
+            _foreign_keys(table),
+        )
+        _execute(statements, dry_run)
+
+
+@tracker_partitions_command.command("maintain")
+@click.option("--dry-run", is_flag=True, help="只打印 SQL，不执行")
+@with_appcontext
+def maintain_command(dry_run):
+    """预建未来分区，并按保留期删除或归档过期分区"""
+    cfg = current_app.config
+    today = datetime.utcnow().date()
+    retention = cfg["TRACKER_RETENTION_MONTHS"]
+    action = cfg["TRACKER_EXPIRED_PARTITION_ACTION"]
+    if action not in ("drop", "archive"):
+        raise click.ClickException(f"未知的 TRACKER_EXPIRED_PARTITION_ACTION: {action}")
+
+    if not _is_mysql():
+        cutoff = retention_cutoff(today, retention)
+        for model in TRACKER_MODELS:
+            _delete_expired(model, cutoff, dry_run)
+        return
+
+    for model in TRACKER_MODELS:
+        table = model.__tablename__
+        partitions = _existing_partitions(table)
+        if not partitions:
+            click.echo(f"-- {table} 尚未分区，请先执行 tracker-partitions init")
+            continue
+        statements = plan_maintain(
+            table, partitions, today, cfg["TRACKER_PARTITION_AHEAD_MONTHS"], retention, action
+        )
+        _execute(statements, dry_run)
+
+
+@tracker_partitions_command.command("status")
+@with_appcontext
+def status_command():
+    """列出各追踪表的分区及行数估计"""
+    if not _is_mysql():
+        raise click.ClickException("分区仅支持 MySQL")
+    for model in TRACKER_MODELS:
+        table = model.__tablename__
+        partitions = _existing_partitions(table)
+        click.echo(f"{table}: {'未分区' if not partitions else f'{len(partitions)} 个分区'}")
+        for name, table_rows in partitions:
+            click.echo(f"    {name:<10} {table_rows}")
@@ -1,10 +1,8 @@
 # modules/data_management/routes.py
-from datetime import datetime
-import uuid
+from datetime import date, datetime, timedelta
 
 from flask import Blueprint, request, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import func
 
 from modules.data_management.models import (
     db,
@@ -14,6 +12,7 @@ from modules.data_management.models import (
     AccessTimeTracker,
     AccessLocationTracker,
 )
+from modules.data_management import tracker_store
 from modules.auth.models import User
 from modules.auth.decorators import role_required
 
@@ -27,6 +26,46 @@ from utils.response import (
 data_mgmt_bp = Blueprint("data_management", __name__)
 
 
+def _parse_date(value):
+    """接受 YYYY-MM-DD 或 ISO 时间字符串，返回 date"""
+    return date.fromisoformat(value[:10])
+
+
+_TIME_COLUMNS = ("date_recorded", "created_time", "updated_time")
+
+
+def _history_records(model, user_id, columns):
+    """
+    按 date_recorded 范围查询某用户的历史记录（按日期倒序）。
+    未指定范围时默认最近 TRACKER_HISTORY_DEFAULT_DAYS 天，保证查询带有分区键条件
+    （MySQL 分区表只扫描涉及的月份分区）；范围内已归档的月份从列式归档文件中
+    只读取 columns 列，与库中的行合并（见 tracker_store.history）。
+    """
+    end = request.args.get("end_date")
+    start = request.args.get("start_date")
+    end_date = _parse_date(end) if end else datetime.utcnow().date()
+    if start:
+        start_date = _parse_date(start)
+    else:
+        days = current_app.config["TRACKER_HISTORY_DEFAULT_DAYS"]
+        start_date = end_date - timedelta(days=days)
+    return tracker_store.history(
+        model, user_id, start_date, end_date, (*columns, *_TIME_COLUMNS)
+    )
+
+
+def _target_user_id(data, current_user_id):
+    return int(data.get("user_id", current_user_id))
+
+
+def _record_times(r):
+    return {
+        "date_recorded": r.date_recorded.isoformat() if r.date_recorded else None,
+        "created_time": r.created_time.isoformat() if r.created_time else None,
+        "updated_time": r.updated_time.isoformat() if r.updated_time else None,
+    }
+
+
 # ─────────────────────────── 访问成功率 ───────────────────────────
 @data_mgmt_bp.route("/access-success/user/<user_id>", methods=["GET"])
 @jwt_required()
@@ -38,21 +77,10 @@ def get_user_access_success(user_id):
         if not user:
             return not_found_response("用户不存在")
 
-        start_date = request.args.get("start_date")
-        end_date = request.args.get("end_date")
-
-        query = AccessSuccessTracker.query.filter_by(user_id=user_id)
-
-        if start_date:
-            query = query.filter(
-                AccessSuccessTracker.created_time >= datetime.fromisoformat(start_date)
-            )
-        if end_date:
-            query = query.filter(
-                AccessSuccessTracker.created_time <= datetime.fromisoformat(end_date)
-            )
-
-        records = query.order_by(AccessSuccessTracker.created_time.desc()).all()
+        try:
+            records = _history_records(AccessSuccessTracker, user_id, ("ast_num_as", "ast_num_af"))
+        except ValueError:
+            return error_response("日期格式错误，应为 YYYY-MM-DD", 400)
 
         data = [
             {
@@ -63,8 +91,7 @@ def get_user_access_success(user_id):
                 / (r.ast_num_as + r.ast_num_af)
                 if (r.ast_num_as + r.ast_num_af) > 0
                 else 0,
-                "created_time": r.created_time.isoformat(),
-                "updated_time": r.updated_time.isoformat() if r.updated_time else None,
+                **_record_times(r),
             }
             for r in records
         ]
@@ -87,28 +114,15 @@ def update_access_success():
         if not data:
             return error_response("请求数据不能为空", 400)
 
-        user_id = data.get("user_id", current_user_id)
+        user_id = _target_user_id(data, current_user_id)
         num_as = data.get("num_as", 0)
         num_af = data.get("num_af", 0)
 
-        today = datetime.utcnow().date()
-        record = AccessSuccessTracker.query.filter(
-            AccessSuccessTracker.user_id == user_id,
-            func.date(AccessSuccessTracker.created_time) == today,
-        ).first()
-
-        if record:
-            record.ast_num_as += num_as
-            record.ast_num_af += num_af
-            record.updated_time = datetime.utcnow()
-        else:
-            record = AccessSuccessTracker(
-                id=str(uuid.uuid4()),
-                user_id=user_id,
-                ast_num_as=num_as,
-                ast_num_af=num_af,
-            )
-            db.session.add(record)
+        record = tracker_store.daily_record(
+            AccessSuccessTracker, user_id, ast_num_as=0, ast_num_af=0
+        )
+        record.ast_num_as += num_as
+        record.ast_num_af += num_af
 
         db.session.commit()
         return success_response(message="访问成功率数据更新成功")
@@ -130,38 +144,31 @@ def get_user_operation_behavior(user_id):
         if not user:
             return not_found_response("用户不存在")
 
-        start_date = request.args.get("start_date")
-        end_date = request.args.get("end_date")
-
-        query = OperationBehaviorTracker.query.filter_by(user_id=user_id)
-
-        if start_date:
-            query = query.filter(
-                OperationBehaviorTracker.created_time >= datetime.fromisoformat(
-                    start_date
-                )
+        try:
+            records = _history_records(
+                OperationBehaviorTracker,
+                user_id,
+                (
+                    "ob_num_view", "ob_num_copy", "ob_num_download", "ob_num_add",
+                    "ob_num_revise", "ob_num_delete", "ob_a", "ob_b", "ob_c",
+                ),
             )
-        if end_date:
-            query = query.filter(
-                OperationBehaviorTracker.created_time <= datetime.fromisoformat(end_date)
-            )
-
-        records = query.order_by(OperationBehaviorTracker.created_time.desc()).all()
+        except ValueError:
+            return error_response("日期格式错误，应为 YYYY-MM-DD", 400)
 
         data = [
             {
                 "id": r.id,
-                "num_view": r.num_view,
-                "num_copy": r.num_copy,
-                "num_download": r.num_download,
-                "num_add": r.num_add,
-                "num_revise": r.num_revise,
-                "num_delete": r.num_delete,
+                "num_view": r.ob_num_view,
+                "num_copy": r.ob_num_copy,
+                "num_download": r.ob_num_download,
+                "num_add": r.ob_num_add,
+                "num_revise": r.ob_num_revise,
+                "num_delete": r.ob_num_delete,
                 "ob_a": r.ob_a,
                 "ob_b": r.ob_b,
                 "ob_c": r.ob_c,
-                "created_time": r.created_time.isoformat(),
-                "updated_time": r.updated_time.isoformat() if r.updated_time else None,
+                **_record_times(r),
             }
             for r in records
         ]
@@ -184,37 +191,27 @@ def update_operation_behavior():
         if not data:
             return error_response("请求数据不能为空", 400)
 
-        user_id = data.get("user_id", current_user_id)
-
-        today = datetime.utcnow().date()
-        record = OperationBehaviorTracker.query.filter(
-            OperationBehaviorTracker.user_id == user_id,
-            func.date(OperationBehaviorTracker.created_time) == today,
-        ).first()
-
-        if record:
-            record.num_view += data.get("num_view", 0)
-            record.num_copy += data.get("num_copy", 0)
-            record.num_download += data.get("num_download", 0)
-            record.num_add += data.get("num_add", 0)
-            record.num_revise += data.get("num_revise", 0)
-            record.num_delete += data.get("num_delete", 0)
-            record.updated_time = datetime.utcnow()
-        else:
-            record = OperationBehaviorTracker(
-                id=str(uuid.uuid4()),
-                user_id=user_id,
-                num_view=data.get("num_view", 0),
-                num_copy=data.get("num_copy", 0),
-                num_download=data.get("num_download", 0),
-                num_add=data.get("num_add", 0),
-                num_revise=data.get("num_revise", 0),
-                num_delete=data.get("num_delete", 0),
-                ob_a=data.get("ob_a", 0.3),
-                ob_b=data.get("ob_b", 0.3),
-                ob_c=data.get("ob_c", 0.4),
-            )
-            db.session.add(record)
+        user_id = _target_user_id(data, current_user_id)
+
+        record = tracker_store.daily_record(
+            OperationBehaviorTracker,
+            user_id,
+            ob_num_view=0,
+            ob_num_copy=0,
+            ob_num_download=0,
+            ob_num_add=0,
+            ob_num_revise=0,
+            ob_num_delete=0,
+            ob_a=data.get("ob_a", 0.3),
+            ob_b=data.get("ob_b", 0.3),
+            ob_c=data.get("ob_c", 0.4),
+        )
+        record.ob_num_view += data.get("num_view", 0)
+        record.ob_num_copy += data.get("num_copy", 0)
+        record.ob_num_download += data.get("num_download", 0)
+        record.ob_num_add += data.get("num_add", 0)
+        record.ob_num_revise += data.get("num_revise", 0)
+        record.ob_num_delete += data.get("num_delete", 0)
 
         db.session.commit()
         return success_response(message="操作行为数据更新成功")
@@ -236,37 +233,30 @@ def get_user_data_sensitivity(user_id):
         if not user:
             return not_found_response("用户不存在")
 
-        start_date = request.args.get("start_date")
-        end_date = request.args.get("end_date")
-
-        query = DataSensitivityTracker.query.filter_by(user_id=user_id)
-
-        if start_date:
-            query = query.filter(
-                DataSensitivityTracker.created_time >= datetime.fromisoformat(
-                    start_date
-                )
+        try:
+            records = _history_records(
+                DataSensitivityTracker,
+                user_id,
+                (
+                    "ds_num1", "ds_num2", "ds_num3", "ds_num4",
+                    "ds_a", "ds_b", "ds_c", "ds_d",
+                ),
             )
-        if end_date:
-            query = query.filter(
-                DataSensitivityTracker.created_time <= datetime.fromisoformat(end_date)
-            )
-
-        records = query.order_by(DataSensitivityTracker.created_time.desc()).all()
+        except ValueError:
+            return error_response("日期格式错误，应为 YYYY-MM-DD", 400)
 
         data = [
             {
                 "id": r.id,
-                "num1": r.num1,
-                "num2": r.num2,
-                "num3": r.num3,
-                "num4": r.num4,
+                "num1": r.ds_num1,
+                "num2": r.ds_num2,
+                "num3": r.ds_num3,
+                "num4": r.ds_num4,
                 "ds_a": r.ds_a,
                 "ds_b": r.ds_b,
                 "ds_c": r.ds_c,
                 "ds_d": r.ds_d,
-                "created_time": r.created_time.isoformat(),
-                "updated_time": r.updated_time.isoformat() if r.updated_time else None,
+                **_record_times(r),
             }
             for r in records
         ]
@@ -289,34 +279,24 @@ def update_data_sensitivity():
         if not data:
             return error_response("请求数据不能为空", 400)
 
-        user_id = data.get("user_id", current_user_id)
-
-        today = datetime.utcnow().date()
-        record = DataSensitivityTracker.query.filter(
-            DataSensitivityTracker.user_id == user_id,
-            func.date(DataSensitivityTracker.created_time) == today,
-        ).first()
-
-        if record:
-            record.num1 += data.get("num1", 0)
-            record.num2 += data.get("num2", 0)
-            record.num3 += data.get("num3", 0)
-            record.num4 += data.get("num4", 0)
-            record.updated_time = datetime.utcnow()
-        else:
-            record = DataSensitivityTracker(
-                id=str(uuid.uuid4()),
-                user_id=user_id,
-                num1=data.get("num1", 0),
-                num2=data.get("num2", 0),
-                num3=data.get("num3", 0),
-                num4=data.get("num4", 0),
-                ds_a=data.get("ds_a", 1.0),
-                ds_b=data.get("ds_b", 1.0),
-                ds_c=data.get("ds_c", 1.0),
-                ds_d=data.get("ds_d", 1.0),
-            )
-            db.session.add(record)
+        user_id = _target_user_id(data, current_user_id)
+
+        record = tracker_store.daily_record(
+            DataSensitivityTracker,
+            user_id,
+            ds_num1=0,
+            ds_num2=0,
+            ds_num3=0,
+            ds_num4=0,
+            ds_a=data.get("ds_a", 1.0),
+            ds_b=data.get("ds_b", 1.0),
+            ds_c=data.get("ds_c", 1.0),
+            ds_d=data.get("ds_d", 1.0),
+        )
+        record.ds_num1 += data.get("num1", 0)
+        record.ds_num2 += data.get("num2", 0)
+        record.ds_num3 += data.get("num3", 0)
+        record.ds_num4 += data.get("num4", 0)
 
         db.session.commit()
         return success_response(message="数据敏感度数据更新成功")
@@ -338,29 +318,17 @@ def get_user_access_period(user_id):
         if not user:
             return not_found_response("用户不存在")
 
-        start_date = request.args.get("start_date")
-        end_date = request.args.get("end_date")
-
-        query = AccessTimeTracker.query.filter_by(user_id=user_id)
-
-        if start_date:
-            query = query.filter(
-                AccessTimeTracker.created_time >= datetime.fromisoformat(start_date)
-            )
-        if end_date:
-            query = query.filter(
-                AccessTimeTracker.created_time <= datetime.fromisoformat(end_date)
-            )
-
-        records = query.order_by(AccessTimeTracker.created_time.desc()).all()
+        try:
+            records = _history_records(AccessTimeTracker, user_id, ("ap_num_ni", "ap_num_ui"))
+        except ValueError:
+            return error_response("日期格式错误，应为 YYYY-MM-DD", 400)
 
         data = [
             {
                 "id": r.id,
-                "num_ni": r.num_ni,
-                "num_ui": r.num_ui,
-                "created_time": r.created_time.isoformat(),
-                "updated_time": r.updated_time.isoformat() if r.updated_time else None,
+                "num_ni": r.ap_num_ni,
+                "num_ui": r.ap_num_ui,
+                **_record_times(r),
             }
             for r in records
         ]
@@ -383,26 +351,11 @@ def update_access_period():
         if not data:
             return error_response("请求数据不能为空", 400)
 
-        user_id = data.get("user_id", current_user_id)
-
-        today = datetime.utcnow().date()
-        record = AccessTimeTracker.query.filter(
-            AccessTimeTracker.user_id == user_id,
-            func.date(AccessTimeTracker.created_time) == today,
-        ).first()
-
-        if record:
-            record.num_ni += data.get("num_ni", 0)
-            record.num_ui += data.get("num_ui", 0)
-            record.updated_time = datetime.utcnow()
-        else:
-            record = AccessTimeTracker(
-                id=str(uuid.uuid4()),
-                user_id=user_id,
-                num_ni=data.get("num_ni", 0),
-                num_ui=data.get("num_ui", 0),
-            )
-            db.session.add(record)
+        user_id = _target_user_id(data, current_user_id)
+
+        record = tracker_store.daily_record(AccessTimeTracker, user_id, ap_num_ni=0, ap_num_ui=0)
+        record.ap_num_ni += data.get("num_ni", 0)
+        record.ap_num_ui += data.get("num_ui", 0)
 
         db.session.commit()
         return success_response(message="访问时间数据更新成功")
@@ -424,29 +377,17 @@ def get_user_access_location(user_id):
         if not user:
             return not_found_response("用户不存在")
 
-        start_date = request.args.get("start_date")
-        end_date = request.args.get("end_date")
-
-        query = AccessLocationTracker.query.filter_by(user_id=user_id)
-
-        if start_date:
-            query = query.filter(
-                AccessLocationTracker.created_time >= datetime.fromisoformat(start_date)
-            )
-        if end_date:
-            query = query.filter(
-                AccessLocationTracker.created_time <= datetime.fromisoformat(end_date)
-            )
-
-        records = query.order_by(AccessLocationTracker.created_time.desc()).all()
+        try:
+            records = _history_records(AccessLocationTracker, user_id, ("at_num_nd", "at_num_ad"))
+        except ValueError:
+            return error_response("日期格式错误，应为 YYYY-MM-DD", 400)
 
         data = [
             {
                 "id": r.id,
-                "num_nd": r.num_nd,
-                "num_ad": r.num_ad,
-                "created_time": r.created_time.isoformat(),
-                "updated_time": r.updated_time.isoformat() if r.updated_time else None,
+                "num_nd": r.at_num_nd,
+                "num_ad": r.at_num_ad,
+                **_record_times(r),
             }
             for r in records
         ]
@@ -469,26 +410,11 @@ def update_access_location():
         if not data:
             return error_response("请求数据不能为空", 400)
 
-        user_id = data.get("user_id", current_user_id)
-
-        today = datetime.utcnow().date()
-        record = AccessLocationTracker.query.filter(
-            AccessLocationTracker.user_id == user_id,
-            func.date(AccessLocationTracker.created_time) == today,
-        ).first()
-
-        if record:
-            record.num_nd += data.get("num_nd", 0)
-            record.num_ad += data.get("num_ad", 0)
-            record.updated_time = datetime.utcnow()
-        else:
-            record = AccessLocationTracker(
-                id=str(uuid.uuid4()),
-                user_id=user_id,
-                num_nd=data.get("num_nd", 0),
-                num_ad=data.get("num_ad", 0),
-            )
-            db.session.add(record)
+        user_id = _target_user_id(data, current_user_id)
+
+        record = tracker_store.daily_record(AccessLocationTracker, user_id, at_num_nd=0, at_num_ad=0)
+        record.at_num_nd += data.get("num_nd", 0)
+        record.at_num_ad += data.get("num_ad", 0)
 
         db.session.commit()
         return success_response(message="访问 IP 数据更新成功")
@@ -0,0 +1,101 @@
+# modules/data_management/schema_upgrade.py
+"""
+已有数据库的结构升级：db.create_all() 只创建缺少的表，不会修改已有表
+
+    flask --app app schema-upgrade             # 按模型补齐表、列、索引与 NOT NULL 约束
+    flask --app app schema-upgrade --dry-run   # 只打印将要执行的 SQL
+
+依次处理（均按当前库结构判断，已完成的步骤跳过，可重复执行）：
+1. 缺少的表：group_network、user_activity_profile、user_daily_metrics、icd10_pinyin_keys 等，
+   连同其索引一起创建；
+2. 已有表缺少的列：group.member_count / active_member_count（INT NOT NULL DEFAULT 0）；
+   补齐后执行 reconcile-group-counts 校准计数；
+3. 已有表缺少的索引：idx_ugr_group_enable_user、各追踪表的 idx_<表名>_user_date 等；
+4. 五张追踪表的 date_recorded 改为 NOT NULL：先以 created_time 的日期回填空值
+   （SQLite 不支持修改列约束，只回填）。
+
+按月分区（tracker-partitions init）应在本命令之后执行。
+"""
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+
+import models  # noqa: F401  注册全部模型，使 db.metadata 包含各模块的表
+from modules.data_management.models import db
+from modules.data_management.partitions import TRACKER_MODELS
+
+
+def _compile(element):
+    return str(element.compile(dialect=db.engine.dialect)).strip()
+
+
+def plan_upgrade(inspector):
+    """按当前库结构生成升级语句"""
+    dialect = db.engine.dialect.name
+    preparer = db.engine.dialect.identifier_preparer
+    existing_tables = set(inspector.get_table_names())
+    statements = []
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            statements.append(_compile(CreateTable(table)))
+            statements += [_compile(CreateIndex(index)) for index in table.indexes]
+            continue
+
+        columns = {c["name"]: c for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in columns:
+                continue
+            if not column.nullable and column.server_default is None:
+                raise click.ClickException(
+                    f"{table.name}.{column.name} 为 NOT NULL 且没有 server_default，无法自动补齐"
+                )
+            statements.append(
+                f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {_compile(CreateColumn(column))}"
+            )
+
+        indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        indexes |= {u["name"] for u in inspector.get_unique_constraints(table.name)}
+        statements += [
+            _compile(CreateIndex(index)) for index in table.indexes if index.name not in indexes
+        ]
+
+    for model in TRACKER_MODELS:
+        table = model.__table__
+        if table.name not in existing_tables:
+            continue
+        column = {c["name"]: c for c in inspector.get_columns(table.name)}["date_recorded"]
+        if not column["nullable"]:
+            continue
+        if dialect not in ("mysql", "postgresql") and not db.session.query(
+            model.query.filter(model.date_recorded.is_(None)).exists()
+        ).scalar():
+            continue  # 无法修改约束且没有待回填的行
+        name = preparer.format_table(table)
+        day = "CAST(created_time AS DATE)" if dialect == "postgresql" else "DATE(created_time)"
+        statements.append(f"UPDATE {name} SET date_recorded = {day} WHERE date_recorded IS NULL")
+        if dialect == "mysql":
+            statements.append(f"ALTER TABLE {name} MODIFY date_recorded DATE NOT NULL")
+        elif dialect == "postgresql":
+            statements.append(f"ALTER TABLE {name} ALTER COLUMN date_recorded SET NOT NULL")
+    return statements
+
+
+@click.command("schema-upgrade")
+@click.option("--dry-run", is_flag=True, help="只打印 SQL，不执行")
+@with_appcontext
+def schema_upgrade_command(dry_run):
+    """按模型补齐已有数据库缺少的表、列、索引与约束"""
+    statements = plan_upgrade(inspect(db.engine))
+    if not statements:
+        click.echo("数据库结构已是最新")
+        return
+    for sql in statements:
+        click.echo(sql + ";")
+    if dry_run:
+        return
+    with db.engine.begin() as conn:
+        for sql in statements:
+            conn.exec_driver_sql(sql)
+    click.echo(f"已执行 {len(statements)} 条语句；如补齐了组成员计数列，请执行 reconcile-group-counts")
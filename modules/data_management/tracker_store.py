@@ -0,0 +1,235 @@
+# modules/data_management/tracker_store.py
+"""
+追踪数据的存储方式（TRACKER_STORAGE）
+
+    split  五张追踪表各自一行（默认）；
+    wide   合并到 user_daily_metrics，每个用户每天一行。
+
+宽表的列名与各追踪表一致，接口层通过本模块读写，不关心存储方式：
+- daily_record(model, ...)  取当天的可写行（宽表模式下返回宽表行）；
+- add_daily(...)            一次访问的全部计数：宽表模式下是一条 upsert
+                           （MySQL ON DUPLICATE KEY UPDATE / SQLite、PostgreSQL ON CONFLICT），
+                           带 IP 时再在同一事务内追加 ip_history；
+- history(model, ...)       日期范围内的历史（合并列式归档，见 archive.py）。
+
+切换到 wide 后，用 `flask --app app tracker-storage migrate` 把追踪表中的存量数据并入宽表。
+"""
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from modules.data_management.archive import read_archived
+from modules.data_management.models import (
+    db,
+    AccessLocationTracker,
+    UserDailyMetrics,
+    append_ip_history,
+    get_or_create_daily,
+)
+from modules.data_management.partitions import TRACKER_MODELS
+
+_KEY_COLUMNS = ("id", "user_id", "date_recorded", "created_time", "updated_time")
+_MIGRATE_BATCH_SIZE = 1000
+
+
+def _metric_columns(model):
+    return [c for c in model.__table__.columns if c.name not in _KEY_COLUMNS]
+
+
+# 各追踪表新建行时的初始值（计数为 0，权重取列默认值）
+_INITIAL = {
+    model: {
+        c.name: c.default.arg
+        for c in _metric_columns(model)
+        if c.default is not None and not callable(c.default.arg)
+    }
+    for model in TRACKER_MODELS
+}
+
+
+def wide_mode():
+    return current_app.config["TRACKER_STORAGE"] == "wide"
+
+
+def query(model):
+    """追踪表（或宽表视图）的查询对象"""
+    return UserDailyMetrics.query if wide_mode() else model.query
+
+
+def daily_record(model, user_id, day=None, **initial):
+    """取用户当天的可写记录，属性名与 model 一致"""
+    if wide_mode():
+        return get_or_create_daily(UserDailyMetrics, user_id, day, **initial)
+    return get_or_create_daily(model, user_id, day, **initial)
+
+
+def first_records(user_id):
+    """{追踪表: 该用户的一条记录或 None}；宽表模式下各追踪表共用同一行"""
+    if wide_mode():
+        row = UserDailyMetrics.query.filter_by(user_id=user_id).first()
+        return {model: row for model in TRACKER_MODELS}
+    return {model: model.query.filter_by(user_id=user_id).first() for model in TRACKER_MODELS}
+
+
+def history(model, user_id, start, end, columns):
+    """
+    [start, end] 内的历史记录，按日期倒序。
+    库中的行与归档文件中的行合并，同一天以库中为准；宽表模式下还包含切换前追踪表的归档。
+    """
+    live_model = UserDailyMetrics if wide_mode() else model
+    records = live_model.query.filter(
+        live_model.user_id == user_id,
+        live_model.date_recorded >= start,
+        live_model.date_recorded <= end,
+    ).all()
+    sources = (model, UserDailyMetrics) if wide_mode() else (model,)
+    live_days = {r.date_recorded for r in records}
+    for source in sources:
+        for r in read_archived(source, int(user_id), start, end, columns):
+            if r.date_recorded not in live_days:
+                records.append(r)
+                live_days.add(r.date_recorded)
+    records.sort(key=lambda r: r.date_recorded, reverse=True)
+    return records
+
+
+# ─────────────────────────── 一次访问的计数 ───────────────────────────
+def _upsert_statement(dialect, values, increments, assignments):
+    table = UserDailyMetrics.__table__
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+
+        stmt = insert(table).values(**values)
+        return stmt.on_duplicate_key_update(
+            {name: table.c[name] + stmt.inserted[name] for name in increments},
+            **{name: stmt.inserted[name] for name in assignments},
+        )
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+
+        stmt = insert(table).values(**values)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.date_recorded],
+            set_={
+                **{name: table.c[name] + stmt.excluded[name] for name in increments},
+                **{name: stmt.excluded[name] for name in assignments},
+            },
+        )
+    return None
+
+
+def _append_ip(user_id, day, ip):
+    """按追踪表的规则追加宽表行的 ip_history；upsert 已锁住该行，读-改-写不会丢失并发的追加"""
+    where = (UserDailyMetrics.user_id == user_id, UserDailyMetrics.date_recorded == day)
+    current = db.session.execute(
+        db.select(UserDailyMetrics.ip_history).where(*where).with_for_update()
+    ).scalar()
+    db.session.execute(
+        db.update(UserDailyMetrics).where(*where).values(ip_history=append_ip_history(current, ip))
+    )
+
+
+def add_daily(user_id, day, increments, ip=None):
+    """
+    累加一次访问的各项计数，increments 为 {列名: 增量}（列名同追踪表）。
+    调用方负责提交事务。
+    """
+    if not wide_mode():
+        for model in TRACKER_MODELS:
+            record = get_or_create_daily(model, user_id, day, **_INITIAL[model])
+            for name, n in increments.items():
+                if hasattr(model, name):
+                    setattr(record, name, getattr(record, name) + n)
+            if ip and model is AccessLocationTracker:
+                record.add_ip_to_history(ip)
+        return
+
+    now = datetime.utcnow()
+    assignments = {"updated_time": now}
+    if ip:
+        assignments["last_ip"] = ip
+    values = {"user_id": user_id, "date_recorded": day, "created_time": now,
+              **increments, **assignments}
+    dialect = db.session.get_bind(mapper=UserDailyMetrics.__mapper__).dialect.name
+    stmt = _upsert_statement(dialect, values, increments, assignments)
+    if stmt is not None:
+        db.session.execute(stmt)
+        if ip:
+            _append_ip(user_id, day, ip)
+        return
+    # 其他数据库：读-改-写
+    record = get_or_create_daily(UserDailyMetrics, user_id, day)
+    for name, n in increments.items():
+        setattr(record, name, (getattr(record, name) or 0) + n)
+    for name, value in assignments.items():
+        setattr(record, name, value)
+    if ip:
+        record.ip_history = append_ip_history(record.ip_history, ip)
+
+
+# ─────────────────────────── 存量迁移 ───────────────────────────
+def _fold_batch(model, rows):
+    """把一批追踪表行并入宽表：计数相加，权重与 IP 字段仅在宽表中为空时取追踪表的值"""
+    columns = _metric_columns(model)
+    keys = {(r.user_id, r.date_recorded) for r in rows}
+    existing = {
+        (m.user_id, m.date_recorded): m
+        for m in UserDailyMetrics.query.filter(
+            db.tuple_(UserDailyMetrics.user_id, UserDailyMetrics.date_recorded).in_(keys)
+        )
+    }
+    for r in rows:
+        key = (r.user_id, r.date_recorded)
+        target = existing.get(key)
+        if target is None:
+            target = existing[key] = UserDailyMetrics(
+                user_id=r.user_id, date_recorded=r.date_recorded, created_time=r.created_time
+            )
+            db.session.add(target)
+        for column in columns:
+            value = getattr(r, column.name)
+            if isinstance(column.type, db.Integer):
+                setattr(target, column.name, (getattr(target, column.name) or 0) + (value or 0))
+            elif getattr(target, column.name) is None:
+                setattr(target, column.name, value)
+
+
+@click.group("tracker-storage")
+def tracker_storage_command():
+    """追踪数据存储方式（split / wide）"""
+
+
+@tracker_storage_command.command("migrate")
+@click.option("--dry-run", is_flag=True, help="只统计待迁移行数")
+@with_appcontext
+def migrate_command(dry_run):
+    """
+    把五张追踪表的数据并入 user_daily_metrics，并从追踪表删除已并入的行。
+    每批并入与删除在同一事务内，中断后重跑从剩余行继续；应在切换为 wide 之后执行。
+    """
+    if not dry_run and not wide_mode():
+        raise click.ClickException("请先设置 TRACKER_STORAGE=wide，否则迁移期间的新写入仍会进入追踪表")
+    db.create_all()
+    for model in TRACKER_MODELS:
+        table = model.__tablename__
+        if dry_run:
+            click.echo(f"{table}: {model.query.count()} 行待迁移")
+            continue
+        moved = 0
+        while True:
+            rows = model.query.order_by(model.id).limit(_MIGRATE_BATCH_SIZE).all()
+            if not rows:
+                break
+            _fold_batch(model, rows)
+            model.query.filter(model.id.in_([r.id for r in rows])).delete(
+                synchronize_session=False
+            )
+            db.session.commit()
+            db.session.expunge_all()
+            moved += len(rows)
+        click.echo(f"{table}: 已并入 {moved} 行")
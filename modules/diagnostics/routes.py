@@ -0,0 +1,126 @@
+# modules/diagnostics/routes.py
+"""
+运维诊断接口（仅管理员）
+
+    POST /api/diagnostics/profiler/start           {"duration": 30, "hz": 50, "route": "/api/users/users"}
+    POST /api/diagnostics/profiler/stop
+    GET  /api/diagnostics/profiler/status
+    GET  /api/diagnostics/profiler/profiles         已完成的剖析结果列表
+    GET  /api/diagnostics/profiler/profiles/<id>    下载 collapsed stack 文本（火焰图输入）
+    GET  /api/diagnostics/slow-queries?limit=50     本进程最近的慢查询（见 utils/query_watch.py）
+"""
+import os
+import re
+
+from flask import Blueprint, request, current_app, send_file
+
+from modules.auth.decorators import admin_required
+from utils.profiler import profiler, ProfilerBusyError
+from utils.query_watch import query_watch
+from utils.response import (
+    success_response,
+    error_response,
+    not_found_response,
+    server_error_response,
+)
+
+diagnostics_bp = Blueprint("diagnostics", __name__)
+
+_PROFILE_ID = re.compile(r"^\d{14}-[0-9a-f]{8}$")
+_PROFILE_LIST_LIMIT = 50
+
+
+def _route_rules():
+    return {rule.rule for rule in current_app.url_map.iter_rules()}
+
+
+@diagnostics_bp.route("/profiler/start", methods=["POST"])
+@admin_required
+def start_profiler():
+    """在当前 worker 进程内启动一次限时采样"""
+    cfg = current_app.config
+    data = request.get_json(silent=True) or {}
+    try:
+        duration = float(data.get("duration", cfg["PROFILER_DEFAULT_DURATION"]))
+        hz = int(data.get("hz", cfg["PROFILER_DEFAULT_HZ"]))
+    except (TypeError, ValueError):
+        return error_response("duration / hz 必须为数字", 400)
+    if not 0 < duration <= cfg["PROFILER_MAX_DURATION"]:
+        return error_response(f"duration 应在 (0, {cfg['PROFILER_MAX_DURATION']}] 秒之间", 400)
+    if not 1 <= hz <= cfg["PROFILER_MAX_HZ"]:
+        return error_response(f"hz 应在 [1, {cfg['PROFILER_MAX_HZ']}] 之间", 400)
+
+    route = data.get("route") or None
+    if route is not None and route not in _route_rules():
+        return error_response("route 应为已注册的路由规则，如 /api/users/users", 400)
+
+    try:
+        info = profiler.start(cfg["PROFILER_OUTPUT_DIR"], duration, hz, route)
+    except ProfilerBusyError:
+        return error_response("本进程已有剖析正在运行", 409)
+    except Exception:  # pragma: no cover
+        current_app.logger.exception("Start profiler error")
+        return server_error_response("启动剖析失败")
+    return success_response(info, "剖析已启动")
+
+
+@diagnostics_bp.route("/profiler/stop", methods=["POST"])
+@admin_required
+def stop_profiler():
+    """提前结束当前进程内的剖析"""
+    status = profiler.stop()
+    if status is None:
+        return error_response("本进程没有正在运行的剖析", 409)
+    return success_response(status, "剖析已结束")
+
+
+@diagnostics_bp.route("/profiler/status", methods=["GET"])
+@admin_required
+def profiler_status():
+    return success_response(profiler.status())
+
+
+@diagnostics_bp.route("/profiler/profiles", methods=["GET"])
+@admin_required
+def list_profiles():
+    output_dir = current_app.config["PROFILER_OUTPUT_DIR"]
+    try:
+        names = sorted(
+            (n for n in os.listdir(output_dir) if n.endswith(".folded")), reverse=True
+        )
+    except FileNotFoundError:
+        names = []
+    profiles = []
+    for name in names[:_PROFILE_LIST_LIMIT]:
+        stat = os.stat(os.path.join(output_dir, name))
+        profiles.append({"profile_id": name[: -len(".folded")], "size": stat.st_size})
+    return success_response({"profiles": profiles})
+
+
+@diagnostics_bp.route("/profiler/profiles/<profile_id>", methods=["GET"])
+@admin_required
+def download_profile(profile_id):
+    if not _PROFILE_ID.match(profile_id):
+        return not_found_response("剖析结果不存在")
+    path = os.path.join(current_app.config["PROFILER_OUTPUT_DIR"], f"{profile_id}.folded")
+    if not os.path.isfile(path):
+        return not_found_response("剖析结果不存在")
+    return send_file(
+        path,
+        mimetype="text/plain",
+        as_attachment=True,
+        download_name=f"{profile_id}.folded",
+        max_age=0,
+    )
+
+
+@diagnostics_bp.route("/slow-queries", methods=["GET"])
+@admin_required
+def slow_queries():
+    """本 worker 进程最近记录的慢查询（新的在前）"""
+    limit = request.args.get("limit", 50, type=int)
+    return success_response({
+        "threshold_ms": current_app.config["QUERY_WATCH_THRESHOLD_MS"],
+        "enabled": current_app.config["QUERY_WATCH_ENABLED"],
+        "slow_queries": query_watch.recent(max(limit, 1)),
+    })
@@ -0,0 +1,108 @@
+# modules/icd10/browse_tree.py
+"""
+ICD-10 分级浏览树：章/类别（chapter）→ 细分类（subcategory）→ 编码
+
+- 一次全表扫描（只取浏览需要的列）构建，各层节点附带子节点数与编码数；
+- 缓存在进程内，启动预热时构建（未预热时在首次使用时构建）；
+  以 icd10_codes 表的 ETag 版本戳判断是否需要重建，其他 worker 导入编码后
+  在 ETAG_SEED_TTL 秒内生效；
+- 返回的列表由各请求共享，调用方不得修改。
+"""
+import threading
+
+from flask import current_app
+
+from modules.data_management.models import db, ICD10Code
+from utils.etag import etag_registry
+from utils.lifecycle import register_warmup
+
+TABLE = ICD10Code.__tablename__
+
+
+class ICD10BrowseTree:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._chapters = []  # [{chapter, title, subcategory_count, code_count}]，按 chapter 排序
+        self._subcategories = {}  # chapter -> [{subcategory, title, code_count}]
+        self._codes = {}  # (chapter, subcategory) -> [{code, description, short_desc}]
+        self._version = None
+
+    def rebuild(self, version=None):
+        rows = (
+            db.session.query(
+                ICD10Code.chapter,
+                ICD10Code.subcategory,
+                ICD10Code.code,
+                ICD10Code.description,
+                ICD10Code.short_desc,
+            )
+            .order_by(ICD10Code.chapter, ICD10Code.subcategory, ICD10Code.code)
+            .all()
+        )
+        codes = {}
+        titles = {}  # 编码恰为章 / 细分类本身时，其描述作为该节点的标题
+        for chapter, subcategory, code, description, short_desc in rows:
+            subcategory = subcategory or ""
+            codes.setdefault(chapter, {}).setdefault(subcategory, []).append(
+                {"code": code, "description": description, "short_desc": short_desc}
+            )
+            titles.setdefault(code, description)
+
+        chapters, subcategories, leaves = [], {}, {}
+        for chapter, by_sub in codes.items():
+            children = []
+            for subcategory, items in by_sub.items():
+                leaves[(chapter, subcategory)] = items
+                children.append({
+                    "subcategory": subcategory,
+                    "title": titles.get(chapter + subcategory, items[0]["description"]),
+                    "code_count": len(items),
+                })
+            subcategories[chapter] = children
+            first = children[0]
+            chapters.append({
+                "chapter": chapter,
+                "title": titles.get(chapter)
+                or leaves[(chapter, first["subcategory"])][0]["short_desc"]
+                or first["title"],
+                "subcategory_count": len(children),
+                "code_count": sum(c["code_count"] for c in children),
+            })
+
+        with self._lock:
+            self._chapters = chapters
+            self._subcategories = subcategories
+            self._codes = leaves
+            self._version = version
+        current_app.logger.info("ICD-10 浏览树已构建：%d 章，%d 条编码", len(chapters), len(rows))
+
+    def ensure_fresh(self):
+        version = etag_registry.version(TABLE)
+        if version != self._version:
+            self.rebuild(version)
+
+    # ---------------- 查询 ----------------
+    def chapters(self):
+        self.ensure_fresh()
+        return self._chapters
+
+    def subcategories(self, chapter):
+        """章下的细分类列表，章不存在时返回 None"""
+        self.ensure_fresh()
+        return self._subcategories.get(chapter)
+
+    def codes(self, chapter, subcategory):
+        """细分类下的编码列表，不存在时返回 None"""
+        self.ensure_fresh()
+        return self._codes.get((chapter, subcategory))
+
+    def stats(self):
+        return {"chapters": len(self._chapters), "leaves": len(self._codes)}
+
+
+browse_tree = ICD10BrowseTree()
+
+
+@register_warmup
+def _warmup_browse_tree():
+    browse_tree.rebuild(etag_registry.version(TABLE))
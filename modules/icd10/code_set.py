@@ -0,0 +1,161 @@
+# modules/icd10/code_set.py
+"""
+ICD-10 编码批量校验：进程内编码表，不访问数据库
+
+- 一次全表扫描（只取编码、简短描述、章）构建：
+    编码 -> {valid, code, short_desc, chapter} 的字典（哈希查找，即带载荷的集合），
+    校验结果直接引用其中的对象，不逐个复制；
+    按字典序排列的编码数组，及全部编码真前缀的 frozenset，用于列出某前缀下的编码；
+- 校验时先按原样查找，未命中再归一化（去掉空白与小数点、转大写：j45.9 -> J459）；
+  单个编码的校验只需一两次字典查找，每毫秒可校验数千个；
+- 无效编码给出近似建议：
+    输入是有效前缀（如类目 J45）时，取其下的编码，距离为补齐的字符数；
+    一次编辑（删除、插入、替换、相邻交换）可得到的有效编码，距离为 1；
+    一次编辑后为有效前缀的（J4S -> J45 -> J450），距离为 1 + 补齐的字符数；
+  按（距离，编码）排序；比最长编码长出一个字符以上的输入不给建议；
+- 以 icd10_codes 表的 ETag 版本戳判断是否需要重建，启动预热时构建。
+"""
+import threading
+from bisect import bisect_left
+from itertools import islice
+
+from flask import current_app
+
+from modules.data_management.models import db, ICD10Code
+from utils.etag import etag_registry
+from utils.lifecycle import register_warmup
+
+TABLE = ICD10Code.__tablename__
+
+_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def normalize_code(value):
+    """去掉空白与小数点并转为大写：a00.0 -> A000"""
+    return "".join(value.split()).replace(".", "").upper()
+
+
+def _edits1(key):
+    """一次编辑可得到的字符串（删除、相邻交换、替换、插入）"""
+    splits = [(key[:i], key[i:]) for i in range(len(key) + 1)]
+    deletes = [a + b[1:] for a, b in splits if b]
+    transposes = [a + b[1] + b[0] + b[2:] for a, b in splits if len(b) > 1]
+    replaces = [a + c + b[1:] for a, b in splits if b for c in _ALPHABET]
+    inserts = [a + c + b for a, b in splits for c in _ALPHABET]
+    return set(deletes + transposes + replaces + inserts)
+
+
+class _Snapshot:
+    """一次构建的全部结构；整体替换，查询全程使用同一份，不会混用新旧数据"""
+
+    __slots__ = ("by_code", "sorted", "prefixes", "max_length")
+
+    def __init__(self, by_code=None):
+        self.by_code = by_code or {}  # 编码 -> {valid, code, short_desc, chapter}
+        self.sorted = sorted(self.by_code)  # 编码，字典序
+        self.prefixes = frozenset(  # 全部编码的真前缀
+            code[:i] for code in self.by_code for i in range(1, len(code))
+        )
+        self.max_length = max(map(len, self.by_code), default=0)  # 最长编码的长度
+
+
+class ICD10CodeSet:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = _Snapshot()
+        self._version = None
+
+    def rebuild(self, version=None):
+        rows = (
+            db.session.query(ICD10Code.code, ICD10Code.short_desc, ICD10Code.chapter)
+            .order_by(ICD10Code.code)
+            .all()
+        )
+        by_code = {
+            code: {"valid": True, "code": code, "short_desc": short_desc, "chapter": chapter}
+            for code, short_desc, chapter in rows
+        }
+        snapshot = _Snapshot(by_code)
+        with self._lock:
+            self._snapshot = snapshot
+            self._version = version
+        current_app.logger.info("ICD-10 编码表已构建：%d 条编码", len(by_code))
+
+    def ensure_fresh(self):
+        version = etag_registry.version(TABLE)
+        if version != self._version:
+            self.rebuild(version)
+
+    # ---------------- 查询 ----------------
+    @staticmethod
+    def _children(snapshot, prefix, limit):
+        """prefix 之下（以其开头且更长）的前 limit 个编码"""
+        start = bisect_left(snapshot.sorted, prefix)
+        return [
+            code
+            for code in islice(snapshot.sorted, start, start + limit + 1)
+            if code.startswith(prefix) and code != prefix
+        ][:limit]
+
+    def suggest(self, key, limit=3, snapshot=None):
+        """key（已归一化的无效编码）的近似编码，[{code, short_desc, chapter, distance}]；每个约需数百微秒"""
+        snapshot = snapshot or self._snapshot
+        # 比最长编码长出一个字符以上时，一次编辑不可能得到有效编码；
+        # 生成编辑变体的代价随长度平方增长，过长的输入直接跳过
+        if not key or limit <= 0 or len(key) > snapshot.max_length + 1:
+            return []
+        by_code, prefixes = snapshot.by_code, snapshot.prefixes
+        found = {}  # 编码 -> 距离
+        if key in prefixes:
+            for code in self._children(snapshot, key, limit):
+                found[code] = len(code) - len(key)
+        for variant in _edits1(key):
+            if variant in by_code:
+                found[variant] = min(found.get(variant, 1), 1)
+            if variant in prefixes:
+                for code in self._children(snapshot, variant, limit):
+                    distance = 1 + len(code) - len(variant)
+                    if distance < found.get(code, distance + 1):
+                        found[code] = distance
+        ranked = sorted(found.items(), key=lambda item: (item[1], item[0]))[:limit]
+        return [
+            {"code": code, "short_desc": by_code[code]["short_desc"], "chapter": by_code[code]["chapter"],
+             "distance": distance}
+            for code, distance in ranked
+        ]
+
+    def validate(self, values, suggestions=3):
+        """
+        逐个校验，返回与输入等长、顺序一致的结果列表：
+        有效 {valid: True, code, short_desc, chapter}（各请求共享同一对象，调用方不得修改）；
+        无效 {valid: False, suggestions: [...]}（非字符串输入无建议）
+        """
+        self.ensure_fresh()
+        snapshot = self._snapshot
+        get = snapshot.by_code.get
+        results = [
+            get(value) or get(normalize_code(value)) if isinstance(value, str) else None
+            for value in values
+        ]
+        memo = {}  # 同一请求中重复出现的无效编码只计算一次建议
+        for i, hit in enumerate(results):
+            if hit is not None:
+                continue
+            value = values[i]
+            key = normalize_code(value) if isinstance(value, str) else ""
+            if key not in memo:
+                memo[key] = self.suggest(key, suggestions, snapshot)
+            results[i] = {"valid": False, "suggestions": memo[key]}
+        return results
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {"codes": len(snapshot.by_code), "prefixes": len(snapshot.prefixes)}
+
+
+code_set = ICD10CodeSet()
+
+
+@register_warmup
+def _warmup_code_set():
+    code_set.rebuild(etag_registry.version(TABLE))
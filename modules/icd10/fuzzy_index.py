@@ -0,0 +1,354 @@
+# modules/icd10/fuzzy_index.py
+"""
+ICD-10 容错检索：进程内 n-gram 索引，不访问数据库
+
+- 编码：去掉小数点、小写后按 pg_trgm 的方式补空格切分三元组（"  j", " j4", "j45", "45 "），
+  按共有三元组数取候选，再以有界编辑距离校验（整体或同长前缀，J4S -> J45x）；
+- 描述（short_desc / description）：切分为词（字母数字串、连续汉字串），建立词表上的
+  n-gram 索引（西文词补空格后取三元组，汉字串取单字与二元组）和 词 -> 描述 的倒排。
+  查询的每个词先在词表中找出编辑距离在允许范围内的词——西文为整词距离（最后一个词也可
+  匹配前缀，便于边输入边查），汉字串为查询在词中的最佳子串距离（"高血亚" 可命中
+  "原发性高血压"）——再对各查询词的倒排求交集。词表远小于描述总量，常见词拼错也只需
+  扫描很短的倒排；
+- 允许的编辑距离按词长：≤2 个字符 0 处，3–5 个字符 1 处，更长 2 处，以 ICD10_FUZZY_MAX_EDITS 封顶；
+  候选所需的最少共有 n-gram 数由 q-gram 引理给出，绝大多数词无需计算编辑距离；
+- 排序：编辑距离之和 → 编码匹配优先于描述 → 简短描述优先于长描述 → 描述较短者 → 编码；
+  描述条目在构建时即按该顺序编号，同一距离档内直接取编号最小者；
+- 以 icd10_codes 表的 ETag 版本戳判断是否需要重建，启动预热时构建。
+"""
+import re
+import threading
+from array import array
+from collections import Counter
+from itertools import chain, product
+from math import ceil
+
+from flask import current_app
+
+from modules.data_management.models import db, ICD10Code
+from utils.etag import etag_registry
+from utils.lifecycle import register_warmup
+
+TABLE = ICD10Code.__tablename__
+
+FIELD_NAMES = ("code", "short_desc", "description")
+
+_TOKEN = re.compile(r"[a-z0-9]+|[㐀-䶿一-鿿]+")
+_CODE_QUERY = re.compile(r"^(?=.*\d)[a-z0-9.]{2,8}$")
+_MAX_QUERY_TOKENS = 6
+
+
+def normalize_code(value):
+    return "".join(value.split()).replace(".", "").lower()
+
+
+def tokenize(text):
+    return _TOKEN.findall((text or "").lower())
+
+
+def _is_cjk(token):
+    return token[0] >= "㐀"
+
+
+def _ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def code_grams(code):
+    return _ngrams(f"  {code} ", 3)
+
+
+def token_grams(token):
+    """西文词：补空格的三元组；汉字串：二元组（单字时为其本身）"""
+    if _is_cjk(token):
+        return _ngrams(token, 2) if len(token) > 1 else {token}
+    return _ngrams(f"  {token} ", 3)
+
+
+def allowed_edits(token, limit):
+    """按词长允许的编辑距离：≤2 个字符 0 处，3–5 个字符 1 处，更长 2 处，且不超过 limit"""
+    n = len(token)
+    return min(limit, 0 if n <= 2 else 1 if n <= 5 else 2)
+
+
+def edit_distance_within(pattern, text, k, prefix=False):
+    """
+    pattern 与 text 的编辑距离，超过 k 时返回 None；prefix=True 时取与 text 整体
+    及其同长前缀（text[:len(pattern)]）距离的较小者，J4S 可命中 J450。
+    Myers 位并行算法，与 substring_distance_within 相同，只是第 0 行为 0, 1, 2…
+    """
+    m = len(pattern)
+    if pattern == text or (prefix and text.startswith(pattern)):
+        return 0
+    if len(text) - m > k and not prefix or m - len(text) > k or not m:
+        return None
+    peq = {}
+    for i, ch in enumerate(pattern):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    best = None
+    for j, ch in enumerate(text, 1):
+        eq = peq.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        if prefix and j == m:
+            best = score
+    if best is not None and best < score:
+        score = best
+    return score if score <= k else None
+
+
+def substring_distance_within(pattern, text, k):
+    """
+    pattern 与 text 中任一子串的最小编辑距离，超过 k 时返回 None。
+    Myers 位并行算法：pattern 的每个位置占整数的一位，每个 text 字符只需常数次整数运算。
+    """
+    if pattern in text:  # 含 pattern 为空
+        return 0
+    m = len(pattern)
+    peq = {}
+    for i, ch in enumerate(pattern):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    best = m
+    for ch in text:
+        eq = peq.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+            if score < best:
+                best = score
+        # 子串匹配：第 0 行恒为 0，左移时不补 1
+        ph = (ph << 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+    return best if best <= k else None
+
+
+def _count(postings, grams):
+    """各编号命中的 n-gram 数（Counter.update 为 C 实现）"""
+    counts = Counter()
+    counts.update(chain.from_iterable(postings[g] for g in grams if g in postings))
+    return counts
+
+
+class ICD10FuzzyIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = []  # [(id, chapter, subcategory, code, description, alt_desc, short_desc)]
+        self._codes = []  # 各行归一化后的编码
+        self._code_postings = {}  # 编码三元组 -> array(行号)
+        self._entries = array("i")  # 描述条目编号 -> 行号 * 2 + 字段偏移（0 简短描述 / 1 长描述）
+        self._vocab = []  # 词表
+        self._vocab_ids = {}  # 词 -> 词编号
+        self._vocab_grams = {}  # 词的 n-gram -> array(词编号)
+        self._token_postings = []  # 词编号 -> array(描述条目编号)
+        self._version = None
+
+    def rebuild(self, version=None):
+        rows = [
+            tuple(r)
+            for r in db.session.query(
+                ICD10Code.id,
+                ICD10Code.chapter,
+                ICD10Code.subcategory,
+                ICD10Code.code,
+                ICD10Code.description,
+                ICD10Code.alt_desc,
+                ICD10Code.short_desc,
+            ).order_by(ICD10Code.code)
+        ]
+        codes = [normalize_code(r[3]) for r in rows]
+        code_postings = {}
+        for index, code in enumerate(codes):
+            for gram in code_grams(code):
+                code_postings.setdefault(gram, []).append(index)
+
+        # 描述条目按排序优先级编号：简短描述在前，其次描述长度、编码（rows 已按编码排序）
+        texts = sorted(
+            (offset, len(text), index, text)
+            for index, row in enumerate(rows)
+            for offset, text in enumerate((row[6], row[4]))
+            if text
+        )
+        entries = array("i")
+        vocab, vocab_ids, token_postings = [], {}, []
+        for entry, (offset, _, index, text) in enumerate(texts):
+            entries.append(index * 2 + offset)
+            for token in set(tokenize(text)):
+                token_id = vocab_ids.get(token)
+                if token_id is None:
+                    token_id = vocab_ids[token] = len(vocab)
+                    vocab.append(token)
+                    token_postings.append(array("i"))
+                token_postings[token_id].append(entry)
+        vocab_grams = {}
+        for token_id, token in enumerate(vocab):
+            grams = token_grams(token)
+            if _is_cjk(token):
+                grams |= set(token)  # 单字查询
+            for gram in grams:
+                vocab_grams.setdefault(gram, []).append(token_id)
+
+        with self._lock:
+            self._rows = rows
+            self._codes = codes
+            self._code_postings = {g: array("i", ids) for g, ids in code_postings.items()}
+            self._entries = entries
+            self._vocab = vocab
+            self._vocab_ids = vocab_ids
+            self._vocab_grams = {g: array("i", ids) for g, ids in vocab_grams.items()}
+            self._token_postings = token_postings
+            self._version = version
+        current_app.logger.info("ICD-10 容错索引已构建：%d 条编码，%d 个词", len(rows), len(vocab))
+
+    def ensure_fresh(self):
+        version = etag_registry.version(TABLE)
+        if version != self._version:
+            self.rebuild(version)
+
+    # ---------------- 编码 ----------------
+    def _search_codes(self, query, edit_limit, min_similarity):
+        """[(编辑距离, 行号)]"""
+        grams = code_grams(query)
+        k = max(1, allowed_edits(query, edit_limit))
+        # q-gram 引理：每处编辑最多破坏 3 个三元组；同长前缀匹配时末尾的补空格三元组不计
+        needed = max(1, ceil(min_similarity * len(grams)), len(grams) - 3 * k - 1)
+        codes = self._codes
+        out = []
+        for index, shared in _count(self._code_postings, grams).items():
+            if shared >= needed:
+                distance = edit_distance_within(query, codes[index], k, prefix=True)
+                if distance is not None:
+                    out.append((distance, index))
+        return out
+
+    # ---------------- 描述 ----------------
+    def _match_token(self, token, k, prefix):
+        """{词编号: 编辑距离}：词表中与查询词相近的词"""
+        cjk = _is_cjk(token)
+        if k == 0 and not cjk and not prefix:
+            token_id = self._vocab_ids.get(token)
+            return {} if token_id is None else {token_id: 0}
+        grams = token_grams(token)
+        if cjk:
+            # 每处编辑最多破坏 2 个二元组
+            needed = max(1, len(grams) - 2 * k)
+        else:
+            needed = max(1, len(grams) - 3 * k - (1 if prefix else 0))
+        vocab = self._vocab
+        matched = {}
+        for token_id, shared in _count(self._vocab_grams, grams).items():
+            if shared < needed:
+                continue
+            word = vocab[token_id]
+            if cjk:
+                distance = substring_distance_within(token, word, k)
+            else:
+                distance = edit_distance_within(token, word, k, prefix)
+            if distance is not None:
+                matched[token_id] = distance
+        return matched
+
+    def _search_text(self, tokens, edit_limit, limit):
+        """[(编辑距离之和, 描述条目编号)]，按相关度排序，最多 limit 条"""
+        postings = self._token_postings
+        levels = []  # 每个查询词：[编辑距离 ≤ d 的描述条目集合, ...]
+        for position, token in enumerate(tokens):
+            k = allowed_edits(token, edit_limit)
+            matched = self._match_token(token, k, prefix=position == len(tokens) - 1)
+            if not matched:
+                return []
+            by_distance = [[] for _ in range(k + 1)]
+            for token_id, distance in matched.items():
+                by_distance[distance].append(postings[token_id])
+            cumulative, acc = [], set()
+            for lists in by_distance:
+                acc = acc.union(*lists)
+                cumulative.append(acc)
+            levels.append(cumulative)
+
+        # 按距离之和从小到大枚举各词的距离组合，条目首次出现时即为其最小距离和
+        seen, out = set(), []
+        for combo in sorted(product(*(range(len(c)) for c in levels)), key=sum):
+            sets = sorted((levels[i][d] for i, d in enumerate(combo)), key=len)
+            hits = sets[0].intersection(*sets[1:]) - seen
+            if not hits:
+                continue
+            seen |= hits
+            out.extend((sum(combo), entry) for entry in sorted(hits)[:limit - len(out)])
+            if len(out) >= limit:
+                break
+        return out
+
+    # ---------------- 查询 ----------------
+    def search(self, query, limit=20, min_similarity=0.3, edit_limit=2):
+        """
+        返回 [(行, 匹配字段, 相似度, 编辑距离)]，按相关度排序。
+        行为 (id, chapter, subcategory, code, description, alt_desc, short_desc)；
+        相似度为 1 - 编辑距离 / 查询长度，低于 min_similarity 的结果丢弃。
+        """
+        self.ensure_fresh()
+        text = query.strip().lower()
+        tokens = list(dict.fromkeys(tokenize(text)))[:_MAX_QUERY_TOKENS]
+        with self._lock:
+            rows, entries = self._rows, self._entries
+            code_hits = []
+            if _CODE_QUERY.match(text):
+                code_hits = sorted(self._search_codes(normalize_code(text), edit_limit, min_similarity))
+            # 同一行的简短描述与长描述可能同时命中，多取一倍以便去重后仍有 limit 条
+            text_hits = self._search_text(tokens, edit_limit, limit * 2) if tokens else []
+
+        # 同一距离下编码匹配在前；同一行只保留最先出现的匹配
+        merged = sorted(
+            [(d, 0, i, index, 0) for i, (d, index) in enumerate(code_hits[:limit])]
+            + [(d, 1, i, entries[e] >> 1, 1 + (entries[e] & 1)) for i, (d, e) in enumerate(text_hits)]
+        )
+        length = max(1, len(text))
+        results, used = [], set()
+        for distance, _, _, index, field in merged:
+            similarity = round(1 - distance / length, 3)
+            if index in used or similarity < min_similarity:
+                continue
+            used.add(index)
+            results.append((rows[index], FIELD_NAMES[field], similarity, distance))
+            if len(results) >= limit:
+                break
+        return results
+
+    def stats(self):
+        return {
+            "codes": len(self._rows),
+            "code_trigrams": len(self._code_postings),
+            "vocabulary": len(self._vocab),
+            "vocabulary_ngrams": len(self._vocab_grams),
+        }
+
+
+fuzzy_index = ICD10FuzzyIndex()
+
+
+@register_warmup
+def _warmup_fuzzy_index():
+    if current_app.config["ICD10_FUZZY_ENABLED"]:
+        fuzzy_index.rebuild(etag_registry.version(TABLE))
@@ -0,0 +1,127 @@
+# modules/icd10/pinyin.py
+"""
+ICD-10 中文描述的拼音检索键（全拼与首字母），供 /api/icd10/search?mode=pinyin 查询
+
+- 导入时计算（initial_data/11_ICD-10.py），存入子表 icd10_pinyin_keys(code_id, term)，
+  term 上有索引，查询是一次索引范围扫描；
+- 简短描述与长描述中每个汉字、每个字母数字词的起始处各生成一对键（全拼、首字母），
+  因此可从描述中间开始匹配：原发性高血压 -> yfxgxy、fxgxy、xgxy、gxy、xy、y 及对应全拼，
+  "gxy" / "gaoxue" 都能查到；键截断到 ICD10PinyinKey.term 的长度，同一编码的重复键只存一次；
+- 只保留小写字母与数字（"2型糖尿病" -> 2xingtangniaobing / 2xtnb），不含汉字的描述不生成；
+- 依赖 pypinyin（可选）；未安装时不生成拼音键，安装后执行
+  flask --app app icd10-pinyin 为已有数据补齐（旧库缺少的 icd10_pinyin_keys 表会一并创建）。
+"""
+import importlib.util
+import re
+from datetime import datetime
+from functools import lru_cache
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import exists, insert, update
+
+from modules.data_management.models import db, ICD10Code, ICD10PinyinKey
+
+# 可选依赖 pypinyin：导入时加载词典约需 0.4 秒，路由模块只用到 normalize_key，
+# 因此在首次计算拼音时才导入
+_HAS_PYPINYIN = importlib.util.find_spec("pypinyin") is not None
+
+TERM_LENGTH = ICD10PinyinKey.term.type.length
+
+_HAN = re.compile(r"[㐀-䶿一-鿿]")
+_WORD = re.compile(r"[a-z0-9]+")
+_NOT_KEY = re.compile(r"[^a-z0-9]+")
+_OTHER = "\x00"  # lazy_pinyin 对非汉字片段的标记
+_BATCH = 2000
+
+
+def available():
+    return _HAS_PYPINYIN
+
+
+@lru_cache(maxsize=None)
+def _lazy_pinyin():
+    from pypinyin import lazy_pinyin
+
+    return lazy_pinyin
+
+
+def normalize_key(value):
+    """查询词归一化：小写，去掉空格、隔音符等（"Gao'Xue Ya" -> gaoxueya）"""
+    return _NOT_KEY.sub("", (value or "").lower())
+
+
+def _units(text):
+    """[(全拼, 首字母)]：每个汉字一项；字母数字词一项，首字母即词本身（与 2xtnb 一致）"""
+    units = []
+    for item in _lazy_pinyin()(text, errors=lambda chunk: _OTHER + chunk):
+        if item.startswith(_OTHER):  # 非汉字片段
+            units.extend((word, word) for word in _WORD.findall(item.lower()))
+        else:
+            syllable = normalize_key(item)
+            if syllable:
+                units.append((syllable, syllable[0]))
+    return units
+
+
+def pinyin_terms(*texts):
+    """texts 的全部拼音检索键；均不含汉字或未安装 pypinyin 时为空集"""
+    terms = set()
+    if not _HAS_PYPINYIN:
+        return terms
+    for text in texts:
+        if not text or not _HAN.search(text):
+            continue
+        full = initials = ""
+        for syllable, initial in reversed(_units(text)):  # 从后向前拼出每个起点的后缀
+            full = (syllable + full)[:TERM_LENGTH]
+            initials = (initial + initials)[:TERM_LENGTH]
+            terms.add(full)
+            terms.add(initials)
+    return terms
+
+
+def pinyin_keys(short_desc, description):
+    """ICD10Code.pinyin_keys 的取值，可直接作为构造参数"""
+    return [ICD10PinyinKey(term=term) for term in sorted(pinyin_terms(short_desc, description))]
+
+
+def pinyin_key_rows(code_id, short_desc, description):
+    """批量 INSERT icd10_pinyin_keys 用的行"""
+    return [{"code_id": code_id, "term": term} for term in sorted(pinyin_terms(short_desc, description))]
+
+
+# ────────────────────────────── CLI ──────────────────────────────
+@click.command("icd10-pinyin")
+@click.option("--all", "recompute_all", is_flag=True, help="重新计算全部编码（默认只补齐没有拼音键的）")
+@with_appcontext
+def icd10_pinyin_command(recompute_all):
+    """计算 ICD-10 描述的拼音检索键"""
+    if not available():
+        raise click.ClickException("未安装 pypinyin：pip install pypinyin")
+    ICD10PinyinKey.__table__.create(bind=db.engine, checkfirst=True)
+
+    query = db.session.query(ICD10Code.id, ICD10Code.short_desc, ICD10Code.description)
+    if recompute_all:
+        db.session.query(ICD10PinyinKey).delete(synchronize_session=False)
+    else:
+        query = query.filter(~exists().where(ICD10PinyinKey.code_id == ICD10Code.id))
+    rows = query.order_by(ICD10Code.id).all()
+    now = datetime.utcnow()  # 同时推进 updated_time，使 icd10_codes 的 ETag 版本变化
+    keys = 0
+    for start in range(0, len(rows), _BATCH):
+        batch = rows[start:start + _BATCH]
+        key_rows = [
+            key
+            for row_id, short_desc, description in batch
+            for key in pinyin_key_rows(row_id, short_desc, description)
+        ]
+        if key_rows:
+            db.session.execute(insert(ICD10PinyinKey), key_rows)
+        db.session.execute(
+            update(ICD10Code).where(ICD10Code.id.in_([row[0] for row in batch])).values(updated_time=now)
+        )
+        db.session.commit()
+        keys += len(key_rows)
+    db.session.commit()
+    click.echo(f"已计算 {len(rows)} 条编码的拼音，共 {keys} 个检索键")
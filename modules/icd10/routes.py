@@ -0,0 +1,201 @@
+# modules/icd10/routes.py
+"""
+ICD-10 编码查询（登录用户均可访问）
+
+    GET /api/icd10/codes/<code>                          按完整编码查询（A00.0 与 A000 等价）
+    GET /api/icd10/codes?prefix=A00&limit=20             编码前缀查询
+    GET /api/icd10/search?q=霍乱&limit=20                 描述关键字查询
+    GET /api/icd10/search?q=J4S&mode=fuzzy               容错检索（编码与描述，见 fuzzy_index.py）
+    GET /api/icd10/search?q=gxy&mode=pinyin              拼音首字母 / 全拼查询，可从描述中任一字开始（见 pinyin.py）
+    POST /api/icd10/validate  {"codes": [...]}           批量校验，无效编码附近似建议（见 code_set.py）
+    GET /api/icd10/chapters                              全部章 / 类别（含细分类数、编码数）
+    GET /api/icd10/chapters/<chapter>                    某章下的细分类
+    GET /api/icd10/chapters/<chapter>/<subcategory>      某细分类下的编码（subcategory 为 "-" 表示无细分类）
+
+编码数据很少变化：响应带 ETag（icd10_codes 表版本）与 Cache-Control: max-age=ICD10_CACHE_MAX_AGE，
+浏览接口由进程内预先构建的分级树提供（见 browse_tree.py），不访问数据库。
+"""
+from flask import Blueprint, request, current_app
+from flask_jwt_extended import jwt_required
+
+from modules.data_management.models import ICD10Code
+from modules.icd10.browse_tree import browse_tree, TABLE
+from modules.icd10.code_set import code_set
+from modules.icd10.fuzzy_index import fuzzy_index
+from modules.icd10.pinyin import normalize_key
+from utils.etag import etag_cached
+from utils.response import (
+    success_response,
+    error_response,
+    not_found_response,
+    server_error_response,
+)
+
+icd10_bp = Blueprint("icd10", __name__)
+
+_NO_SUBCATEGORY = "-"
+
+
+def _max_age():
+    return current_app.config["ICD10_CACHE_MAX_AGE"]
+
+
+def _normalize_code(value):
+    """去掉空白与小数点并转为大写：a00.0 -> A000"""
+    return "".join(value.split()).replace(".", "").upper()
+
+
+def _limit():
+    cfg = current_app.config
+    limit = request.args.get("limit", cfg["ICD10_SEARCH_DEFAULT_LIMIT"], type=int)
+    return max(1, min(limit, cfg["ICD10_SEARCH_MAX_LIMIT"]))
+
+
+# ─────────────────────────── 查询 ───────────────────────────
+@icd10_bp.route("/codes/<code>", methods=["GET"])
+@jwt_required()
+@etag_cached(TABLE, max_age=_max_age)
+def get_code(code):
+    """按完整编码查询"""
+    try:
+        record = ICD10Code.query.filter_by(code=_normalize_code(code)).first()
+        if record is None:
+            return not_found_response("编码不存在")
+        return success_response(record.to_dict())
+
+    except Exception:  # pragma: no cover
+        current_app.logger.exception("Get ICD-10 code error")
+        return server_error_response("查询 ICD-10 编码失败")
+
+
+@icd10_bp.route("/codes", methods=["GET"])
+@jwt_required()
+@etag_cached(TABLE, max_age=_max_age)
+def search_codes():
+    """编码前缀查询"""
+    try:
+        prefix = _normalize_code(request.args.get("prefix", ""))
+        if not prefix:
+            return error_response("prefix 不能为空", 400)
+        records = ICD10Code.search_by_code(prefix, limit=_limit())
+        return success_response({"codes": [r.to_dict() for r in records]})
+
+    except Exception:  # pragma: no cover
+        current_app.logger.exception("Search ICD-10 codes error")
+        return server_error_response("查询 ICD-10 编码失败")
+
+
+@icd10_bp.route("/search", methods=["GET"])
+@jwt_required()
+@etag_cached(TABLE, max_age=_max_age)
+def search_text():
+    """描述关键字查询；mode=fuzzy 时容忍拼写错误，同时匹配编码与描述；mode=pinyin 时按拼音检索键查询"""
+    try:
+        keyword = request.args.get("q", "").strip()
+        if not keyword:
+            return error_response("q 不能为空", 400)
+        mode = request.args.get("mode", "exact")
+        if mode == "fuzzy":
+            return _fuzzy_search(keyword)
+        if mode == "pinyin":
+            key = normalize_key(keyword)
+            if not key:
+                return error_response("拼音查询需包含字母或数字", 400)
+            records = ICD10Code.search_by_pinyin(key, limit=_limit())
+        elif mode == "exact":
+            records = ICD10Code.search_by_text(keyword, limit=_limit())
+        else:
+            return error_response("mode 应为 exact、fuzzy 或 pinyin", 400)
+        return success_response({"codes": [r.to_dict() for r in records]})
+
+    except Exception:  # pragma: no cover
+        current_app.logger.exception("Search ICD-10 text error")
+        return server_error_response("查询 ICD-10 编码失败")
+
+
+def _fuzzy_search(keyword):
+    cfg = current_app.config
+    if not cfg["ICD10_FUZZY_ENABLED"]:
+        return error_response("容错检索未启用", 400)
+    matches = fuzzy_index.search(
+        keyword,
+        limit=_limit(),
+        min_similarity=cfg["ICD10_FUZZY_MIN_SIMILARITY"],
+        edit_limit=cfg["ICD10_FUZZY_MAX_EDITS"],
+    )
+    codes = [
+        {
+            "id": row[0],
+            "chapter": row[1],
+            "subcategory": row[2],
+            "code": row[3],
+            "description": row[4],
+            "alt_desc": row[5],
+            "short_desc": row[6],
+            "matched_field": field,
+            "similarity": similarity,
+            "distance": distance,
+        }
+        for row, field, similarity, distance in matches
+    ]
+    return success_response({"codes": codes})
+
+
+@icd10_bp.route("/validate", methods=["POST"])
+@jwt_required()
+def validate_codes():
+    """批量校验编码：返回规范编码、简短描述与章，无效编码附近似建议"""
+    try:
+        cfg = current_app.config
+        data = request.get_json(silent=True)
+        codes = data.get("codes") if isinstance(data, dict) else None
+        if not isinstance(codes, list) or not codes:
+            return error_response("codes 应为非空数组", 400)
+        if len(codes) > cfg["ICD10_VALIDATE_MAX_CODES"]:
+            return error_response(f"单次最多校验 {cfg['ICD10_VALIDATE_MAX_CODES']} 个编码", 400)
+        max_length = cfg["ICD10_VALIDATE_MAX_CODE_LENGTH"]
+        if any(isinstance(c, str) and len(c) > max_length for c in codes):
+            return error_response(f"单个编码不能超过 {max_length} 个字符", 400)
+        results = code_set.validate(codes, suggestions=cfg["ICD10_VALIDATE_SUGGESTIONS"])
+        valid = sum(1 for r in results if r["valid"])
+        return success_response({"results": results, "valid": valid, "invalid": len(results) - valid})
+
+    except Exception:  # pragma: no cover
+        current_app.logger.exception("Validate ICD-10 codes error")
+        return server_error_response("校验 ICD-10 编码失败")
+
+
+# ─────────────────────────── 分级浏览 ───────────────────────────
+@icd10_bp.route("/chapters", methods=["GET"])
+@jwt_required()
+@etag_cached(TABLE, max_age=_max_age)
+def list_chapters():
+    return success_response({"chapters": browse_tree.chapters()})
+
+
+@icd10_bp.route("/chapters/<chapter>", methods=["GET"])
+@jwt_required()
+@etag_cached(TABLE, max_age=_max_age)
+def list_subcategories(chapter):
+    chapter = _normalize_code(chapter)
+    children = browse_tree.subcategories(chapter)
+    if children is None:
+        return not_found_response("章 / 类别不存在")
+    return success_response({
+        "chapter": chapter,
+        "subcategories": [
+            {**c, "subcategory": c["subcategory"] or _NO_SUBCATEGORY} for c in children
+        ],
+    })
+
+
+@icd10_bp.route("/chapters/<chapter>/<subcategory>", methods=["GET"])
+@jwt_required()
+@etag_cached(TABLE, max_age=_max_age)
+def list_codes(chapter, subcategory):
+    chapter = _normalize_code(chapter)
+    key = "" if subcategory == _NO_SUBCATEGORY else subcategory.strip()
+    codes = browse_tree.codes(chapter, key)
+    if codes is None:
+        return not_found_response("细分类不存在")
+    return success_response({"chapter": chapter, "subcategory": subcategory, "codes": codes})
@@ -0,0 +1,299 @@
+# modules/user_management/bulk_import.py
+"""
+批量导入用户
+
+输入（二选一）：
+    - JSON 数组，或 {"users": [...]}；每项字段同 POST /users
+    - CSV（multipart 的 file 字段，或 Content-Type: text/csv 的请求体），表头：
+      username,password,name,age,gender[,enable][,roles][,groups][,group_type]
+      roles / groups 多个值以 | 分隔，可填 id、角色代码/名称、组名称
+
+流程：
+    1. 逐行校验必填字段，并检测文件内重复用户名
+    2. 一次 IN 查询（按块）检测库中已存在的用户名
+    3. 角色 / 组从预加载的映射表中解析，不再逐条查询
+    4. 密码哈希在进程池中并行计算：每个 worker 进程首次需要时以 forkserver / spawn
+       方式创建一个进程池并复用（不在多线程的 worker 中 fork），退出时随 shutdown 钩子关闭；
+       数量少于 BULK_IMPORT_PARALLEL_MIN 时直接串行计算
+    5. 用户、关系按块批量插入，返回逐行报告
+"""
+import csv
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+
+from utils.lifecycle import register_shutdown
+
+from modules.auth.models import (
+    db,
+    User,
+    Role,
+    UserRoleRelation,
+    Group,
+    UserGroupRelation,
+)
+from modules.user_management.group_counters import GroupCounterDelta
+
+REQUIRED_FIELDS = ["username", "password", "name", "age", "gender"]
+LIST_SEPARATOR = "|"
+
+
+class ImportPayloadError(ValueError):
+    """请求体无法解析为导入数据"""
+
+
+# ────────────────────────────── 解析 ──────────────────────────────
+def _parse_bool(value, default=True):
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+
+def _split_list(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return value
+    return [v.strip() for v in str(value).split(LIST_SEPARATOR) if v.strip()]
+
+
+def _rows_from_csv(text):
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames:
+        raise ImportPayloadError("CSV 缺少表头")
+    rows = []
+    for raw in reader:
+        row = {k.strip(): (v.strip() if isinstance(v, str) else v)
+               for k, v in raw.items() if k}
+        group_type = row.pop("group_type", "") or "base"
+        row["roles"] = _split_list(row.get("roles"))
+        row["groups"] = [
+            {"group": g, "type": group_type} for g in _split_list(row.get("groups"))
+        ]
+        rows.append(row)
+    return rows
+
+
+def parse_import_payload(req):
+    """从请求中解析出待导入的行（dict 列表）"""
+    upload = req.files.get("file")
+    if upload is not None:
+        return _rows_from_csv(upload.read().decode("utf-8-sig"))
+
+    if req.mimetype in ("text/csv", "application/csv"):
+        return _rows_from_csv(req.get_data(as_text=True))
+
+    data = req.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get("users")
+    if not isinstance(data, list):
+        raise ImportPayloadError("请求体应为 JSON 数组、{\"users\": [...]} 或 CSV")
+    if not all(isinstance(r, dict) for r in data):
+        raise ImportPayloadError("JSON 数组中的每一项都必须是对象")
+    return data
+
+
+# ────────────────────────────── 引用解析 ──────────────────────────────
+class _ReferenceMap:
+    """角色 / 组的预加载映射：id、代码、名称 → id"""
+
+    def __init__(self):
+        self.roles = {}
+        for role_id, code, name in db.session.query(Role.id, Role.role_code, Role.role_name):
+            self.roles[str(role_id)] = role_id
+            self.roles[code] = role_id
+            self.roles[name] = role_id
+
+        self.groups = {}
+        for group_id, name in db.session.query(Group.id, Group.group_name):
+            self.groups[str(group_id)] = group_id
+            self.groups[name] = group_id
+
+    def resolve_roles(self, items, errors):
+        role_ids = []
+        for item in items:
+            key = item.get("role_id") if isinstance(item, dict) else item
+            role_id = self.roles.get(str(key).strip())
+            if role_id is None:
+                errors.append(f"角色不存在: {key}")
+            elif role_id not in role_ids:
+                role_ids.append(role_id)
+        return role_ids
+
+    def resolve_groups(self, items, errors):
+        groups = {}
+        for item in items:
+            if isinstance(item, dict):
+                key = item.get("group_id", item.get("group"))
+                g_type = item.get("type") or "base"
+                g_enable = _parse_bool(item.get("enable"))
+            else:
+                key, g_type, g_enable = item, "base", True
+            group_id = self.groups.get(str(key).strip())
+            if group_id is None:
+                errors.append(f"组不存在: {key}")
+            else:
+                groups[group_id] = (g_type, g_enable)
+        return groups
+
+
+# ────────────────────────────── 密码哈希 ──────────────────────────────
+_pool = None
+_pool_key = None  # (pid, workers)：fork 出的子进程不复用父进程的进程池
+_pool_lock = threading.Lock()
+
+
+def _hash_pool(workers):
+    """本进程的哈希进程池，首次使用时创建，之后各请求复用"""
+    global _pool, _pool_key
+    key = (os.getpid(), workers)
+    with _pool_lock:
+        if _pool_key != key:
+            if _pool is not None and _pool_key[0] == key[0]:
+                _pool.shutdown(wait=False)
+            # worker 中有其他线程与数据库连接，fork 可能死锁，改用 forkserver / spawn
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+            _pool_key = key
+        return _pool
+
+
+@register_shutdown
+def _shutdown_hash_pool():
+    global _pool, _pool_key
+    with _pool_lock:
+        if _pool is not None and _pool_key[0] == os.getpid():
+            _pool.shutdown(wait=True)
+        _pool, _pool_key = None, None
+
+
+def hash_passwords(passwords, workers, parallel_min):
+    """批量计算密码哈希；数量较少或 workers<=1 时串行执行"""
+    if workers <= 1 or len(passwords) < parallel_min:
+        return [generate_password_hash(p) for p in passwords]
+
+    chunksize = max(1, len(passwords) // (workers * 4))
+    try:
+        return list(_hash_pool(workers).map(generate_password_hash, passwords, chunksize=chunksize))
+    except BrokenProcessPool:
+        # 子进程异常退出（如被 OOM 杀掉）：丢弃进程池，本次串行完成
+        _shutdown_hash_pool()
+        return [generate_password_hash(p) for p in passwords]
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# ────────────────────────────── 导入主流程 ──────────────────────────────
+def import_users(rows, chunk_size=500, hash_workers=1, parallel_min=32):
+    """
+    校验并批量写入用户，返回逐行报告；调用方负责 commit / rollback。
+    """
+    report = []
+    valid = []  # (report_item, user_values, password, role_ids, groups)
+    seen = set()
+
+    refs = _ReferenceMap()
+    for index, row in enumerate(rows, start=1):
+        errors = []
+        username = str(row.get("username") or "").strip()
+        item = {"row": index, "username": username, "status": "error"}
+        report.append(item)
+
+        missing = [f for f in REQUIRED_FIELDS if row.get(f) in (None, "")]
+        if missing:
+            errors.append(f"字段缺失: {', '.join(missing)}")
+        try:
+            age = int(row.get("age"))
+        except (TypeError, ValueError):
+            age = None
+            if "age" not in missing:
+                errors.append("age 必须为整数")
+        # MySQL 默认排序规则下用户名不区分大小写：Bob 与 bob 视为重复
+        if username.casefold() in seen:
+            errors.append("用户名在导入数据中重复")
+        seen.add(username.casefold())
+
+        role_ids = refs.resolve_roles(_split_list(row.get("roles")), errors)
+        groups = refs.resolve_groups(_split_list(row.get("groups")), errors)
+
+        if errors:
+            item["errors"] = errors
+            continue
+
+        values = {
+            "username": username,
+            "name": str(row["name"]).strip(),
+            "age": age,
+            "gender": str(row["gender"]).strip(),
+            "enable": _parse_bool(row.get("enable")),
+        }
+        valid.append((item, values, str(row["password"]), role_ids, groups))
+
+    # 库中已存在的用户名：按块 IN 查询（库中返回的是已存储的写法，统一按 casefold 比较）
+    usernames = [v[1]["username"] for v in valid]
+    existing = set()
+    for chunk in _chunks(usernames, chunk_size):
+        existing.update(
+            name.casefold() for (name,) in db.session.query(User.username).filter(
+                User.username.in_(chunk)
+            )
+        )
+    if existing:
+        for item, values, *_ in valid:
+            if values["username"].casefold() in existing:
+                item["errors"] = ["用户名已存在"]
+        valid = [v for v in valid if v[1]["username"].casefold() not in existing]
+
+    hashes = hash_passwords([v[2] for v in valid], hash_workers, parallel_min)
+
+    counters = GroupCounterDelta()
+    for chunk in _chunks(list(zip(valid, hashes)), chunk_size):
+        db.session.execute(
+            insert(User),
+            [dict(values, password=pw_hash) for (_, values, *_), pw_hash in chunk],
+        )
+        ids = {
+            name.casefold(): user_id
+            for name, user_id in db.session.query(User.username, User.id).filter(
+                User.username.in_([v[1]["username"] for v, _ in chunk])
+            )
+        }
+
+        role_rows, group_rows = [], []
+        for (item, values, _, role_ids, groups), _ in chunk:
+            user_id = ids[values["username"].casefold()]
+            item["status"] = "created"
+            item["id"] = user_id
+            role_rows.extend({"user_id": user_id, "role_id": r} for r in role_ids)
+            for group_id, (g_type, g_enable) in groups.items():
+                group_rows.append(
+                    {
+                        "user_id": user_id,
+                        "group_id": group_id,
+                        "type": g_type,
+                        "enable": g_enable,
+                    }
+                )
+                counters.added(group_id, g_enable)
+
+        if role_rows:
+            db.session.execute(insert(UserRoleRelation), role_rows)
+        if group_rows:
+            db.session.execute(insert(UserGroupRelation), group_rows)
+
+    counters.apply()
+
+    created = sum(1 for item in report if item["status"] == "created")
+    summary = {"total": len(report), "created": created, "failed": len(report) - created}
+    return summary, report
@@ -0,0 +1,94 @@
+# modules/user_management/group_counters.py
+"""
+Group.member_count / Group.active_member_count 冗余计数维护
+
+- 各写接口通过 GroupCounterDelta 累积增量，提交前调用 apply()，
+  以 UPDATE ... SET n = n + :delta 的形式在同一事务内原子更新；
+- reconcile_group_counters() 用一次 GROUP BY 重新计算全部计数，
+  对应 CLI 命令：flask --app app reconcile-group-counts
+"""
+from collections import defaultdict
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import case, func, update
+
+from modules.auth.models import db, Group, UserGroupRelation
+
+
+class GroupCounterDelta:
+    """累积一次请求内各组的 (成员数, 启用成员数) 增量"""
+
+    def __init__(self):
+        self._deltas = defaultdict(lambda: [0, 0])
+
+    def added(self, group_id, enable):
+        delta = self._deltas[group_id]
+        delta[0] += 1
+        delta[1] += 1 if enable else 0
+
+    def removed(self, group_id, enable):
+        delta = self._deltas[group_id]
+        delta[0] -= 1
+        delta[1] -= 1 if enable else 0
+
+    def toggled(self, group_id, old_enable, new_enable):
+        if bool(old_enable) != bool(new_enable):
+            self._deltas[group_id][1] += 1 if new_enable else -1
+
+    def apply(self):
+        """将增量写入 group 表（不提交，由调用方统一 commit）"""
+        for group_id, (member_delta, active_delta) in self._deltas.items():
+            if not member_delta and not active_delta:
+                continue
+            db.session.execute(
+                update(Group)
+                .where(Group.id == group_id)
+                .values(
+                    member_count=Group.member_count + member_delta,
+                    active_member_count=Group.active_member_count + active_delta,
+                )
+                .execution_options(synchronize_session=False)
+            )
+        self._deltas.clear()
+
+
+def reconcile_group_counters():
+    """按 user_group_relation 重新计算所有组的计数，返回被修正的组数量"""
+    rows = (
+        db.session.query(
+            UserGroupRelation.group_id,
+            func.count(UserGroupRelation.id),
+            func.sum(case((UserGroupRelation.enable.is_(True), 1), else_=0)),
+        )
+        .group_by(UserGroupRelation.group_id)
+        .all()
+    )
+    actual = {gid: (int(total), int(active or 0)) for gid, total, active in rows}
+
+    fixes = []
+    for gid, member_count, active_count in db.session.query(
+        Group.id, Group.member_count, Group.active_member_count
+    ):
+        expected = actual.get(gid, (0, 0))
+        if (member_count, active_count) != expected:
+            fixes.append(
+                {
+                    "id": gid,
+                    "member_count": expected[0],
+                    "active_member_count": expected[1],
+                }
+            )
+
+    if fixes:
+        db.session.execute(update(Group), fixes)
+    return len(fixes)
+
+
+@click.command("reconcile-group-counts")
+@with_appcontext
+def reconcile_group_counts_command():
+    """重新计算 group.member_count / active_member_count"""
+    fixed = reconcile_group_counters()
+    db.session.commit()
+    click.echo(f"已校准 {fixed} 个组的成员计数")
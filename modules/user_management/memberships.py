@@ -0,0 +1,125 @@
+# modules/user_management/memberships.py
+"""
+用户角色 / 组成员关系的差量同步
+
+create_user / update_user 共用：
+    - 引用的角色 / 组 id 各用一次 IN 查询校验（不存在的 id 忽略，与原接口一致）
+    - 当前关系一次查出，与目标集合做差集，只写入新增 / 删除 / 属性变化的行
+    - 未变化的关系保持原 created_time，不产生多余的索引与行锁开销
+"""
+from datetime import datetime
+
+from modules.auth.models import (
+    db,
+    Role,
+    UserRoleRelation,
+    Group,
+    UserGroupRelation,
+)
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _requested_role_ids(items):
+    ids = []
+    for r in items or []:
+        role_id = _to_int(r.get("role_id") if isinstance(r, dict) else r)
+        if role_id is not None and role_id not in ids:
+            ids.append(role_id)
+    return ids
+
+
+def _requested_groups(items):
+    """返回 {group_id: (type, enable)}，同一组重复出现时以最后一次为准"""
+    groups = {}
+    for g in items or []:
+        if isinstance(g, dict):
+            group_id = _to_int(g.get("group_id"))
+            g_type = g.get("type", "base")
+            g_enable = g.get("enable", True)
+        else:
+            group_id, g_type, g_enable = _to_int(g), "base", True
+        if group_id is not None:
+            groups[group_id] = (g_type, g_enable)
+    return groups
+
+
+def sync_user_roles(user_id, items, is_new=False):
+    """将用户角色同步为 items 指定的集合"""
+    requested = _requested_role_ids(items)
+    valid = set()
+    if requested:
+        valid = {
+            rid for (rid,) in db.session.query(Role.id).filter(Role.id.in_(requested))
+        }
+
+    current = set()
+    if not is_new:
+        current = {
+            rid
+            for (rid,) in db.session.query(UserRoleRelation.role_id).filter_by(
+                user_id=user_id
+            )
+        }
+
+    to_remove = current - valid
+    if to_remove:
+        UserRoleRelation.query.filter(
+            UserRoleRelation.user_id == user_id,
+            UserRoleRelation.role_id.in_(to_remove),
+        ).delete(synchronize_session=False)
+
+    for role_id in requested:
+        if role_id in valid and role_id not in current:
+            db.session.add(UserRoleRelation(user_id=user_id, role_id=role_id))
+
+
+def sync_user_groups(user_id, items, counters, is_new=False):
+    """将用户所属组同步为 items 指定的集合，并累积组成员计数增量"""
+    requested = _requested_groups(items)
+    valid = set()
+    if requested:
+        valid = {
+            gid
+            for (gid,) in db.session.query(Group.id).filter(
+                Group.id.in_(list(requested))
+            )
+        }
+
+    current = {}
+    if not is_new:
+        current = {
+            rel.group_id: rel
+            for rel in UserGroupRelation.query.filter_by(user_id=user_id)
+        }
+
+    to_remove = [gid for gid in current if gid not in valid]
+    if to_remove:
+        for gid in to_remove:
+            counters.removed(gid, current[gid].enable)
+        UserGroupRelation.query.filter(
+            UserGroupRelation.user_id == user_id,
+            UserGroupRelation.group_id.in_(to_remove),
+        ).delete(synchronize_session=False)
+
+    for group_id, (g_type, g_enable) in requested.items():
+        if group_id not in valid:
+            continue
+        rel = current.get(group_id)
+        if rel is None:
+            db.session.add(
+                UserGroupRelation(
+                    user_id=user_id, group_id=group_id, type=g_type, enable=g_enable
+                )
+            )
+            counters.added(group_id, g_enable)
+        elif rel.type != g_type or bool(rel.enable) != bool(g_enable):
+            counters.toggled(group_id, rel.enable, g_enable)
+            rel.type = g_type
+            rel.enable = g_enable
+            rel.updated_time = datetime.utcnow()
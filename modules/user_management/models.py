@@ -1,4 +1,3 @@
 from utils.extensions import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 import json
\ No newline at end of file
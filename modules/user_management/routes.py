@@ -1,7 +1,9 @@
 # modules/user_management/routes.py
+import ipaddress
+import json
 from datetime import datetime
 
-from flask import Blueprint, request, current_app
+from flask import Blueprint, Response, request, current_app, stream_with_context
 from werkzeug.security import generate_password_hash
 
 from modules.auth.models import (
@@ -10,9 +12,20 @@ from modules.auth.models import (
     Role,
     UserRoleRelation,
     Group,
+    GroupNetwork,
     UserGroupRelation,
 )
 from modules.auth.decorators import admin_required
+from modules.user_management.bulk_import import (
+    ImportPayloadError,
+    import_users as bulk_import_users,
+    parse_import_payload,
+)
+from modules.user_management.group_counters import GroupCounterDelta
+from modules.user_management.memberships import sync_user_groups, sync_user_roles
+from modules.user_management.search_index import user_search_index
+from utils.etag import etag_cached
+from utils.pagination import Page, paginate
 
 from utils.response import (
     success_response,
@@ -36,7 +49,8 @@ def get_users():
 
         query = User.query
 
-        if search:
+        use_index = bool(search) and current_app.config["USER_SEARCH_BACKEND"] == "index"
+        if search and not use_index:
             query = query.filter(
                 db.or_(User.username.contains(search), User.name.contains(search))
             )
@@ -55,7 +69,10 @@ def get_users():
                 .filter(Group.group_name == group_filter)
             )
 
-        users = query.paginate(page=page, per_page=per_page, error_out=False)
+        if use_index:
+            users = _search_users_by_index(query, search, page, per_page)
+        else:
+            users = paginate(query, page, per_page)
 
         users_list = []
         for user in users.items:
@@ -93,17 +110,7 @@ def get_users():
             u_dict["groups"] = groups
             users_list.append(u_dict)
 
-        result = {
-            "users": users_list,
-            "pagination": {
-                "page": page,
-                "per_page": per_page,
-                "total": users.total,
-                "pages": users.pages,
-                "has_next": users.has_next,
-                "has_prev": users.has_prev,
-            },
-        }
+        result = {"users": users_list, "pagination": users.to_dict()}
         return success_response(result)
 
     except Exception:  # pragma: no cover
@@ -111,9 +118,34 @@ def get_users():
         return server_error_response("获取用户列表失败")
 
 
+def _search_users_by_index(query, search, page, per_page):
+    """按 n‑gram 索引的排序结果分页；角色 / 组过滤仍由数据库完成"""
+    page = max(page, 1)
+    per_page = per_page if per_page > 0 else 10
+    ranked, total_matches = user_search_index.search(
+        search, limit=current_app.config["USER_SEARCH_MAX_RESULTS"]
+    )
+    # 匹配数超过 USER_SEARCH_MAX_RESULTS 时只能翻阅前 USER_SEARCH_MAX_RESULTS 个，分页中标记 truncated
+    truncated = total_matches > len(ranked)
+    if ranked and query.whereclause is not None:
+        allowed = {
+            uid
+            for (uid,) in query.filter(User.id.in_(ranked)).with_entities(User.id)
+        }
+        ranked = [uid for uid in ranked if uid in allowed]
+
+    page_ids = ranked[(page - 1) * per_page: page * per_page]
+    by_id = {}
+    if page_ids:
+        by_id = {u.id: u for u in User.query.filter(User.id.in_(page_ids))}
+    items = [by_id[uid] for uid in page_ids if uid in by_id]
+    return Page(items, page, per_page, total=len(ranked), truncated=truncated)
+
+
 # ─────────────────────────── 单个用户 ───────────────────────────
 @user_mgmt_bp.route("/users/<int:user_id>", methods=["GET"])
 @admin_required
+@etag_cached("users", "user_role_relation", "roles", "user_group_relation", "group")
 def get_user(user_id):
     try:
         user = User.query.get(user_id)
@@ -181,34 +213,13 @@ def create_user():
         db.session.add(user)
         db.session.flush()
 
-        # 角色
-        for r in data.get("roles", []):
-            role_id = r.get("role_id") if isinstance(r, dict) else r
-            role = Role.query.get(role_id)
-            if role:
-                db.session.add(UserRoleRelation(user_id=user.id, role_id=role.id))
-
-        # 组
-        for g in data.get("groups", []):
-            if isinstance(g, dict):
-                group_id = g.get("group_id")
-                g_type = g.get("type", "base")
-                g_enable = g.get("enable", True)
-            else:
-                group_id, g_type, g_enable = g, "base", True
-
-            group = Group.query.get(group_id)
-            if group:
-                db.session.add(
-                    UserGroupRelation(
-                        user_id=user.id,
-                        group_id=group.id,
-                        type=g_type,
-                        enable=g_enable,
-                    )
-                )
-
+        # 角色 / 组
+        counters = GroupCounterDelta()
+        sync_user_roles(user.id, data.get("roles", []), is_new=True)
+        sync_user_groups(user.id, data.get("groups", []), counters, is_new=True)
+        counters.apply()
         db.session.commit()
+        user_search_index.upsert(user.id, user.username, user.name)
         return success_response(
             {"user": user.to_dict()}, "用户创建成功", code=201
         )
@@ -219,6 +230,47 @@ def create_user():
         return server_error_response("创建用户失败")
 
 
+# ─────────────────────────── 批量导入用户 ───────────────────────────
+@user_mgmt_bp.route("/users/import", methods=["POST"])
+@admin_required
+def import_users():
+    """批量导入用户（JSON 数组或 CSV），返回逐行结果"""
+    try:
+        try:
+            rows = parse_import_payload(request)
+        except ImportPayloadError as e:
+            return error_response(str(e), 400)
+
+        cfg = current_app.config
+        if not rows:
+            return error_response("请求数据不能为空", 400)
+        if len(rows) > cfg["BULK_IMPORT_MAX_ROWS"]:
+            return error_response(
+                f"单次最多导入 {cfg['BULK_IMPORT_MAX_ROWS']} 条", 400
+            )
+
+        summary, report = bulk_import_users(
+            rows,
+            chunk_size=cfg["BULK_IMPORT_CHUNK_SIZE"],
+            hash_workers=cfg["BULK_IMPORT_HASH_WORKERS"],
+            parallel_min=cfg["BULK_IMPORT_PARALLEL_MIN"],
+        )
+        db.session.commit()
+
+        for item, row in zip(report, rows):
+            if item["status"] == "created":
+                user_search_index.upsert(item["id"], item["username"], row.get("name"))
+
+        return success_response(
+            {"summary": summary, "rows": report}, "批量导入完成"
+        )
+
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("Import users error")
+        return server_error_response("批量导入用户失败")
+
+
 # ─────────────────────────── 更新用户 ───────────────────────────
 @user_mgmt_bp.route("/users/<int:user_id>", methods=["PUT"])
 @admin_required
@@ -249,40 +301,18 @@ def update_user(user_id):
         if data.get("password"):
             user.set_password(data["password"])
 
-        # 角色
+        # 角色 / 组：与现有关系做差集，只写入变化的行
         if "roles" in data:
-            UserRoleRelation.query.filter_by(user_id=user_id).delete()
-            for r in data["roles"]:
-                role_id = r.get("role_id") if isinstance(r, dict) else r
-                role = Role.query.get(role_id)
-                if role:
-                    db.session.add(
-                        UserRoleRelation(user_id=user_id, role_id=role.id)
-                    )
-
-        # 组
+            sync_user_roles(user_id, data["roles"])
+
         if "groups" in data:
-            UserGroupRelation.query.filter_by(user_id=user_id).delete()
-            for g in data["groups"]:
-                if isinstance(g, dict):
-                    group_id = g.get("group_id")
-                    g_type = g.get("type", "base")
-                    g_enable = g.get("enable", True)
-                else:
-                    group_id, g_type, g_enable = g, "base", True
-                group = Group.query.get(group_id)
-                if group:
-                    db.session.add(
-                        UserGroupRelation(
-                            user_id=user_id,
-                            group_id=group.id,
-                            type=g_type,
-                            enable=g_enable,
-                        )
-                    )
+            counters = GroupCounterDelta()
+            sync_user_groups(user_id, data["groups"], counters)
+            counters.apply()
 
         user.updated_time = datetime.utcnow()
         db.session.commit()
+        user_search_index.upsert(user.id, user.username, user.name)
 
         return success_response({"user": user.to_dict()}, "用户更新成功")
 
@@ -301,10 +331,18 @@ def delete_user(user_id):
         if not user:
             return not_found_response("用户不存在")
 
+        counters = GroupCounterDelta()
+        for group_id, enable in db.session.query(
+            UserGroupRelation.group_id, UserGroupRelation.enable
+        ).filter_by(user_id=user_id):
+            counters.removed(group_id, enable)
+
         UserRoleRelation.query.filter_by(user_id=user_id).delete()
         UserGroupRelation.query.filter_by(user_id=user_id).delete()
+        counters.apply()
         db.session.delete(user)
         db.session.commit()
+        user_search_index.remove(user_id)
 
         return success_response(message="用户删除成功")
 
@@ -317,6 +355,7 @@ def delete_user(user_id):
 # ======================= 角色管理 =======================
 @user_mgmt_bp.route("/roles", methods=["GET"])
 @admin_required
+@etag_cached("roles")
 def get_roles():
     try:
         roles = Role.query.all()
@@ -414,6 +453,7 @@ def delete_role(role_id):
 # ======================= 组管理 =======================
 @user_mgmt_bp.route("/groups", methods=["GET"])
 @admin_required
+@etag_cached("group", "user_group_relation")
 def get_groups():
     try:
         page = request.args.get("page", 1, type=int)
@@ -424,27 +464,15 @@ def get_groups():
         if search:
             query = query.filter(Group.group_name.contains(search))
 
-        groups = query.paginate(page=page, per_page=per_page, error_out=False)
+        groups = paginate(query, page, per_page)
 
         groups_list = []
         for g in groups.items:
             g_dict = g.to_dict()
-            g_dict["user_count"] = UserGroupRelation.query.filter_by(
-                group_id=g.id, enable=True
-            ).count()
+            g_dict["user_count"] = g.active_member_count
             groups_list.append(g_dict)
 
-        result = {
-            "groups": groups_list,
-            "pagination": {
-                "page": page,
-                "per_page": per_page,
-                "total": groups.total,
-                "pages": groups.pages,
-                "has_next": groups.has_next,
-                "has_prev": groups.has_prev,
-            },
-        }
+        result = {"groups": groups_list, "pagination": groups.to_dict()}
         return success_response(result)
 
     except Exception:
@@ -532,29 +560,194 @@ def delete_group(group_id):
         return server_error_response("删除组失败")
 
 
+# ─────────────────────────── 组网段 ───────────────────────────
+@user_mgmt_bp.route("/groups/<int:group_id>/networks", methods=["GET"])
+@admin_required
+@etag_cached("group_network")
+def get_group_networks(group_id):
+    try:
+        if not db.session.get(Group, group_id):
+            return not_found_response("组不存在")
+        networks = (
+            GroupNetwork.query.filter_by(group_id=group_id)
+            .order_by(GroupNetwork.id)
+            .all()
+        )
+        return success_response({"networks": [n.to_dict() for n in networks]})
+
+    except Exception:
+        current_app.logger.exception("Get group networks error")
+        return server_error_response("获取组网段失败")
+
+
+@user_mgmt_bp.route("/groups/<int:group_id>/networks", methods=["POST"])
+@admin_required
+def add_group_networks(group_id):
+    """
+    登记网段，请求体：{"cidr": "10.1.0.0/16", "description": "..."}
+    或批量：{"networks": [{"cidr": ...}, ...]}；已登记的网段跳过
+    """
+    try:
+        if not db.session.get(Group, group_id):
+            return not_found_response("组不存在")
+
+        data = request.get_json(silent=True)
+        if not data:
+            return error_response("请求数据不能为空", 400)
+        if not isinstance(data, dict):
+            return error_response("请求数据必须为对象", 400)
+        items = data.get("networks") if "networks" in data else [data]
+        if not isinstance(items, list) or not items:
+            return error_response("networks 必须为非空列表", 400)
+
+        parsed = {}
+        for item in items:
+            if not isinstance(item, dict):
+                return error_response("networks 中的每一项必须为对象，如 {\"cidr\": \"10.1.0.0/16\"}", 400)
+            cidr = item.get("cidr")
+            try:
+                network = ipaddress.ip_network(str(cidr).strip(), strict=False)
+            except ValueError:
+                return error_response(f"无效的网段: {cidr}", 400)
+            parsed[str(network)] = item.get("description")
+
+        existing = {
+            cidr for (cidr,) in db.session.query(GroupNetwork.cidr).filter(
+                GroupNetwork.group_id == group_id, GroupNetwork.cidr.in_(parsed)
+            )
+        }
+        created = [
+            GroupNetwork(group_id=group_id, cidr=cidr, description=description)
+            for cidr, description in parsed.items()
+            if cidr not in existing
+        ]
+        db.session.add_all(created)
+        db.session.commit()
+
+        return success_response(
+            {"networks": [n.to_dict() for n in created], "skipped": sorted(existing)},
+            "网段登记成功",
+            code=201,
+        )
+
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("Add group networks error")
+        return server_error_response("登记网段失败")
+
+
+@user_mgmt_bp.route("/groups/<int:group_id>/networks/<int:network_id>", methods=["DELETE"])
+@admin_required
+def delete_group_network(group_id, network_id):
+    try:
+        network = GroupNetwork.query.filter_by(id=network_id, group_id=group_id).first()
+        if not network:
+            return not_found_response("网段不存在")
+
+        db.session.delete(network)
+        db.session.commit()
+        return success_response(message="网段删除成功")
+
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("Delete group network error")
+        return server_error_response("删除网段失败")
+
+
+def _parse_bool_arg(name):
+    """解析 true/false/1/0 查询参数；缺省或无法识别时返回 None"""
+    value = request.args.get(name)
+    if value is None:
+        return None
+    value = value.strip().lower()
+    if value in ("1", "true", "yes"):
+        return True
+    if value in ("0", "false", "no"):
+        return False
+    return None
+
+
 @user_mgmt_bp.route("/groups/<int:group_id>/users", methods=["GET"])
 @admin_required
 def get_group_users(group_id):
+    """
+    组成员列表；传入 limit 或 after 时按 user_id 键集分页，
+    两者都不传时与原接口一致，返回全部成员且响应中不含 pagination
+    查询参数：
+        after           上一页返回的 next_cursor（user_id）
+        limit           每页条数（缺省 GROUP_USERS_PAGE_SIZE，上限 GROUP_USERS_MAX_PAGE_SIZE）
+        relation_type   base / temp
+        relation_enable true / false
+        role            角色代码或角色名称
+        format          json（默认）/ ndjson（流式输出全部匹配成员）
+    """
     try:
         group = Group.query.get(group_id)
         if not group:
             return not_found_response("组不存在")
 
-        relations = (
+        cfg = current_app.config
+        paginated = "limit" in request.args or "after" in request.args
+        after = request.args.get("after", type=int)
+        limit = request.args.get("limit", cfg["GROUP_USERS_PAGE_SIZE"], type=int)
+        limit = max(1, min(limit, cfg["GROUP_USERS_MAX_PAGE_SIZE"]))
+        relation_type = request.args.get("relation_type")
+        relation_enable = _parse_bool_arg("relation_enable")
+        role_filter = request.args.get("role")
+
+        # 命中 idx_ugr_group_enable_user (group_id, enable, user_id) 的范围扫描
+        query = (
             db.session.query(User, UserGroupRelation.type, UserGroupRelation.enable)
-            .join(UserGroupRelation)
+            .join(UserGroupRelation, UserGroupRelation.user_id == User.id)
             .filter(UserGroupRelation.group_id == group_id)
-            .all()
         )
+        if relation_enable is not None:
+            query = query.filter(UserGroupRelation.enable == relation_enable)
+        if relation_type:
+            query = query.filter(UserGroupRelation.type == relation_type)
+        if after is not None:
+            query = query.filter(UserGroupRelation.user_id > after)
+        if role_filter:
+            role_exists = (
+                db.session.query(UserRoleRelation.id)
+                .join(Role, Role.id == UserRoleRelation.role_id)
+                .filter(
+                    UserRoleRelation.user_id == UserGroupRelation.user_id,
+                    db.or_(Role.role_code == role_filter, Role.role_name == role_filter),
+                )
+                .exists()
+            )
+            query = query.filter(role_exists)
+        query = query.order_by(UserGroupRelation.user_id)
 
-        users_list = []
-        for user, r_type, r_enable in relations:
+        def member_dict(user, r_type, r_enable):
             u_dict = user.to_dict()
             u_dict["relation_type"] = r_type
             u_dict["relation_enable"] = r_enable
-            users_list.append(u_dict)
+            return u_dict
+
+        if request.args.get("format") == "ndjson":
+            return _stream_ndjson(query, member_dict)
 
-        result = {"group": group.to_dict(), "users": users_list}
+        if not paginated:
+            users_list = [member_dict(*row) for row in query.all()]
+            return success_response({"group": group.to_dict(), "users": users_list})
+
+        rows = query.limit(limit + 1).all()
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        users_list = [member_dict(*row) for row in rows]
+
+        result = {
+            "group": group.to_dict(),
+            "users": users_list,
+            "pagination": {
+                "limit": limit,
+                "after": after,
+                "next_cursor": rows[-1][0].id if has_next else None,
+                "has_next": has_next,
+            },
+        }
         return success_response(result)
 
     except Exception:
@@ -562,6 +755,24 @@ def get_group_users(group_id):
         return server_error_response("获取组用户失败")
 
 
+def _stream_ndjson(query, row_to_dict, batch_size=500):
+    """逐批读取并输出 NDJSON，每行一个对象，不在内存中构建完整列表"""
+
+    def generate():
+        lines = []
+        for row in query.yield_per(batch_size):
+            lines.append(json.dumps(row_to_dict(*row), ensure_ascii=False))
+            if len(lines) >= batch_size:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+    return Response(
+        stream_with_context(generate()), mimetype="application/x-ndjson"
+    )
+
+
 # ======================= 用户角色关系 =======================
 @user_mgmt_bp.route("/users/<int:user_id>/roles", methods=["POST"])
 @admin_required
@@ -643,6 +854,9 @@ def assign_group(user_id):
             enable=data.get("enable", True),
         )
         db.session.add(relation)
+        counters = GroupCounterDelta()
+        counters.added(group.id, relation.enable)
+        counters.apply()
         db.session.commit()
         return success_response(message="组分配成功")
 
@@ -666,9 +880,13 @@ def update_user_group_relation(user_id, group_id):
         if not data:
             return error_response("请求数据不能为空", 400)
 
+        counters = GroupCounterDelta()
+        counters.toggled(group_id, relation.enable, data.get("enable", relation.enable))
+
         relation.type = data.get("type", relation.type)
         relation.enable = data.get("enable", relation.enable)
         relation.updated_time = datetime.utcnow()
+        counters.apply()
         db.session.commit()
 
         return success_response(message="用户组关系更新成功")
@@ -689,7 +907,10 @@ def remove_group(user_id, group_id):
         if not relation:
             return not_found_response("用户组关联不存在")
 
+        counters = GroupCounterDelta()
+        counters.removed(relation.group_id, relation.enable)
         db.session.delete(relation)
+        counters.apply()
         db.session.commit()
         return success_response(message="组移除成功")
 
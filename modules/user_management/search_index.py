@@ -0,0 +1,244 @@
+# modules/user_management/search_index.py
+"""
+用户搜索的进程内 n‑gram 索引（替代 LIKE '%x%' 全表扫描）
+
+- 对 username / name（小写）建立二元组倒排表，支持任意子串（含中文姓名）匹配；
+- 单字符查询（如姓名中的 "明"）使用单字倒排表：前缀匹配者（按字典序排列的
+  (key, user_id) 数组上二分查找）优先，其余含该字符的用户至多取 limit * 2 个参与排序，
+  总匹配数仍为精确值；
+- 排序：用户名完全匹配 > 姓名完全匹配 > 用户名前缀 > 姓名前缀 > 子串，
+  其次按字段长度、user_id；
+- 新鲜度：本进程的写接口调用 upsert / remove 即时更新；另外每隔
+  USER_SEARCH_REFRESH_INTERVAL 秒以一条 COUNT / MAX(id) / MAX(updated_time) 查询
+  检测其他 worker 的写入：id 大于已见最大值的新用户、updated_time 更新的用户增量拉取；
+  拉取后数量仍与索引不一致（有删除，或较小 id 晚提交）时只读 id 一列与索引对账，
+  删除多出的、补齐缺少的。搜索请求中不做全量重建（仅索引从未构建时加载一次）。
+"""
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from itertools import islice
+
+from flask import current_app
+from sqlalchemy import func
+
+from modules.auth.models import db, User
+from utils.lifecycle import register_warmup
+
+# 排名类别
+_EXACT_USERNAME, _EXACT_NAME, _PREFIX_USERNAME, _PREFIX_NAME, _SUBSTRING = range(5)
+
+_FETCH_CHUNK = 500  # 对账时按 id 补齐，每次 IN 的数量
+
+
+def _bigrams(text):
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class UserSearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs = {}  # user_id -> (username, name)，均为小写
+        self._postings = defaultdict(set)  # bigram -> {user_id}
+        self._chars = defaultdict(set)  # 单个字符 -> {user_id}
+        self._sorted_keys = []  # [(key, user_id)]，key 为 username 或 name
+        self._built = False
+        self._max_updated = None
+        self._max_id = 0
+        self._last_check = 0.0
+
+    # ---------------- 维护 ----------------
+    def _add(self, user_id, username, name, keep_sorted=True):
+        username, name = (username or "").lower(), (name or "").lower()
+        self._docs[user_id] = (username, name)
+        for gram in _bigrams(username) | _bigrams(name):
+            self._postings[gram].add(user_id)
+        for ch in set(username) | set(name):
+            self._chars[ch].add(user_id)
+        for key in {username, name}:
+            if keep_sorted:
+                insort(self._sorted_keys, (key, user_id))
+            else:
+                self._sorted_keys.append((key, user_id))
+
+    def _remove(self, user_id):
+        doc = self._docs.pop(user_id, None)
+        if doc is None:
+            return
+        username, name = doc
+        for gram in _bigrams(username) | _bigrams(name):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(user_id)
+                if not ids:
+                    del self._postings[gram]
+        for ch in set(username) | set(name):
+            ids = self._chars.get(ch)
+            if ids is not None:
+                ids.discard(user_id)
+                if not ids:
+                    del self._chars[ch]
+        for key in {username, name}:
+            pos = bisect_left(self._sorted_keys, (key, user_id))
+            if pos < len(self._sorted_keys) and self._sorted_keys[pos] == (key, user_id):
+                del self._sorted_keys[pos]
+
+    def upsert(self, user_id, username, name):
+        """写接口提交后调用；索引尚未构建时忽略（首次搜索时会全量加载）"""
+        with self._lock:
+            if not self._built:
+                return
+            self._remove(user_id)
+            self._add(user_id, username, name)
+
+    def remove(self, user_id):
+        with self._lock:
+            if self._built:
+                self._remove(user_id)
+
+    def _track(self, user_id, updated):
+        if user_id > self._max_id:
+            self._max_id = user_id
+        if updated is not None and (self._max_updated is None or updated > self._max_updated):
+            self._max_updated = updated
+
+    def rebuild(self):
+        """从 users 表全量构建索引"""
+        rows = db.session.query(User.id, User.username, User.name, User.updated_time).all()
+        with self._lock:
+            self._docs = {}
+            self._postings = defaultdict(set)
+            self._chars = defaultdict(set)
+            self._sorted_keys = []
+            self._max_id, self._max_updated = 0, None
+            for user_id, username, name, updated in rows:
+                self._add(user_id, username, name, keep_sorted=False)
+                self._track(user_id, updated)
+            self._sorted_keys.sort()
+            self._built = True
+            self._last_check = time.monotonic()
+
+    def _apply(self, rows):
+        """增量并入 (id, username, name, updated_time) 行"""
+        with self._lock:
+            for user_id, username, name, updated in rows:
+                self._remove(user_id)
+                self._add(user_id, username, name)
+                self._track(user_id, updated)
+
+    def _reconcile(self):
+        """只读 id 一列与索引对账：删除库中已不存在的用户，补齐缺少的"""
+        ids = {user_id for (user_id,) in db.session.query(User.id)}
+        newest = max(ids, default=0)
+        with self._lock:
+            # 比快照中最大 id 还大的是读取之后本进程新建并 upsert 的，不能当作已删除
+            for user_id in [uid for uid in self._docs.keys() - ids if uid <= newest]:
+                self._remove(user_id)
+            missing = list(ids - self._docs.keys())
+        for start in range(0, len(missing), _FETCH_CHUNK):
+            self._apply(db.session.query(User.id, User.username, User.name, User.updated_time).filter(
+                User.id.in_(missing[start:start + _FETCH_CHUNK])
+            ).all())
+
+    def _refresh_if_stale(self):
+        interval = current_app.config["USER_SEARCH_REFRESH_INTERVAL"]
+        now = time.monotonic()
+        if now - self._last_check < interval:
+            return
+        self._last_check = now
+
+        count, max_id, max_updated = db.session.query(
+            func.count(User.id), func.max(User.id), func.max(User.updated_time)
+        ).one()
+        columns = (User.id, User.username, User.name, User.updated_time)
+        if max_id is not None and max_id > self._max_id:
+            self._apply(db.session.query(*columns).filter(User.id > self._max_id).all())
+        if max_updated is not None and (
+            self._max_updated is None or max_updated > self._max_updated
+        ):
+            self._apply(db.session.query(*columns).filter(
+                User.updated_time >= (self._max_updated or max_updated)
+            ).all())
+        # 新建与修改已并入，数量仍不一致说明有删除（删一建一时并入新用户后同样不一致）
+        if count != len(self._docs):
+            self._reconcile()
+
+    def ensure_fresh(self):
+        if not self._built:
+            self.rebuild()
+        else:
+            self._refresh_if_stale()
+
+    # ---------------- 查询 ----------------
+    def _prefix_ids(self, q, limit):
+        ids = []
+        pos = bisect_left(self._sorted_keys, (q,))
+        while pos < len(self._sorted_keys) and len(ids) < limit:
+            key, user_id = self._sorted_keys[pos]
+            if not key.startswith(q):
+                break
+            ids.append(user_id)
+            pos += 1
+        return ids
+
+    def _rank(self, q, user_id):
+        username, name = self._docs[user_id]
+        if username == q:
+            return (_EXACT_USERNAME, len(username), user_id)
+        if name == q:
+            return (_EXACT_NAME, len(name), user_id)
+        if username.startswith(q):
+            return (_PREFIX_USERNAME, len(username), user_id)
+        if name.startswith(q):
+            return (_PREFIX_NAME, len(name), user_id)
+        return (_SUBSTRING, min(len(username), len(name)), user_id)
+
+    def search(self, keyword, limit=1000):
+        """
+        返回 (按相关度排序的 user_id 列表（最多 limit 个）, 匹配的用户总数)；
+        总数大于列表长度表示结果已截断
+        """
+        q = (keyword or "").strip().lower()
+        if not q:
+            return [], 0
+        self.ensure_fresh()
+
+        with self._lock:
+            if len(q) == 1:
+                matches = self._chars.get(q)
+                if not matches:
+                    return [], 0
+                total = len(matches)
+                # 前缀匹配排名靠前，全部取出；其余子串匹配至多取 limit * 2 个，避免对海量结果排序
+                candidates = set(self._prefix_ids(q, limit))
+                if total <= limit * 2:
+                    candidates |= matches
+                else:
+                    candidates.update(islice(matches, limit * 2))
+            else:
+                sets = []
+                for gram in _bigrams(q):
+                    ids = self._postings.get(gram)
+                    if not ids:
+                        return [], 0
+                    sets.append(ids)
+                sets.sort(key=len)
+                candidates = set(sets[0]).intersection(*sets[1:])
+                # 二元组交集可能存在误报，需校验子串
+                candidates = {
+                    uid for uid in candidates
+                    if q in self._docs[uid][0] or q in self._docs[uid][1]
+                }
+                total = len(candidates)
+            ranked = sorted(candidates, key=lambda uid: self._rank(q, uid))
+        return ranked[:limit], total
+
+
+user_search_index = UserSearchIndex()
+
+
+@register_warmup
+def _warmup_search_index():
+    if current_app.config["USER_SEARCH_BACKEND"] == "index":
+        user_search_index.rebuild()
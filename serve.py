@@ -0,0 +1,102 @@
+# serve.py
+"""
+生产环境启动脚本（app.py 中的 app.run 仅用于本地调试）
+
+    python serve.py                                   # 默认 gunicorn，Windows 下为 waitress
+    python serve.py --workers 4 --threads 8
+    python serve.py --server waitress --threads 16
+
+gunicorn：多进程预派生 + gthread，默认读取 gunicorn.conf.py，命令行参数覆盖其中的值；
+waitress：单进程多线程，适用于 Windows 或未安装 gunicorn 的环境。
+"""
+import argparse
+import atexit
+import os
+import signal
+import sys
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _default_server():
+    if sys.platform == "win32":
+        return "waitress"
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        return "waitress"
+    return "gunicorn"
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import Application
+
+    bind = None
+    if args.host or args.port:
+        host = args.host or os.getenv("APP_HOST", "0.0.0.0")
+        bind = f"{host}:{args.port or os.getenv('APP_PORT', '7878')}"
+    options = {
+        "bind": bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "preload_app": args.preload,
+    }
+    if args.threads and args.threads > 1:
+        options["worker_class"] = "gthread"
+
+    class StandaloneApplication(Application):
+        def load_config(self):
+            self.load_config_from_file(os.path.join(BASE_DIR, "gunicorn.conf.py"))
+            for key, value in options.items():
+                if value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            from wsgi import app
+
+            return app
+
+    StandaloneApplication().run()
+
+
+def run_waitress(args):
+    from waitress import serve
+
+    from utils.lifecycle import run_shutdown
+    from wsgi import app
+
+    # SIGTERM 转为正常退出，使 atexit 中的退出回调得以执行
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    atexit.register(run_shutdown, app)
+    serve(
+        app,
+        host=args.host or app.config["APP_HOST"],
+        port=args.port or app.config["APP_PORT"],
+        threads=args.threads or int(os.getenv("WEB_THREADS", 8)),
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="启动生产环境 WSGI 服务")
+    parser.add_argument("--server", choices=("gunicorn", "waitress"), default=_default_server())
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--workers", type=int, help="gunicorn worker 进程数")
+    parser.add_argument("--threads", type=int, help="每个进程的线程数")
+    parser.add_argument(
+        "--preload",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="gunicorn 是否在主进程预加载应用（默认取 WEB_PRELOAD）",
+    )
+    args = parser.parse_args(argv)
+
+    sys.argv = sys.argv[:1]  # 避免 gunicorn 再次解析命令行
+    if args.server == "gunicorn":
+        run_gunicorn(args)
+    else:
+        run_waitress(args)
+
+
+if __name__ == "__main__":
+    main()
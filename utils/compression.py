@@ -0,0 +1,180 @@
+# utils/compression.py
+"""
+响应压缩中间件（after_request）
+
+- 默认 gzip；若安装了 brotli / zstandard 则按客户端 Accept-Encoding 优先使用
+- 普通响应：小于 COMPRESS_MIN_SIZE 字节不压缩
+- 流式响应（stream_with_context 等）：逐块压缩并 flush，不缓冲整个响应体
+- 仅压缩 COMPRESS_MIMETYPES 中列出的内容类型
+"""
+import zlib
+
+from flask import current_app, request
+
+try:  # 可选依赖
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:  # 可选依赖
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+DEFAULT_MIMETYPES = [
+    "application/json",
+    "application/x-ndjson",
+    "text/plain",
+    "text/html",
+    "text/csv",
+    "text/css",
+    "application/javascript",
+]
+
+
+# ────────────────────────────── 各算法的增量压缩器 ──────────────────────────────
+class _GzipStream:
+    def __init__(self, level):
+        # wbits=31 → 带 gzip 头
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        return self._obj.compress(chunk) + self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _BrotliStream:
+    def __init__(self, level):
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, chunk):
+        return self._obj.process(chunk) + self._obj.flush()
+
+    def finish(self):
+        return self._obj.finish()
+
+
+class _ZstdStream:
+    def __init__(self, level):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, chunk):
+        return self._obj.compress(chunk) + self._obj.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+
+    def finish(self):
+        return self._obj.flush()
+
+
+def _available_encodings():
+    encodings = {"gzip": _GzipStream}
+    if brotli is not None:
+        encodings["br"] = _BrotliStream
+    if zstandard is not None:
+        encodings["zstd"] = _ZstdStream
+    return encodings
+
+
+class Compress:
+    """Flask 响应压缩扩展"""
+
+    def __init__(self, app=None):
+        self._encodings = _available_encodings()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("COMPRESS_ENABLED", True)
+        app.config.setdefault("COMPRESS_ALGORITHMS", ["br", "zstd", "gzip"])
+        app.config.setdefault("COMPRESS_MIN_SIZE", 500)
+        app.config.setdefault("COMPRESS_MIMETYPES", DEFAULT_MIMETYPES)
+        app.config.setdefault("COMPRESS_LEVEL", 6)
+        app.config.setdefault("COMPRESS_BR_LEVEL", 4)
+        app.config.setdefault("COMPRESS_ZSTD_LEVEL", 3)
+        app.config.setdefault("COMPRESS_STREAMS", True)
+
+        self._levels = {
+            "gzip": app.config["COMPRESS_LEVEL"],
+            "br": app.config["COMPRESS_BR_LEVEL"],
+            "zstd": app.config["COMPRESS_ZSTD_LEVEL"],
+        }
+        app.extensions["compress"] = self
+        if app.config["COMPRESS_ENABLED"]:
+            app.after_request(self.after_request)
+
+    # ---------------- 协商 ----------------
+    def _choose_encoding(self, app_config):
+        accepted = request.accept_encodings
+        for name in app_config["COMPRESS_ALGORITHMS"]:
+            if name in self._encodings and accepted[name] > 0:
+                return name
+        return None
+
+    def _should_compress(self, response, app_config):
+        if response.status_code < 200 or response.status_code in (204, 206, 304):
+            return False
+        if response.direct_passthrough or "Content-Encoding" in response.headers:
+            return False
+        if response.mimetype not in app_config["COMPRESS_MIMETYPES"]:
+            return False
+        if response.is_streamed:
+            return app_config["COMPRESS_STREAMS"]
+        return response.content_length is not None and (
+            response.content_length >= app_config["COMPRESS_MIN_SIZE"]
+        )
+
+    # ---------------- after_request ----------------
+    def after_request(self, response):
+        app_config = current_app.config
+        response.vary.add("Accept-Encoding")
+
+        if not self._should_compress(response, app_config):
+            return response
+
+        encoding = self._choose_encoding(app_config)
+        if encoding is None:
+            return response
+
+        compressor = self._encodings[encoding](self._levels[encoding])
+
+        if response.is_streamed:
+            response.response = _CompressedStream(response.response, compressor)
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            response.set_data(compressor.compress(data) + compressor.finish())
+
+        response.headers["Content-Encoding"] = encoding
+        # 压缩后的字节与原文不同，强 ETag 需降级为弱 ETag
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
+
+
+class _CompressedStream:
+    """包装流式响应体：逐块压缩，close() 时关闭原始迭代器（即使尚未开始迭代）"""
+
+    def __init__(self, chunks, compressor):
+        self._chunks = chunks
+        self._compressor = compressor
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            if chunk:
+                yield self._compressor.compress(chunk)
+        yield self._compressor.finish()
+
+    def close(self):
+        close = getattr(self._chunks, "close", None)
+        if close is not None:
+            close()
+
+
+compress = Compress()
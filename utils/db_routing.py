@@ -0,0 +1,85 @@
+# utils/db_routing.py
+"""
+读写分离：只读请求的查询路由到只读副本
+
+- 副本通过 DB_REPLICA_URIS（逗号分隔）配置，注册为 replica_0、replica_1 … 等 bind；
+- 只读请求：GET / HEAD / OPTIONS，或以 @read_only 标记的视图；
+  以 @use_primary 标记的视图始终走主库；
+- 同一请求内固定使用一个副本；一旦发生写入（flush 或 INSERT/UPDATE/DELETE），
+  本请求后续所有查询改走主库，保证读到自己的写入；
+- 未配置副本、或不在请求上下文中（CLI、初始化脚本）时全部走主库。
+"""
+import itertools
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND_PREFIX = "replica_"
+READ_ONLY_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+_round_robin = itertools.count()
+
+
+def read_only(fn):
+    """标记视图只读：即使不是 GET 请求，查询也可走副本"""
+    fn._db_route = "replica"
+    return fn
+
+
+def use_primary(fn):
+    """标记视图必须走主库（如读取刚写入的数据）"""
+    fn._db_route = "primary"
+    return fn
+
+
+class RoutingSession(Session):
+    """在 Flask-SQLAlchemy Session 的 bind 选择之上增加副本路由"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or not has_request_context():
+            return engine
+
+        engines = self._db.engines
+        if engine is not engines.get(None):
+            return engine  # 显式指定了其他 bind 的模型，不做路由
+
+        is_write = self._flushing or (
+            clause is not None and not getattr(clause, "is_select", False)
+        )
+        if is_write:
+            g.db_stick_primary = True
+            return engine
+
+        if not g.get("db_read_only") or g.get("db_stick_primary"):
+            return engine
+
+        replica_key = g.get("db_replica_key")
+        if replica_key is None:
+            keys = [k for k in engines if k and k.startswith(REPLICA_BIND_PREFIX)]
+            if not keys:
+                return engine
+            replica_key = g.db_replica_key = keys[next(_round_robin) % len(keys)]
+        return engines[replica_key]
+
+
+def _mark_request_route():
+    view = current_app.view_functions.get(request.endpoint)
+    route = getattr(view, "_db_route", None)
+    if route == "primary":
+        g.db_read_only = False
+    elif route == "replica":
+        g.db_read_only = True
+    else:
+        g.db_read_only = (
+            request.method in READ_ONLY_METHODS
+            and current_app.config["DB_REPLICA_FOR_GET"]
+        )
+
+
+def init_db_routing(app):
+    """注册请求钩子；未配置副本时不做任何事"""
+    app.config.setdefault("DB_REPLICA_FOR_GET", True)
+    binds = app.config.get("SQLALCHEMY_BINDS") or {}
+    if any(k.startswith(REPLICA_BIND_PREFIX) for k in binds):
+        app.before_request(_mark_request_route)
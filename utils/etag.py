@@ -0,0 +1,165 @@
+# utils/etag.py
+"""
+基于内存版本戳的 ETag / 条件 GET 支持
+
+每张表维护一个廉价的版本戳：
+    - 种子：SELECT COUNT(*), MAX(updated_time)，按 ETAG_SEED_TTL 秒定期刷新，
+      用于感知其他 worker 的写入；
+    - 计数：本进程提交事务时，凡被写过的表都会 +1，保证本 worker 立即失效。
+
+用法（放在权限装饰器之后，保证先鉴权再比对）：
+    @user_mgmt_bp.route("/roles", methods=["GET"])
+    @admin_required
+    @etag_cached("roles")
+    def get_roles(): ...
+"""
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, make_response, request
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from utils.extensions import db
+
+
+class TableVersionRegistry:
+    """按表名维护版本戳，写入时自动递增"""
+
+    _PENDING_KEY = "etag_pending_tables"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seeds = {}  # table -> (seed, fetched_at)
+        self._bumps = {}  # table -> int
+        self._listening = False
+
+    def init_app(self, app):
+        app.config.setdefault("ETAG_SEED_TTL", 5)
+        app.extensions["etag_registry"] = self
+
+        if not self._listening:
+            event.listen(Session, "after_flush", self._collect_flushed)
+            event.listen(Session, "do_orm_execute", self._collect_bulk)
+            event.listen(Session, "after_commit", self._apply_pending)
+            event.listen(Session, "after_rollback", self._discard_pending)
+            self._listening = True
+
+    # ---------------- 写入感知 ----------------
+    def _pending(self, session):
+        return session.info.setdefault(self._PENDING_KEY, set())
+
+    def _collect_flushed(self, session, flush_context):
+        pending = self._pending(session)
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            table = getattr(obj, "__tablename__", None)
+            if table:
+                pending.add(table)
+
+    def _collect_bulk(self, orm_execute_state):
+        # query.update() / query.delete() / session.execute(insert(...)) 不经过 flush
+        if not (
+            orm_execute_state.is_update
+            or orm_execute_state.is_delete
+            or orm_execute_state.is_insert
+        ):
+            return
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            self._pending(orm_execute_state.session).add(table.name)
+
+    def _apply_pending(self, session):
+        tables = session.info.pop(self._PENDING_KEY, None)
+        if tables:
+            self.bump(*tables)
+
+    def _discard_pending(self, session):
+        session.info.pop(self._PENDING_KEY, None)
+
+    def bump(self, *tables):
+        """手动使表版本失效（原生 SQL 写入后调用）"""
+        with self._lock:
+            for table in tables:
+                self._bumps[table] = self._bumps.get(table, 0) + 1
+
+    # ---------------- 版本读取 ----------------
+    def _load_seed(self, table_name):
+        table = db.metadata.tables[table_name]
+        columns = [func.count()]
+        if "updated_time" in table.c:
+            columns.append(func.max(table.c.updated_time))
+        row = db.session.execute(select(*columns).select_from(table)).one()
+        return "|".join(str(v) for v in row)
+
+    def version(self, table_name):
+        """返回表的当前版本戳字符串"""
+        ttl = current_app.config["ETAG_SEED_TTL"]
+        now = time.monotonic()
+        cached = self._seeds.get(table_name)
+        if cached is None or now - cached[1] > ttl:
+            seed = self._load_seed(table_name)
+            with self._lock:
+                self._seeds[table_name] = (seed, now)
+        else:
+            seed = cached[0]
+        return f"{seed}#{self._bumps.get(table_name, 0)}"
+
+    def make_etag(self, tables, extra=""):
+        """由表版本 + 当前请求（端点、路径参数、查询参数）计算 ETag"""
+        parts = [
+            request.endpoint or "",
+            repr(sorted((request.view_args or {}).items())),
+            repr(sorted(request.args.items(multi=True))),
+            extra,
+        ]
+        parts.extend(f"{t}={self.version(t)}" for t in tables)
+        return hashlib.sha1("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+etag_registry = TableVersionRegistry()
+
+
+def etag_cached(*tables, vary=None, max_age=None):
+    """
+    条件 GET 装饰器。
+    tables:  响应所依赖的表名；任一表写入后 ETag 即变化。
+    vary:    可选回调，返回值参与 ETag 计算（如按当前用户区分）。
+    max_age: 可选秒数（或返回秒数的回调）；指定时客户端在该时间内直接使用缓存，
+             适用于很少变化的参考数据；默认每次都需要条件请求验证。
+    If-None-Match 命中时直接返回 304，不再执行视图函数。
+    """
+
+    def cache_control():
+        if max_age is None:
+            return "private, no-cache"
+        return f"private, max-age={max_age() if callable(max_age) else max_age}"
+
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return fn(*args, **kwargs)
+
+            try:
+                etag = etag_registry.make_etag(tables, str(vary()) if vary else "")
+            except Exception:
+                current_app.logger.exception("计算 ETag 失败，跳过条件请求处理")
+                return fn(*args, **kwargs)
+
+            if request.if_none_match and request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                response.headers["Cache-Control"] = cache_control()
+                return response
+
+            response = make_response(fn(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.headers.setdefault("Cache-Control", cache_control())
+            return response
+
+        return wrapper
+
+    return decorator
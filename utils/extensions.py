@@ -3,6 +3,9 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 
+from utils.db_routing import RoutingSession
+
 # 仅在此处定义 SQLAlchemy 和 JWTManager 实例，但不进行初始化
-db = SQLAlchemy()
+# RoutingSession 负责把只读请求的查询路由到只读副本（见 utils/db_routing.py）
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 jwt = JWTManager()
\ No newline at end of file
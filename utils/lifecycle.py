@@ -0,0 +1,59 @@
+# utils/lifecycle.py
+"""
+进程生命周期钩子（供 wsgi.py / serve.py / gunicorn.conf.py 使用）
+
+- 预热（warmup）：在 fork 之前加载进程内缓存（如用户搜索索引），
+  preload 模式下由各 worker 以写时复制方式共享；
+- fork 之后：丢弃从主进程继承的连接池（dispose(close=False)，不关闭父进程的连接）；
+- 优雅退出（shutdown）：worker 退出前依次执行，用于刷写内存中的缓冲数据。
+
+模块在导入时通过 register_warmup / register_shutdown 注册回调，
+回调在 app_context 中执行，单个回调失败不影响其他回调。
+"""
+_warmups = []
+_shutdowns = []
+
+
+def register_warmup(fn):
+    """注册预热回调，可作为装饰器使用"""
+    if fn not in _warmups:
+        _warmups.append(fn)
+    return fn
+
+
+def register_shutdown(fn):
+    """注册退出回调，可作为装饰器使用"""
+    if fn not in _shutdowns:
+        _shutdowns.append(fn)
+    return fn
+
+
+def _run(app, callbacks, stage):
+    with app.app_context():
+        for fn in callbacks:
+            try:
+                fn()
+            except Exception:
+                name = getattr(fn, "__qualname__", repr(fn))
+                app.logger.exception("%s 回调 %s 执行失败", stage, name)
+
+
+def run_warmups(app):
+    _run(app, _warmups, "warmup")
+
+
+def run_shutdown(app):
+    _run(app, _shutdowns, "shutdown")
+    dispose_engines(app)
+
+
+def dispose_engines(app, close=True):
+    """
+    释放所有 bind 的连接池。
+    fork 后在子进程中调用时应传 close=False，避免关闭父进程仍在使用的连接。
+    """
+    from utils.extensions import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=close)
@@ -0,0 +1,272 @@
+# utils/metrics.py
+"""
+Prometheus 文本格式的运行时指标（/metrics），不依赖任何外部服务
+
+- 计数器 / 直方图按线程分片记录：每个线程只写自己的字典，热路径上无锁；
+  抓取时再合并各分片；线程结束后其分片并入常驻的基础分片，
+  按请求 / 连接新建线程的服务器上分片数不会无限增长；
+- 请求指标：按 blueprint / 路由规则 / 方法 / 状态码统计次数与耗时直方图；
+- 连接池指标：各 bind 的 size / checked_out / overflow / checked_in 仪表，
+  以及获取连接的等待时间直方图；
+- 其他模块可通过 metrics.register_gauge() 暴露内部队列深度等数值；
+- /metrics 暴露各路由的访问量，必须设置 METRICS_TOKEN（Authorization: Bearer <token>），
+  未设置时不启用指标；
+- 指标只在进程内累计，不跨进程汇总：gunicorn 多 worker（见 serve.py / gunicorn.conf.py）时
+  每次抓取由恰好接到请求的 worker 回答，只含该 worker 的数据。因此每条样本都带 pid 标签，
+  各 worker 的计数器是各自单调递增的序列，应先按序列求 rate() 再 sum() 汇总，
+  不要直接比较相邻两次抓取的原始值；worker 数少、抓取间隔远小于 rate() 窗口时，
+  每个 worker 都会被抓到。需要精确的全局总数时以 --workers 1 运行，或在 worker 前
+  按进程分别暴露端口。
+"""
+import hmac
+import os
+import threading
+import time
+import weakref
+from bisect import bisect_left
+
+from flask import current_app, g, request
+
+from utils.extensions import db
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Shard:
+    """单个线程的指标分片"""
+
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+
+    def merge_into(self, counters, histograms):
+        for key, value in list(self.counters.items()):
+            counters[key] = counters.get(key, 0) + value
+        for key, data in list(self.histograms.items()):
+            merged = histograms.setdefault(key, [0] * len(data))
+            for i, v in enumerate(data):
+                merged[i] += v
+
+
+class _ShardOwner:
+    """存放在 threading.local 中，线程结束时随线程局部数据一起回收，触发分片归并"""
+
+    __slots__ = ("__weakref__",)
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._local = threading.local()
+        self._shards = []  # 存活线程的分片
+        self._retired = _Shard()  # 已结束线程的累计值
+        self._shards_lock = threading.Lock()
+        self._meta = {}  # name -> (type, help)
+        self._gauges = {}  # name -> callback
+
+    # ---------------- 写入（热路径） ----------------
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            owner = self._local.owner = _ShardOwner()
+            with self._shards_lock:
+                self._shards.append(shard)
+            weakref.finalize(owner, self._retire, shard)
+        return shard
+
+    def _retire(self, shard):
+        """线程结束：其分片并入基础分片（该线程已不再写入）"""
+        with self._shards_lock:
+            try:
+                self._shards.remove(shard)
+            except ValueError:
+                return
+            shard.merge_into(self._retired.counters, self._retired.histograms)
+
+    def describe(self, name, metric_type, help_text):
+        self._meta[name] = (metric_type, help_text)
+
+    def inc(self, name, labels=(), value=1):
+        counters = self._shard().counters
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        histograms = self._shard().histograms
+        key = (name, labels)
+        data = histograms.get(key)
+        if data is None:
+            data = histograms[key] = [0] * (len(self.buckets) + 3)
+        data[bisect_left(self.buckets, value)] += 1  # 最后一个桶为 +Inf
+        data[-2] += value
+        data[-1] += 1
+
+    def register_gauge(self, name, callback, help_text=""):
+        """
+        注册仪表盘回调，抓取时调用；
+        callback 返回数值，或 [(labels_tuple, value), ...]
+        """
+        self._gauges[name] = callback
+        self.describe(name, "gauge", help_text)
+
+    # ---------------- 导出 ----------------
+    def _merge(self):
+        counters, histograms = {}, {}
+        # 持锁合并：避免分片在合并途中被并入基础分片而重复计数
+        with self._shards_lock:
+            for shard in (self._retired, *self._shards):
+                shard.merge_into(counters, histograms)
+        return counters, histograms
+
+    def render(self):
+        counters, histograms = self._merge()
+        worker = (("pid", os.getpid()),)  # 区分 gunicorn 各 worker 的序列
+        by_name = {}
+        for (name, labels), value in counters.items():
+            by_name.setdefault(name, []).append(
+                f"{name}{_format_labels(labels + worker)} {_format_value(value)}"
+            )
+
+        for (name, labels), data in histograms.items():
+            labels = labels + worker
+            lines = by_name.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), data[:-2]):
+                cumulative += count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                bucket_labels = _format_labels(labels + (("le", le),))
+                lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(data[-2])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {data[-1]}")
+
+        for name, callback in self._gauges.items():
+            try:
+                value = callback()
+            except Exception:
+                current_app.logger.exception("采集指标 %s 失败", name)
+                continue
+            samples = value if isinstance(value, list) else [((), value)]
+            by_name[name] = [
+                f"{name}{_format_labels(tuple(labels) + worker)} {_format_value(v)}"
+                for labels, v in samples
+            ]
+
+        out = []
+        for name in sorted(by_name):
+            metric_type, help_text = self._meta.get(name, ("untyped", ""))
+            if help_text:
+                out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {metric_type}")
+            out.extend(by_name[name])
+        return "\n".join(out) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+# ────────────────────────────── Flask 集成 ──────────────────────────────
+def _before_request():
+    g._metrics_start = time.perf_counter()
+
+
+def _after_request(response):
+    start = g.pop("_metrics_start", None)
+    if start is not None:
+        rule = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        labels = (
+            ("blueprint", request.blueprint or ""),
+            ("route", rule),
+            ("method", request.method),
+        )
+        elapsed = time.perf_counter() - start
+        metrics.observe("http_request_duration_seconds", labels, elapsed)
+        metrics.inc("http_requests_total", labels + (("status", str(response.status_code)),))
+    return response
+
+
+def _instrument_engine(bind_key, engine):
+    """统计从连接池获取连接的等待时间（包装 Engine.raw_connection，dispose 后依然有效）"""
+    raw_connection = engine.raw_connection
+    labels = (("bind", bind_key or "default"),)
+
+    def timed_raw_connection(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return raw_connection(*args, **kwargs)
+        finally:
+            metrics.observe("db_pool_wait_seconds", labels, time.perf_counter() - start)
+
+    engine.raw_connection = timed_raw_connection
+
+
+def _pool_gauge(attr):
+    def collect():
+        samples = []
+        for bind_key, engine in db.engines.items():
+            method = getattr(engine.pool, attr, None)
+            if callable(method):
+                samples.append(((("bind", bind_key or "default"),), method()))
+        return samples
+
+    return collect
+
+
+def metrics_view():
+    token = current_app.config["METRICS_TOKEN"]
+    supplied = request.headers.get("Authorization", "")
+    if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+        return current_app.response_class(
+            "unauthorized\n", status=401, mimetype="text/plain"
+        )
+    return current_app.response_class(
+        metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def init_metrics(app):
+    """注册请求钩子、连接池指标与 /metrics 端点"""
+    app.config.setdefault("METRICS_ENABLED", True)
+    app.config.setdefault("METRICS_TOKEN", None)
+    if not app.config["METRICS_ENABLED"]:
+        return
+    if not app.config["METRICS_TOKEN"]:
+        app.logger.warning("未设置 METRICS_TOKEN，/metrics 指标端点未启用")
+        return
+
+    metrics.describe("http_requests_total", "counter", "按路由与状态码统计的请求数")
+    metrics.describe("http_request_duration_seconds", "histogram", "请求处理耗时（秒）")
+    metrics.describe("db_pool_wait_seconds", "histogram", "从连接池获取连接的耗时（秒）")
+    for name, attr, help_text in (
+        ("db_pool_size", "size", "连接池常驻连接数上限"),
+        ("db_pool_checked_out", "checkedout", "已借出的连接数"),
+        ("db_pool_checked_in", "checkedin", "池中空闲连接数"),
+        ("db_pool_overflow", "overflow", "当前溢出连接数"),
+    ):
+        metrics.register_gauge(name, _pool_gauge(attr), help_text)
+
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule("/metrics", "metrics", metrics_view)
+
+    with app.app_context():
+        for bind_key, engine in db.engines.items():
+            _instrument_engine(bind_key, engine)
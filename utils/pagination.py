@@ -0,0 +1,138 @@
+# utils/pagination.py
+"""
+统一分页工具，替代 Flask-SQLAlchemy 的 query.paginate()
+
+三种计数模式（请求参数 count 指定，缺省取 PAGINATION_COUNT_MODE）：
+    exact   每次执行 COUNT(*)，与原行为一致
+    cached  COUNT(*) 结果按“过滤条件签名”（SQL + 参数）缓存
+            PAGINATION_COUNT_CACHE_TTL 秒
+    none    不计数，多取一条（per_page + 1）判断 has_next；
+            返回的 total / pages 为 None
+
+返回的 Page.to_dict() 与原 pagination 字段保持一致；结果只取了前若干条
+（如用户搜索索引的 USER_SEARCH_MAX_RESULTS 上限）时另带 truncated: true，
+此时 total / pages 只覆盖可翻阅的部分。
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request
+
+COUNT_MODES = ("exact", "cached", "none")
+
+
+class Page:
+    """一页查询结果"""
+
+    def __init__(self, items, page, per_page, total=None, has_next=None, truncated=None):
+        """has_next 已知（多取一条得到）时优先于由 total 推算的值"""
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.total = total
+        if total is None:
+            self.pages = None
+            self.has_next = bool(has_next)
+        else:
+            self.pages = (total + per_page - 1) // per_page if per_page > 0 else 0
+            self.has_next = page < self.pages if has_next is None else bool(has_next)
+        self.has_prev = page > 1
+        self.truncated = truncated
+
+    def to_dict(self):
+        data = {
+            "page": self.page,
+            "per_page": self.per_page,
+            "total": self.total,
+            "pages": self.pages,
+            "has_next": self.has_next,
+            "has_prev": self.has_prev,
+        }
+        if self.truncated is not None:
+            data["truncated"] = self.truncated
+        return data
+
+
+class _CountCache:
+    """按过滤条件签名缓存 COUNT(*) 结果（LRU + TTL）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (count, expires_at)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, count, ttl, max_size):
+        with self._lock:
+            self._entries[key] = (count, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+count_cache = _CountCache()
+
+
+def _signature(query):
+    compiled = query.statement.compile()
+    params = sorted((k, repr(v)) for k, v in compiled.params.items())
+    return f"{compiled}|{params}"
+
+
+def _count(query, mode):
+    count_query = query.order_by(None)
+    if mode != "cached":
+        return count_query.count()
+
+    cfg = current_app.config
+    key = _signature(count_query)
+    total = count_cache.get(key)
+    if total is None:
+        total = count_query.count()
+        count_cache.set(
+            key,
+            total,
+            cfg["PAGINATION_COUNT_CACHE_TTL"],
+            cfg["PAGINATION_COUNT_CACHE_SIZE"],
+        )
+    return total
+
+
+def resolve_count_mode(mode=None):
+    """优先使用显式参数，其次请求参数 count，最后是配置默认值"""
+    mode = mode or request.args.get("count") or current_app.config["PAGINATION_COUNT_MODE"]
+    return mode if mode in COUNT_MODES else "exact"
+
+
+def paginate(query, page, per_page, mode=None):
+    """对 SQLAlchemy Query 分页，返回 Page"""
+    page = max(page or 1, 1)
+    per_page = per_page if per_page and per_page > 0 else 10
+    mode = resolve_count_mode(mode)
+
+    rows = query.limit(per_page + 1).offset((page - 1) * per_page).all()
+    has_next = len(rows) > per_page
+    items = rows[:per_page]
+
+    if mode == "none":
+        return Page(items, page, per_page, has_next=has_next)
+
+    # 已到最后一页时总数可直接推出，无需再 COUNT
+    if not has_next and (items or page == 1):
+        return Page(items, page, per_page, total=(page - 1) * per_page + len(items))
+    # cached 模式的计数可能过期，has_next 以实际多取的一条为准
+    return Page(items, page, per_page, total=_count(query, mode), has_next=has_next)
@@ -0,0 +1,192 @@
+# utils/profiler.py
+"""
+运行时开启的采样式性能剖析（纯 Python，无需重启或挂载外部工具）
+
+- 启动后由一个后台线程按固定频率调用 sys._current_frames()，记录本进程所有线程的调用栈，
+  到期（或手动停止）后自动结束；未运行时除请求钩子里的一次布尔判断外没有任何开销；
+- 结果聚合为 collapsed stack 格式（"帧;帧;帧 次数"，根帧在前），可直接交给
+  flamegraph.pl / speedscope 生成火焰图；正在处理请求的线程以 "route:<规则>" 作为根帧；
+- 可只采样某一路由规则（如 /api/users/users）上的请求线程；
+- 结果写入 PROFILER_OUTPUT_DIR，多 worker 部署时任一 worker 都能下载；
+  采样只覆盖收到启动请求的 worker 进程。
+"""
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from flask import request
+
+_IDLE_ROUTE = None
+
+
+class ProfilerBusyError(RuntimeError):
+    """本进程已有剖析在运行"""
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self.active = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._routes = {}  # 线程 ID -> 正在处理的路由规则（仅在运行期间记录）
+        self._labels = {}  # code 对象 -> "函数 (文件:行)"
+        self._samples = {}  # (路由, code 对象元组) -> 次数
+        self._info = None
+        self._output_dir = None
+
+    # ---------------- 请求钩子 ----------------
+    def enter_request(self, rule):
+        self._routes[threading.get_ident()] = rule
+
+    def exit_request(self):
+        self._routes.pop(threading.get_ident(), None)
+
+    # ---------------- 采样 ----------------
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            for prefix in sys.path:
+                if prefix and filename.startswith(prefix):
+                    filename = filename[len(prefix):].lstrip(os.sep)
+                    break
+            label = self._labels[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})"
+        return label
+
+    def _sample(self, own_ident, route_filter):
+        # 热路径只收集 code 对象元组，格式化推迟到结束时，减少采样线程占用 GIL 的时间
+        routes = self._routes
+        samples = self._samples
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            route = routes.get(ident, _IDLE_ROUTE)
+            if route_filter is not None and route != route_filter:
+                continue
+            codes = []
+            while frame is not None:
+                codes.append(frame.f_code)
+                frame = frame.f_back
+            key = (route, tuple(codes))
+            samples[key] = samples.get(key, 0) + 1
+
+    def _collapse(self):
+        """聚合结果 -> collapsed stack 行（根帧在前），按次数降序"""
+        merged = Counter()
+        for (route, codes), n in self._samples.items():
+            stack = [self._label(code) for code in reversed(codes)]
+            if route is not None:
+                stack.insert(0, f"route:{route}")
+            merged[";".join(stack)] += n
+        return [f"{stack} {n}" for stack, n in merged.most_common()]
+
+    def _run(self, interval, deadline, route_filter):
+        own_ident = threading.get_ident()
+        next_tick = time.monotonic()
+        count = 0
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                self._sample(own_ident, route_filter)
+                count += 1
+                next_tick += interval
+                delay = next_tick - time.monotonic()
+                if delay < 0:  # 落后时不补采，避免集中采样
+                    next_tick = time.monotonic()
+                    delay = 0
+                self._stop.wait(delay)
+        finally:
+            self._finish(count)
+
+    def _finish(self, sample_rounds):
+        info = dict(self._info)
+        info.update(
+            finished_at=datetime.utcnow().isoformat(),
+            sample_rounds=sample_rounds,
+            samples=sum(self._samples.values()),
+        )
+        lines = self._collapse()
+        info["distinct_stacks"] = len(lines)
+        try:
+            os.makedirs(self._output_dir, exist_ok=True)
+            path = os.path.join(self._output_dir, f"{info['profile_id']}.folded")
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + ("\n" if lines else ""))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            info["error"] = f"写出剖析结果失败: {e}"
+        with self._lock:
+            self.active = False
+            self._routes.clear()
+            self._samples = {}
+            self._labels.clear()
+            self._info = info
+
+    # ---------------- 控制 ----------------
+    def start(self, output_dir, duration, hz, route=None):
+        """启动一次剖析，返回其信息；已在运行时抛出 ProfilerBusyError"""
+        with self._lock:
+            if self.active:
+                raise ProfilerBusyError("已有剖析正在运行")
+            self._stop.clear()
+            self._samples = {}
+            self._output_dir = output_dir
+            self._info = {
+                "profile_id": f"{datetime.utcnow():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}",
+                "pid": os.getpid(),
+                "hz": hz,
+                "duration": duration,
+                "route": route,
+                "started_at": datetime.utcnow().isoformat(),
+            }
+            self.active = True
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(1.0 / hz, time.monotonic() + duration, route),
+                name="sampling-profiler",
+                daemon=True,
+            )
+            self._thread.start()
+            return dict(self._info)
+
+    def stop(self, timeout=5.0):
+        """提前结束当前剖析并等待结果写出；返回其信息，未在运行时返回 None"""
+        thread = self._thread
+        if not self.active or thread is None:
+            return None
+        self._stop.set()
+        thread.join(timeout)
+        return self.status()
+
+    def status(self):
+        with self._lock:
+            return {"running": self.active, "pid": os.getpid(),
+                    "profile": dict(self._info) if self._info else None}
+
+
+profiler = SamplingProfiler()
+
+
+def _before_request():
+    if profiler.active:
+        rule = request.url_rule.rule if request.url_rule is not None else "<unmatched>"
+        profiler.enter_request(rule)
+
+
+def _teardown_request(exc=None):
+    if profiler.active:
+        profiler.exit_request()
+
+
+def init_profiler(app):
+    """注册记录“线程 -> 路由”的请求钩子（剖析未运行时钩子只做一次布尔判断）"""
+    app.before_request(_before_request)
+    app.teardown_request(_teardown_request)
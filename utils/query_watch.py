@@ -0,0 +1,252 @@
+# utils/query_watch.py
+"""
+慢查询记录：无需开启 MySQL 全局慢日志，在应用内定位缺失索引
+
+- 监听各 engine 的 before/after_cursor_execute，耗时超过 QUERY_WATCH_THRESHOLD_MS 的语句
+  记录：归一化 SQL、参数、所在路由、发起查询的业务代码位置（跳过 SQLAlchemy / Flask 等框架帧）；
+- 涉及 users 表的语句中，绑定到用户个人信息列（用户名、密码、姓名、年龄、性别）的参数打码；
+- 每种语句形态（归一化 SQL）只执行一次 EXPLAIN（SQLite 为 EXPLAIN QUERY PLAN），
+  结果缓存（LRU，QUERY_WATCH_EXPLAIN_CACHE_SIZE）；EXPLAIN 在同一连接上立即执行，
+  与原语句处于同一事务、看到相同的数据；流式读取（stream_results / yield_per，
+  服务端游标）的语句不执行 EXPLAIN：结果尚未读完时在同一连接上发送新命令，
+  pymysql 会提前结束未读完的结果集；
+- 记录写入应用日志（WARNING），最近 QUERY_WATCH_RECENT_SIZE 条保留在进程内，
+  可通过 GET /api/diagnostics/slow-queries 查看；未超阈值的语句只多一次计时与比较。
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from flask import current_app, has_app_context, has_request_context, request
+from sqlalchemy import event
+
+from utils.metrics import metrics
+
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SKIP_DIRS = (os.sep + "site-packages" + os.sep, os.sep + "dist-packages" + os.sep)
+
+# users 表中属于个人信息的列（按绑定参数名去掉 _1、_2 等后缀后匹配；
+# 展开的 IN 列表在 MySQL 上绑定为 username_1_1、username_1_2，后缀可有多段）
+USERS_PII_COLUMNS = frozenset({"username", "password", "name", "age", "gender"})
+_MASK = "***"
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|%\(\w+\)s|:\w+|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_USERS_TABLE = re.compile(r"\busers\b", re.IGNORECASE)
+_BIND_SUFFIX = re.compile(r"(?:_\d+)+$")
+
+_EXPLAIN_PREFIX = {
+    "mysql": "EXPLAIN ",
+    "postgresql": "EXPLAIN ",
+    "sqlite": "EXPLAIN QUERY PLAN ",
+}
+
+
+def normalize_sql(statement):
+    """去掉字面量、统一占位符、折叠 IN 列表与空白，得到语句形态"""
+    sql = _STRING_LITERAL.sub("?", statement)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    sql = _IN_LIST.sub("(?)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def _param_names(context, parameters):
+    """按位置返回各参数对应的绑定名，无法确定时返回 None"""
+    if isinstance(parameters, dict):
+        return None
+    compiled = getattr(context, "compiled", None)
+    positiontup = getattr(compiled, "positiontup", None)
+    if positiontup and len(positiontup) == len(parameters):
+        return positiontup
+    return None
+
+
+def mask_parameters(statement, parameters, context=None):
+    """涉及 users 表时，对个人信息列的参数打码；返回可 JSON 序列化的副本"""
+    def is_pii(name):
+        return name is not None and _BIND_SUFFIX.sub("", str(name)) in USERS_PII_COLUMNS
+
+    def show(value):
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        return str(value)
+
+    touches_users = bool(_USERS_TABLE.search(statement))
+    if isinstance(parameters, dict):
+        return {k: _MASK if touches_users and is_pii(k) else show(v) for k, v in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        names = _param_names(context, parameters) if touches_users else None
+        if touches_users and names is None:
+            return [_MASK] * len(parameters)  # 无法对应到列名时全部打码
+        return [
+            _MASK if names is not None and is_pii(names[i]) else show(v)
+            for i, v in enumerate(parameters)
+        ]
+    return show(parameters)
+
+
+def _caller():
+    """最近一个属于本项目（非框架、非本模块）的调用帧"""
+    frame = sys._getframe(2)
+    here = os.path.abspath(__file__)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (
+            filename.startswith(_PROJECT_ROOT)
+            and filename != here
+            and not any(d in filename for d in _SKIP_DIRS)
+        ):
+            return f"{os.path.relpath(filename, _PROJECT_ROOT)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class QueryWatch:
+    def __init__(self):
+        self.threshold = 0.2  # 秒，init_app 时按配置覆盖
+        self.explain_enabled = True
+        self._lock = threading.Lock()
+        self._explained = OrderedDict()  # 语句形态 -> EXPLAIN 结果
+        self._explain_cache_size = 512
+        self._recent = deque(maxlen=200)
+        self._attached = set()
+
+    def init_app(self, app):
+        app.config.setdefault("QUERY_WATCH_ENABLED", True)
+        if not app.config["QUERY_WATCH_ENABLED"]:
+            return
+        self.threshold = app.config["QUERY_WATCH_THRESHOLD_MS"] / 1000.0
+        self.explain_enabled = app.config["QUERY_WATCH_EXPLAIN"]
+        self._explain_cache_size = app.config["QUERY_WATCH_EXPLAIN_CACHE_SIZE"]
+        with self._lock:
+            self._recent = deque(self._recent, maxlen=app.config["QUERY_WATCH_RECENT_SIZE"])
+        metrics.describe("db_slow_queries_total", "counter", "超过慢查询阈值的语句数")
+        with app.app_context():
+            from utils.extensions import db
+
+            for engine in db.engines.values():
+                self.attach(engine)
+
+    def attach(self, engine):
+        if id(engine) in self._attached:
+            return
+        self._attached.add(id(engine))
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+
+    # ---------------- 事件 ----------------
+    @staticmethod
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_watch_start", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_watch_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if elapsed < self.threshold:
+            return
+        try:
+            self._record(conn, cursor, statement, parameters, context, executemany, elapsed)
+        except Exception:
+            if has_app_context():
+                current_app.logger.exception("记录慢查询失败")
+
+    # ---------------- 记录 ----------------
+    @staticmethod
+    def _streaming(context):
+        """语句是否以服务端游标流式读取（结果仍在连接上等待读取）"""
+        if context is None:
+            return False
+        return bool(
+            context.execution_options.get("stream_results")
+            or getattr(context, "_is_server_side", False)
+        )
+
+    def _explain(self, conn, cursor, statement, parameters, executemany):
+        """同一连接上执行 EXPLAIN，仅限单条 SELECT"""
+        prefix = _EXPLAIN_PREFIX.get(conn.dialect.name)
+        head = statement.lstrip()[:6].upper()
+        if prefix is None or executemany or head not in ("SELECT", "WITH"):
+            return None
+        explain_cursor = cursor.connection.cursor()
+        try:
+            explain_cursor.execute(prefix + statement, parameters)
+            columns = [d[0] for d in explain_cursor.description or ()]
+            return [
+                dict(zip(columns, (v if isinstance(v, (int, float, str)) or v is None else str(v)
+                                   for v in row)))
+                for row in explain_cursor.fetchall()
+            ]
+        finally:
+            explain_cursor.close()
+
+    def _plan_for(self, shape, conn, cursor, statement, parameters, executemany):
+        with self._lock:
+            if shape in self._explained:
+                self._explained.move_to_end(shape)
+                return self._explained[shape], True
+        try:
+            plan = self._explain(conn, cursor, statement, parameters, executemany)
+        except Exception as e:
+            plan = [{"error": f"{type(e).__name__}: {e}"}]
+        with self._lock:
+            self._explained[shape] = plan
+            while len(self._explained) > self._explain_cache_size:
+                self._explained.popitem(last=False)
+        return plan, False
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany, elapsed):
+        shape = normalize_sql(statement)
+        entry = {
+            "time": datetime.utcnow().isoformat(),
+            "duration_ms": round(elapsed * 1000, 2),
+            "sql": shape,
+            "parameters": (
+                f"<executemany: {len(parameters)} 组>" if executemany
+                else mask_parameters(statement, parameters, context)
+            ),
+            "route": (
+                f"{request.method} {request.url_rule.rule if request.url_rule else request.path}"
+                if has_request_context() else None
+            ),
+            "caller": _caller(),
+            "bind": conn.engine.url.render_as_string(hide_password=True),
+        }
+        if self.explain_enabled and self._streaming(context):
+            entry["explain"] = None
+        elif self.explain_enabled:
+            entry["explain"], entry["explain_cached"] = self._plan_for(
+                shape, conn, cursor, statement, parameters, executemany
+            )
+        with self._lock:
+            self._recent.append(entry)
+        metrics.inc("db_slow_queries_total", (("route", entry["route"] or ""),))
+        if has_app_context():
+            current_app.logger.warning(
+                "慢查询 %.1f ms [%s] %s | 参数=%s | 位置=%s%s",
+                entry["duration_ms"], entry["route"], shape, entry["parameters"], entry["caller"],
+                "" if entry.get("explain_cached", True) else f" | EXPLAIN={entry['explain']}",
+            )
+
+    def recent(self, limit=None):
+        with self._lock:
+            entries = list(self._recent)
+        entries.reverse()
+        return entries[:limit] if limit else entries
+
+    def clear(self):
+        with self._lock:
+            self._recent.clear()
+            self._explained.clear()
+
+
+query_watch = QueryWatch()
@@ -0,0 +1,21 @@
+# wsgi.py
+"""
+生产环境 WSGI 入口
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+    python serve.py            # 见 serve.py，自动选择 gunicorn / waitress
+
+导入时创建应用并执行预热（WEB_WARMUP=false 可关闭）。
+gunicorn 的 preload 模式下这一步在主进程完成，预热得到的缓存由各 worker
+以写时复制方式共享；预热结束后立即释放连接池，避免子进程继承数据库连接。
+"""
+import os
+
+from app import create_app
+from utils.lifecycle import dispose_engines, run_warmups
+
+app = create_app(os.getenv("FLASK_ENV", "production"))
+
+if os.getenv("WEB_WARMUP", "true").lower() == "true":
+    run_warmups(app)
+    dispose_engines(app)